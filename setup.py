@@ -30,7 +30,7 @@ setup(
     description="Command Line Interface for PyScript",
     package_dir={"": "src"},
     packages=find_packages(where="src"),
-    package_data={"pyscript": ["templates/*.html"]},
+    package_data={"pyscript": ["templates/*.html", "templates/*.js"]},
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/pyscript/pyscript-cli",
@@ -49,6 +49,7 @@ setup(
         "pluggy==1.5.0",
         "rich<=13.7.1",
         "toml<0.11",
+        "tomlkit<1",
         "typer<=0.9.0",
         "platformdirs<4.3",
         "requests<=2.31.0",
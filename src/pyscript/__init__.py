@@ -23,9 +23,12 @@ DEFAULT_CONFIG = {
 DATA_DIR = Path(platformdirs.user_data_dir(appname=APPNAME, appauthor=APPAUTHOR))
 CONFIG_FILE = DATA_DIR / Path(DEFAULT_CONFIG_FILENAME)
 if not CONFIG_FILE.is_file():
+    from pyscript._fs import atomic_write_text
+
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with CONFIG_FILE.open("w") as config_file:
-        json.dump(DEFAULT_CONFIG, config_file)
+    # Several processes may be starting at once: none of them must see a
+    # partially written file
+    atomic_write_text(CONFIG_FILE, json.dumps(DEFAULT_CONFIG))
 
 
 try:
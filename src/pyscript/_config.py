@@ -0,0 +1,148 @@
+"""Reading and writing of PyScript project config files (`pyscript.toml` or JSON)."""
+
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+
+import toml
+import tomlkit
+from tomlkit.items import Table
+
+from pyscript._fs import atomic_write_text
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    tomllib = None  # type: ignore
+
+# Parsed configs, with the (mtime, size) of the file they have been read from.
+_cache: dict[Path, tuple[tuple[int, int], dict]] = {}
+
+
+def _is_json(config_file: Path) -> bool:
+    return str(config_file).endswith(".json")
+
+
+def _parse(config_file: Path, text: str) -> dict:
+    if _is_json(config_file):
+        return json.loads(text)
+    elif tomllib is not None:
+        return tomllib.loads(text)
+    else:  # pragma: no cover
+        return toml.loads(text)
+
+
+def _dumps(config_file: Path, configuration: dict) -> str:
+    if _is_json(config_file):
+        return json.dumps(configuration)
+    else:
+        return toml.dumps(configuration)
+
+
+def _stat_key(config_file: Path) -> tuple[int, int]:
+    stat = config_file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _write(config_file: Path, text: str, configuration: dict) -> None:
+    atomic_write_text(config_file, text)
+    _cache[config_file.absolute()] = (
+        _stat_key(config_file),
+        copy.deepcopy(configuration),
+    )
+
+
+def load_config_file(config_file: Path) -> dict:
+    """Read an app configuration dict from `config_file`.
+
+    Configs are cached as long as the file is not modified, so commands can read
+    them as often as needed.
+
+    Params:
+
+        - config_file(Path): path configuration file. (i.e.: "pyscript.toml"). Supported
+            formats: `toml` and `json`.
+
+    Return:
+        (dict): the app configuration
+    """
+    path = config_file.absolute()
+    stat_key = _stat_key(path)
+    cached = _cache.get(path)
+    if cached is None or cached[0] != stat_key:
+        with path.open("rb") as fp:
+            configuration = _parse(path, fp.read().decode("utf-8"))
+        cached = _cache[path] = (stat_key, configuration)
+
+    # Callers are free to modify the config they get
+    return copy.deepcopy(cached[1])
+
+
+def save_config_file(config_file: Path, configuration: dict):
+    """Write an app configuration dict to `config_file`.
+
+    Params:
+
+        - config_file(Path): path configuration file. (i.e.: "pyscript.toml"). Supported
+            formats: `toml` and `json`.
+        - configuration(dict): app configuration to be saved
+
+    Return:
+        (None)
+    """
+    _write(config_file, _dumps(config_file, configuration), configuration)
+
+
+def update_config_file(config_file: Path, updates: dict) -> dict:
+    """Update some of the top level keys of the app configuration in `config_file`.
+
+    TOML files are edited in place, so comments, formatting and the order of the
+    keys that are not updated are preserved.
+
+    Params:
+
+        - config_file(Path): path configuration file. (i.e.: "pyscript.toml"). Supported
+            formats: `toml` and `json`.
+        - updates(dict): new values of the updated keys. Keys set to None are removed.
+
+    Return:
+        (dict): the updated app configuration
+    """
+    text = config_file.read_text(encoding="utf-8")
+    configuration = _parse(config_file, text)
+    for key, value in updates.items():
+        if value is None:
+            configuration.pop(key, None)
+        else:
+            configuration[key] = value
+
+    if _is_json(config_file):
+        new_text = json.dumps(configuration, indent=2 if "\n" in text.strip() else None)
+    else:
+        new_text = _update_toml_text(text, updates)
+
+    _write(config_file, new_text, configuration)
+    return copy.deepcopy(configuration)
+
+
+def _update_toml_text(text: str, updates: dict) -> str:
+    """Return the TOML document `text` with its top level keys set to `updates`,
+    editing it with tomlkit so that the rest of the document is left as it is."""
+    document = tomlkit.parse(text)
+    for key, value in updates.items():
+        current = document.get(key)
+        if value is None:
+            document.pop(key, None)
+        elif isinstance(value, dict) and isinstance(current, Table):
+            # Update the keys of the table in place, keeping their comments
+            for item_key in [item_key for item_key in current if item_key not in value]:
+                del current[item_key]
+            for item_key, item_value in value.items():
+                current[item_key] = item_value
+        else:
+            document[key] = value
+    # Removing the last table can leave blank lines behind
+    new_text = tomlkit.dumps(document)
+    return new_text.rstrip("\n") + "\n" if new_text.strip() else ""
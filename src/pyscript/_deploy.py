@@ -0,0 +1,424 @@
+"""Upload of projects to static hosting, for `pyscript deploy`.
+
+Each destination keeps a manifest with the content hash of every file uploaded
+to it, so a deploy only uploads the files whose hash changed. The manifest is
+updated as the uploads complete, so an interrupted deploy is resumed where it
+stopped; big files are also uploaded in parts that survive interruptions.
+
+Destinations are handled by `DeployBackend` subclasses, chosen by the scheme of
+the destination URL. Plugins can add backends with the `pyscript_deploy_backend`
+hook.
+"""
+
+from __future__ import annotations
+
+import abc
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Iterator, Optional, TypeVar
+from urllib.parse import urlparse
+
+from pyscript import DATA_DIR
+from pyscript._fs import atomic_write_text
+
+MANIFEST_NAME = ".pyscript-deploy.json"
+MANIFEST_VERSION = 1
+# Multipart uploads of unfinished big files, to resume them
+UPLOADS_FILE = DATA_DIR / "deploy-uploads.json"
+READ_CHUNK_SIZE = 1024 * 1024
+# Files bigger than this are uploaded in parts of this size
+PART_SIZE = 8 * 1024 * 1024
+# Seconds between saves of the manifest while uploading
+MANIFEST_SAVE_INTERVAL = 5.0
+
+T = TypeVar("T")
+
+
+class DeployError(Exception):
+    """A deploy failed for a reason that retrying won't fix."""
+
+
+def hash_file(path: Path) -> str:
+    """Returns the hex SHA-256 digest of the contents of a file."""
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        while chunk := fp.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_type(key: str) -> str:
+    if key.endswith(".py"):
+        return "text/x-python"
+    if key.endswith(".toml"):
+        return "application/toml"
+    if key.endswith(".wasm"):
+        return "application/wasm"
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def with_retries(
+    fn: Callable[[], T],
+    retryable: tuple[type[BaseException], ...],
+    attempts: int = 4,
+    delay: float = 0.5,
+) -> T:
+    """
+    Calls `fn` until it succeeds, waiting twice as long after each failure.
+
+    Args:
+        fn(Callable): function to be called.
+        retryable(tuple): exceptions worth retrying, others are raised straight away.
+        attempts(int): maximum number of calls.
+        delay(float): seconds to wait after the first failure.
+
+    Returns:
+        the result of `fn`.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retryable:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay * 2**attempt)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+class DeployBackend(abc.ABC):
+    """Stores the files of a project at a destination."""
+
+    # Scheme of the destination URLs handled by the backend
+    scheme: ClassVar[str]
+    # Errors worth retrying, i.e. network errors
+    retryable_errors: tuple[type[BaseException], ...] = (OSError,)
+
+    def __init__(self, url: str, **options: Any):
+        self.url = url
+
+    @abc.abstractmethod
+    def read(self, key: str) -> Optional[bytes]:
+        """Returns the contents of the object `key`, None if it doesn't exist."""
+
+    @abc.abstractmethod
+    def upload(self, key: str, path: Path, digest: str) -> None:
+        """Uploads the file at `path`, whose SHA-256 is `digest`, as `key`."""
+
+    @abc.abstractmethod
+    def write(self, key: str, data: bytes) -> None:
+        """Writes a small object, i.e. the manifest."""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes the object `key`, if it exists."""
+
+
+class DirectoryBackend(DeployBackend):
+    """Copies the files to a local folder, i.e. one served by a web server."""
+
+    scheme = "file"
+
+    def __init__(self, url: str, **options: Any):
+        super().__init__(url)
+        parsed = urlparse(url)
+        self.root = Path(parsed.path if parsed.scheme == "file" else url)
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def upload(self, key: str, path: Path, digest: str) -> None:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # The partial file is named after the contents, so an interrupted copy is
+        # continued from where it stopped
+        partial = target.with_name(f".{target.name}.{digest[:16]}.part")
+        offset = partial.stat().st_size if partial.exists() else 0
+        with path.open("rb") as src, partial.open("ab") as dst:
+            src.seek(offset)
+            while chunk := src.read(READ_CHUNK_SIZE):
+                dst.write(chunk)
+        os.replace(partial, target)
+
+    def write(self, key: str, data: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.root / key, data.decode("utf-8"))
+
+    def delete(self, key: str) -> None:
+        try:
+            (self.root / key).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend(DeployBackend):
+    """
+    Uploads the files to a bucket of Amazon S3 or of a compatible service (i.e.
+    MinIO, Cloudflare R2), using the credentials found by boto3.
+    """
+
+    scheme = "s3"
+
+    def __init__(
+        self,
+        url: str,
+        endpoint_url: Optional[str] = None,
+        client: Any = None,
+        **options: Any,
+    ):
+        super().__init__(url)
+        parsed = urlparse(url)
+        self.bucket = parsed.netloc
+        self.prefix = parsed.path.strip("/")
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise DeployError(
+                    "S3 destinations need boto3. Install it with `pip install boto3`."
+                )
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self._uploads_lock = threading.Lock()
+
+        try:
+            # Errors answered by the service are already retried by boto3 when
+            # it makes sense, i.e. for throttling
+            from botocore.exceptions import BotoCoreError
+
+            self.retryable_errors = (OSError, BotoCoreError)
+        except ImportError:  # pragma: no cover
+            pass
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @contextmanager
+    def _service_errors(self, key: str) -> Iterator[None]:
+        """Raises the errors answered by the service, i.e. a missing bucket or
+        denied access, as DeployError."""
+        try:
+            yield
+        except self.client.exceptions.ClientError as e:
+            raise DeployError(f"s3://{self.bucket}/{self._key(key)}: {e}") from e
+
+    def read(self, key: str) -> Optional[bytes]:
+        with self._service_errors(key):
+            try:
+                response = self.client.get_object(
+                    Bucket=self.bucket, Key=self._key(key)
+                )
+            except self.client.exceptions.NoSuchKey:
+                return None
+            return response["Body"].read()
+
+    def write(self, key: str, data: bytes) -> None:
+        with self._service_errors(key):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(key),
+                Body=data,
+                ContentType=content_type(key),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._service_errors(key):
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def upload(self, key: str, path: Path, digest: str) -> None:
+        with self._service_errors(key):
+            self._upload(key, path, digest)
+
+    def _upload(self, key: str, path: Path, digest: str) -> None:
+        if path.stat().st_size <= PART_SIZE:
+            with path.open("rb") as fp:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=self._key(key),
+                    Body=fp,
+                    ContentType=content_type(key),
+                )
+        else:
+            self._upload_in_parts(key, path, digest)
+
+    def _upload_in_parts(self, key: str, path: Path, digest: str) -> None:
+        s3_key = self._key(key)
+        upload_key = f"{self.bucket}/{s3_key}"
+        upload_id = self._pending_upload(upload_key, digest)
+        done_parts = {}
+        if upload_id is not None:
+            try:
+                response = self.client.list_parts(
+                    Bucket=self.bucket, Key=s3_key, UploadId=upload_id
+                )
+                done_parts = {
+                    part["PartNumber"]: part["ETag"]
+                    for part in response.get("Parts", [])
+                }
+            except self.client.exceptions.NoSuchUpload:
+                upload_id = None
+        if upload_id is None:
+            upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=s3_key, ContentType=content_type(key)
+            )["UploadId"]
+            self._save_pending_upload(upload_key, digest, upload_id)
+
+        parts = []
+        size = path.stat().st_size
+        with path.open("rb") as fp:
+            for part_number in range(1, (size + PART_SIZE - 1) // PART_SIZE + 1):
+                etag = done_parts.get(part_number)
+                if etag is None:
+                    fp.seek((part_number - 1) * PART_SIZE)
+                    etag = self.client.upload_part(
+                        Bucket=self.bucket,
+                        Key=s3_key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=fp.read(PART_SIZE),
+                    )["ETag"]
+                parts.append({"PartNumber": part_number, "ETag": etag})
+
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        self._save_pending_upload(upload_key, digest, None)
+
+    def _pending_upload(self, upload_key: str, digest: str) -> Optional[str]:
+        with self._uploads_lock:
+            pending = _load_uploads().get(upload_key)
+        if pending and pending["sha256"] == digest:
+            return pending["upload_id"]
+        return None
+
+    def _save_pending_upload(
+        self, upload_key: str, digest: str, upload_id: Optional[str]
+    ) -> None:
+        with self._uploads_lock:
+            uploads = _load_uploads()
+            if upload_id is None:
+                uploads.pop(upload_key, None)
+            else:
+                uploads[upload_key] = {"sha256": digest, "upload_id": upload_id}
+            UPLOADS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(UPLOADS_FILE, json.dumps(uploads))
+
+
+def _load_uploads() -> dict:
+    try:
+        return json.loads(UPLOADS_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def read_manifest(backend: DeployBackend) -> dict[str, str]:
+    """Returns the SHA-256 of the files at the destination, by their key."""
+    data = backend.read(MANIFEST_NAME)
+    if data is None:
+        return {}
+    try:
+        manifest = json.loads(data)
+    except ValueError:
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def write_manifest(backend: DeployBackend, files: dict[str, str]) -> None:
+    manifest = {"version": MANIFEST_VERSION, "files": dict(sorted(files.items()))}
+    backend.write(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def deploy_files(
+    backend: DeployBackend,
+    files: dict[str, Path],
+    jobs: Optional[int] = None,
+    delete: bool = False,
+    dry_run: bool = False,
+    on_upload: Optional[Callable[[str], None]] = None,
+) -> tuple[list[str], list[str]]:
+    """
+    Uploads the files whose contents differ from the ones at the destination.
+
+    Pages are uploaded last, so that they never reference files that haven't
+    been uploaded yet.
+
+    Args:
+        backend(DeployBackend): the destination.
+        files(dict[str, Path]): the files to be deployed, by their key.
+        jobs(int): number of files hashed and uploaded in parallel.
+        delete(bool): delete the files at the destination that aren't in `files`.
+        dry_run(bool): only return what would be uploaded and deleted.
+        on_upload(Callable): called with the key of each uploaded file.
+
+    Returns:
+        tuple(list[str], list[str]): the keys of the uploaded and deleted files.
+
+    Raises:
+        DeployError: if some of the files couldn't be uploaded.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        digests = dict(zip(files, executor.map(hash_file, files.values())))
+    deployed = read_manifest(backend)
+    changed = sorted(
+        key for key, digest in digests.items() if deployed.get(key) != digest
+    )
+    stale = sorted(key for key in deployed if key not in digests) if delete else []
+    if dry_run:
+        return changed, stale
+
+    lock = threading.Lock()
+    last_save = time.monotonic()
+
+    def upload(key: str) -> None:
+        nonlocal last_save
+        with_retries(
+            lambda: backend.upload(key, files[key], digests[key]),
+            backend.retryable_errors,
+        )
+        with lock:
+            deployed[key] = digests[key]
+            if time.monotonic() - last_save > MANIFEST_SAVE_INTERVAL:
+                write_manifest(backend, deployed)
+                last_save = time.monotonic()
+        if on_upload is not None:
+            on_upload(key)
+
+    failed: dict[str, BaseException] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pages = [key for key in changed if key.endswith(".html")]
+            for batch in ([key for key in changed if key not in pages], pages):
+                futures = {executor.submit(upload, key): key for key in batch}
+                for future in as_completed(futures):
+                    if (error := future.exception()) is not None:
+                        failed[futures[future]] = error
+                if failed:
+                    break
+
+        if not failed:
+            for key in stale:
+                with_retries(lambda: backend.delete(key), backend.retryable_errors)
+                del deployed[key]
+    finally:
+        with_retries(
+            lambda: write_manifest(backend, deployed), backend.retryable_errors
+        )
+
+    if failed:
+        errors = "\n".join(f"{key}: {error}" for key, error in sorted(failed.items()))
+        raise DeployError(f"{len(failed)} files couldn't be uploaded:\n{errors}")
+    return changed, stale
@@ -0,0 +1,266 @@
+"""Filesystem helpers shared by the commands."""
+
+from __future__ import annotations
+
+import errno
+import fnmatch
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+
+if sys.platform == "win32":  # pragma: no cover
+    import msvcrt
+else:
+    import fcntl
+
+# ioctl cloning a file on Linux filesystems with copy on write, i.e. btrfs or XFS
+FICLONE = 0x40049409
+# Bytes copied by each call to copy_file_range
+COPY_RANGE_SIZE = 64 * 1024 * 1024
+
+
+def _read_umask() -> int:
+    # The umask can only be read by setting it, which changes it for all the
+    # threads, so it's read once, when the module is imported
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+def _umask_mode(mode: int) -> int:
+    """Returns `mode` filtered by the umask, like `open` and `mkdir` do."""
+    return mode & ~_UMASK
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    """
+    Writes `text` to `path` so that readers see either the old or the new contents,
+    never a partially written file, even if the process is interrupted.
+
+    Args:
+        path(Path): path of the file to be written.
+        text(str): new contents of the file.
+        encoding(str): encoding of the file.
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as fp:
+            fp.write(text)
+            fp.flush()
+            os.fsync(fp.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp_name)
+        else:
+            # mkstemp creates files only readable by their owner
+            os.chmod(tmp_name, _umask_mode(0o666))
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive lock on `path` for the duration of the block, waiting for
+    other processes holding it to release it first. The lock is taken on a
+    separate `<path>.lock` file, so `path` itself can be replaced meanwhile.
+
+    Args:
+        path(Path): path of the file to be locked.
+    """
+    lock_path = path.with_name(f"{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a+b") as fp:
+        if sys.platform == "win32":  # pragma: no cover
+            # LK_LOCK gives up after 10 attempts, one per second
+            while True:
+                try:
+                    msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                fp.seek(0)
+                msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_directory(path: Path, lock: Optional[Path] = None) -> Iterator[Path]:
+    """
+    Yields a temporary folder to be filled in place of `path`, which is renamed to
+    `path` when the block completes and removed if the block fails. So `path`
+    either doesn't exist or is complete, even if the process is interrupted.
+
+    Args:
+        path(Path): path of the folder to be created.
+        lock(Path): file locked while the folder is moved into place, so that
+                    processes creating the same folder don't overwrite each other.
+
+    Raises:
+        FileExistsError: if `path` already exists.
+    """
+
+    def check_free():
+        if os.path.lexists(path):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(path))
+
+    check_free()
+    tmp_dir = Path(
+        tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    )
+    try:
+        yield tmp_dir
+        # mkdtemp creates folders only accessible by their owner
+        os.chmod(tmp_dir, _umask_mode(0o777))
+        with file_lock(lock) if lock is not None else nullcontext():
+            check_free()
+            os.rename(tmp_dir, path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _reflink(src: BinaryIO, dst: BinaryIO) -> bool:
+    if sys.platform != "linux":
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src: BinaryIO, dst: BinaryIO) -> bool:
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+    try:
+        while copy_file_range(src.fileno(), dst.fileno(), COPY_RANGE_SIZE):
+            pass
+    except OSError:
+        # i.e. not supported between these filesystems: start again
+        dst.truncate(0)
+        src.seek(0)
+        dst.seek(0)
+        return False
+    return True
+
+
+def fast_copy(src: Path, dst: Path, link: bool = False) -> str:
+    """
+    Copies a file with the fastest method the filesystems allow: a clone sharing
+    the blocks of `src` until either file changes (reflink), then an in-kernel
+    copy (copy_file_range), then a regular copy. The permissions are copied too.
+
+    Args:
+        src(Path): file to be copied.
+        dst(Path): path of the copy.
+        link(bool): create a hard link instead when possible, so that both paths
+                    are the same file and changes to one show in the other.
+
+    Returns:
+        str: the method used: "link", "reflink", "copy_file_range" or "copy".
+    """
+    if link:
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass
+
+    method = "copy"
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        if _reflink(fsrc, fdst):
+            method = "reflink"
+        elif _copy_file_range(fsrc, fdst):
+            method = "copy_file_range"
+    if method == "copy":
+        # Uses sendfile or fcopyfile where available
+        shutil.copyfile(src, dst)
+    shutil.copymode(src, dst)
+    return method
+
+
+def is_ignored(rel_path: PurePosixPath, patterns: Iterable[str]) -> bool:
+    """
+    Returns whether a relative path matches one of the glob `patterns`. Patterns
+    without a `/` match the name of any part of the path, i.e. `__pycache__`,
+    and the other ones match the whole path, i.e. `docs/*.md`.
+    """
+    for pattern in patterns:
+        if "/" in pattern:
+            if fnmatch.fnmatch(rel_path.as_posix(), pattern.strip("/")):
+                return True
+        elif any(fnmatch.fnmatch(part, pattern) for part in rel_path.parts):
+            return True
+    return False
+
+
+def copy_tree(
+    src: Path,
+    dst: Path,
+    ignore: Iterable[str] = (),
+    link: bool = False,
+    max_workers: Optional[int] = None,
+    copy: Optional[Callable[[Path, Path], str]] = None,
+) -> dict[PurePosixPath, str]:
+    """
+    Copies the files of a folder in parallel with `fast_copy`, skipping the ones
+    matching the `ignore` patterns (see `is_ignored`).
+
+    Args:
+        src(Path): folder to be copied.
+        dst(Path): folder the files are copied to, created if needed.
+        ignore(Iterable[str]): glob patterns of the files and folders to skip.
+        link(bool): hard link the files instead of copying them when possible.
+        max_workers(int): number of files copied at once.
+        copy(Callable): if provided, copies each file instead of `fast_copy`,
+                        returning the method used.
+
+    Returns:
+        dict[PurePosixPath, str]: the method used to copy each file, by its path
+                                  relative to `src`.
+    """
+    patterns = list(ignore)
+    files: list[PurePosixPath] = []
+    for root, dirs, names in os.walk(src):
+        rel_root = PurePosixPath(Path(root).relative_to(src).as_posix())
+        dirs[:] = sorted(d for d in dirs if not is_ignored(rel_root / d, patterns))
+        for d in dirs:
+            (dst / rel_root / d).mkdir(parents=True, exist_ok=True)
+        files.extend(
+            rel_root / name
+            for name in sorted(names)
+            if not is_ignored(rel_root / name, patterns)
+        )
+
+    dst.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        methods = executor.map(
+            lambda rel_path: (
+                copy(src / rel_path, dst / rel_path)
+                if copy is not None
+                else fast_copy(src / rel_path, dst / rel_path, link)
+            ),
+            files,
+        )
+        return dict(zip(files, methods))
@@ -1,17 +1,109 @@
+import ast
+import hashlib
 import json
+import shutil
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Sequence
+from urllib.parse import quote
 
 import jinja2
 import requests
-import toml
 
-from pyscript import LATEST_PYSCRIPT_VERSION, config
+from pyscript import CONFIG_FILE, LATEST_PYSCRIPT_VERSION, _store, config
+from pyscript._config import load_config_file, save_config_file
+from pyscript._fs import atomic_directory, copy_tree, fast_copy
+from pyscript._profiling import profiler
 
 _env = jinja2.Environment(loader=jinja2.PackageLoader("pyscript"))
 TEMPLATE_PYTHON_CODE = """# Replace the code below with your own
 print("Hello, world!")
 """
+# Size of the text chunks used when streaming a script into an HTML page.
+CHUNK_SIZE = 64 * 1024
+# Templates used for each supported project type.
+PROJECT_TYPES = {"app": "basic.html", "worker": "worker.html"}
+# Script type PyScript uses for each supported interpreter.
+RUNTIMES = {"pyodide": "py", "micropython": "mpy"}
+# Modules that are available in the MicroPython build shipped with PyScript.
+MICROPYTHON_MODULES = frozenset(
+    {
+        "__future__",
+        "array",
+        "asyncio",
+        "binascii",
+        "builtins",
+        "cmath",
+        "collections",
+        "deflate",
+        "errno",
+        "gc",
+        "hashlib",
+        "heapq",
+        "io",
+        "js",
+        "json",
+        "math",
+        "micropython",
+        "os",
+        "platform",
+        "pyscript",
+        "random",
+        "re",
+        "select",
+        "struct",
+        "sys",
+        "time",
+        "uasyncio",
+        "ubinascii",
+        "ucollections",
+        "uctypes",
+        "uerrno",
+        "uhashlib",
+        "uheapq",
+        "uio",
+        "ujson",
+        "uos",
+        "urandom",
+        "ure",
+        "uselect",
+        "ustruct",
+        "usys",
+        "utime",
+    }
+)
+PYSCRIPT_RELEASES_URL = "https://pyscript.net/releases"
+# Where PyScript fetches the interpreters from and where micropip fetches
+# packages that are not part of the Pyodide distribution from.
+RUNTIME_ORIGIN = "https://cdn.jsdelivr.net"
+# Pyodide release used by default by PyScript.
+DEFAULT_PYODIDE_VERSION = "0.25.0"
+PACKAGE_ORIGINS = ["https://pypi.org", "https://files.pythonhosted.org"]
+# Origins whose files never change for a given URL, served by the generated
+# service workers from their cache first
+IMMUTABLE_ORIGINS = [
+    "https://pyscript.net",
+    RUNTIME_ORIGIN,
+    "https://files.pythonhosted.org",
+]
+SERVICE_WORKER_FILENAME = "sw.js"
+# Files and folders never copied from the source folder of a project
+DEFAULT_IGNORED = [
+    ".*",
+    "__pycache__",
+    "*.py[cod]",
+    "*.egg-info",
+    "node_modules",
+    "venv",
+]
+# Build outputs, only ignored at the root of a source folder which isn't a package,
+# as packages can have subpackages with these names
+DEFAULT_ROOT_IGNORED = ["/build", "/dist"]
+
+
+def pyodide_base_url(version: str) -> str:
+    """Return the URL of the folder of the CDN serving the files of a Pyodide release,
+    with a trailing slash."""
+    return f"{RUNTIME_ORIGIN}/pyodide/v{version}/full/"
 
 
 def create_project_html(
@@ -21,6 +113,10 @@ def create_project_html(
     output_file_path: Path,
     pyscript_version: str,
     template: str = "basic.html",
+    python_code: Optional[Iterable[str]] = None,
+    project_config: Optional[dict] = None,
+    runtime: str = "pyodide",
+    service_worker: Optional[str] = None,
 ) -> None:
     """Write a Python script string to an HTML file template.
 
@@ -32,40 +128,226 @@ def create_project_html(
         - output_file_path (Path): path where to write the new html file
         - pyscript_version (str): version of pyscript to be used
         - template (str): name of the template to be used
+        - python_code (Iterable[str]): if provided, chunks of Python code to be
+            embedded inline in the html instead of loading `python_file_path`
+        - project_config (dict): app configuration, used to generate resource hints
+            for the files and packages it declares. It is embedded inline instead of
+            loading `config_file_path` when `python_code` is provided
+        - runtime (str): name of the interpreter that runs the app
+        - service_worker (str): if provided, path of the service worker registered
+            by the page
 
     Output:
         (None)
     """
     template_instance = _env.get_template(template)
+    embedded = python_code is not None
+    resource_hints = get_resource_hints(
+        pyscript_version,
+        None if embedded else python_file_path,
+        None if embedded else config_file_path,
+        project_config or {},
+    )
 
-    with output_file_path.open("w") as fp:
-        fp.write(
-            template_instance.render(
+    # Stream the rendered template straight into the output file so that we
+    # never hold the whole page in memory, regardless of how big it gets.
+    with output_file_path.open("w") as fp, profiler.phase("render template"):
+        fp.writelines(
+            template_instance.generate(
                 python_file_path=python_file_path,
                 config_file_path=config_file_path,
                 title=title,
                 pyscript_version=pyscript_version,
+                python_code=python_code,
+                inline_config=(
+                    json.dumps(project_config) if embedded and project_config else None
+                ),
+                resource_hints=resource_hints,
+                script_type=RUNTIMES[runtime],
+                service_worker=service_worker,
             )
         )
 
 
-def save_config_file(config_file: Path, configuration: dict):
-    """Write an app configuration dict to `config_file`.
+def get_resource_hints(
+    pyscript_version: str,
+    python_file_path: Optional[str],
+    config_file_path: Optional[str],
+    project_config: dict,
+) -> list[dict]:
+    """Return the resource hints that let the browser start fetching everything an
+    app needs to boot while it's still parsing the page, instead of discovering it
+    only after PyScript has been loaded.
 
     Params:
+        - pyscript_version (str): version of pyscript used by the app
+        - python_file_path (str): path of the main python file, if loaded from a file
+        - config_file_path (str): path of the config file, if loaded from a file
+        - project_config (dict): app configuration
+
+    Output:
+        (list[dict]): hints, each one with "rel" and "href" keys and optionally
+            "as" and "crossorigin" keys, as they should be set on a <link> tag
+    """
+    hints: list[dict] = [
+        {"rel": "preconnect", "href": RUNTIME_ORIGIN, "crossorigin": True},
+        {
+            "rel": "modulepreload",
+            "href": f"{PYSCRIPT_RELEASES_URL}/{pyscript_version}/core.js",
+        },
+    ]
+    # PyScript fetches these with `fetch()`, so they need a matching CORS mode
+    # for the browser to reuse the preloaded responses.
+    fetched = [f"./{path}" for path in (config_file_path, python_file_path) if path]
+
+    files = project_config.get("files", {})
+    packages = project_config.get("packages", [])
+    if isinstance(files, dict):
+        # Paths with {PLACEHOLDERS} are only expanded by PyScript at runtime
+        fetched.extend(url for url in files if "{" not in url)
+    if isinstance(packages, list):
+        wheels = [pkg for pkg in packages if str(pkg).endswith(".whl")]
+        fetched.extend(wheels)
+        if len(wheels) < len(packages):
+            hints.extend(
+                {"rel": "preconnect", "href": origin, "crossorigin": True}
+                for origin in PACKAGE_ORIGINS
+            )
+
+    hints.extend(
+        {"rel": "preload", "href": url, "as": "fetch", "crossorigin": True}
+        for url in fetched
+    )
+    return hints
 
-        - config_file(Path): path configuration file. (i.e.: "pyscript.toml"). Supported
-            formats: `toml` and `json`.
-        - configuration(dict): app configuration to be saved
 
-    Return:
+def create_service_worker(
+    title: str,
+    python_file_path: str,
+    config_file_path: str,
+    html_file_path: str,
+    output_file_path: Path,
+    pyscript_version: str,
+    project_config: dict,
+) -> None:
+    """Write a service worker that precaches the PyScript release and the files of
+    the app, so that repeated visits load from the cache and the app works offline.
+
+    The name of its cache changes with the PyScript version and the config, so that
+    updating them replaces what the browsers cached.
+
+    Params:
+        - title (str): application title
+        - python_file_path (str): path to the python file loaded by the app
+        - config_file_path (str): path to the config file loaded by the app
+        - html_file_path (str): path to the html page of the app
+        - output_file_path (Path): path where to write the service worker
+        - pyscript_version (str): version of pyscript used by the app
+        - project_config (dict): app configuration
+
+    Output:
         (None)
     """
-    with config_file.open("w", encoding="utf-8") as fp:
-        if str(config_file).endswith(".json"):
-            json.dump(configuration, fp)
-        else:
-            toml.dump(configuration, fp)
+    output_file_path.write_text(
+        render_service_worker(
+            title,
+            python_file_path,
+            config_file_path,
+            html_file_path,
+            pyscript_version,
+            project_config,
+        ),
+        encoding="utf-8",
+    )
+
+
+def render_service_worker(
+    title: str,
+    python_file_path: str,
+    config_file_path: str,
+    html_file_path: str,
+    pyscript_version: str,
+    project_config: dict,
+) -> str:
+    """Return the code of the service worker written by `create_service_worker`.
+
+    Params:
+        - title (str): application title
+        - python_file_path (str): path to the python file loaded by the app
+        - config_file_path (str): path to the config file loaded by the app
+        - html_file_path (str): path to the html page of the app
+        - pyscript_version (str): version of pyscript used by the app
+        - project_config (dict): app configuration
+
+    Output:
+        (str): the code of the service worker
+    """
+    hints = get_resource_hints(
+        pyscript_version, python_file_path, config_file_path, project_config
+    )
+    precache_urls = ["./"] if html_file_path == "index.html" else []
+    precache_urls += [
+        f"./{html_file_path}",
+        f"{PYSCRIPT_RELEASES_URL}/{pyscript_version}/core.css",
+    ]
+    precache_urls += [
+        hint["href"] for hint in hints if hint["rel"] in ("modulepreload", "preload")
+    ]
+
+    # Cache names are `pyscript:<app>:<version>-<digest>`: the app is quoted to
+    # not contain the separator, so that its caches are told apart from the ones
+    # of other apps of the origin, even when their name starts like its own
+    cache_app = quote(title, safe="")
+    digest = hashlib.sha256(
+        json.dumps([precache_urls, project_config], sort_keys=True).encode()
+    ).hexdigest()[:12]
+    return _env.get_template("sw.js").render(
+        title=title,
+        cache_app=cache_app,
+        cache_name=f"pyscript:{cache_app}:{pyscript_version}-{digest}",
+        precache_urls=precache_urls,
+        immutable_origins=IMMUTABLE_ORIGINS,
+        network_first_origins=[
+            origin for origin in PACKAGE_ORIGINS if origin not in IMMUTABLE_ORIGINS
+        ],
+    )
+
+
+def find_unavailable_micropython_imports(
+    source: str, local_modules: Iterable[str] = ()
+) -> list[str]:
+    """Return the names of the top level modules imported by `source` that are not
+    available in MicroPython, sorted alphabetically.
+
+    Params:
+        - source (str): python code to be checked
+        - local_modules (Iterable[str]): names of the modules shipped with the app,
+            which are always available
+
+    Output:
+        (list[str]): names of the missing modules. Code that cannot be parsed is
+            reported as having no missing modules
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    imported: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imported.add(node.module.split(".")[0])
+
+    return sorted(imported - MICROPYTHON_MODULES - set(local_modules))
+
+
+def _iter_file_chunks(file_path: Path) -> Iterator[str]:
+    """Yield the text contents of `file_path` in chunks of `CHUNK_SIZE` characters."""
+    with file_path.open(encoding="utf-8") as fp:
+        while chunk := fp.read(CHUNK_SIZE):
+            yield chunk
 
 
 def create_project(
@@ -78,6 +360,13 @@ def create_project(
     wrap: bool = False,
     command: Optional[str] = None,
     output: Optional[str] = None,
+    embed: bool = False,
+    runtime: str = "pyodide",
+    offline: bool = False,
+    from_dir: Optional[str] = None,
+    ignore: Sequence[str] = (),
+    link: bool = False,
+    dedupe: bool = False,
 ) -> None:
     """
     New files created:
@@ -85,8 +374,43 @@ def create_project(
     pyscript.toml - project metadata and config file
     main.py - a "Hello world" python starter module
     index.html - start page for the project
+
+    When `embed` is used together with `wrap`, the Python code and the
+    configuration are inlined in the HTML page and only that page is created.
+
+    `runtime` selects the interpreter the app runs on: "pyodide" (the default)
+    or "micropython", which is much smaller and starts faster but only supports
+    a subset of the standard library.
+
+    When `offline` is used, a service worker (sw.js) caching the app, the
+    PyScript release, the runtime and the packages is created and registered by
+    the page, making repeated loads much faster and letting the app run offline.
+    It can't be used together with `embed`.
+
+    When `from_dir` is used, the files of that folder are copied into the project
+    and listed in the `files` of its config, so that the app can import and open
+    them. A package (a folder with an `__init__.py`) is copied as a subfolder,
+    any other folder is copied at the root of the project, its `main.py`, if any,
+    becoming the main script, and the settings of its config, if any, i.e. its
+    `packages`, being kept in the config of the project. Files matching
+    `DEFAULT_IGNORED` or the `ignore` glob patterns are skipped, as are the
+    `DEFAULT_ROOT_IGNORED` build outputs at the root of folders that aren't
+    packages, and `link` hard links the files instead of copying them where
+    possible, while `dedupe` links the built artifacts, like wheels, from the
+    shared store of the data folder, so that projects made from the same files
+    share them (see `pyscript._store`). It can't be used together with `wrap`.
+
+    The project folder appears complete or not at all: it is generated in a
+    temporary folder and renamed into place, raising FileExistsError if another
+    process created it meanwhile.
     """
 
+    if from_dir is not None:
+        if wrap:
+            raise ValueError("A folder can't be wrapped in an HTML page")
+        if not Path(from_dir).is_dir():
+            raise ValueError(f"{from_dir} is not a folder")
+
     if wrap:
         if command:
             # app_or_file_name is None in this case
@@ -109,11 +433,18 @@ def create_project(
     if not pyscript_version:
         pyscript_version = _get_latest_pyscript_version()
 
-    if project_type == "app":
-        template = "basic.html"
+    if project_type in PROJECT_TYPES:
+        template = PROJECT_TYPES[project_type]
     else:
+        valid_types = ", ".join(f"'{name}'" for name in PROJECT_TYPES)
         raise ValueError(
-            f"Unknown project type: {project_type}. Valid values are: 'app'"
+            f"Unknown project type: {project_type}. Valid values are: {valid_types}"
+        )
+
+    if runtime not in RUNTIMES:
+        valid_runtimes = ", ".join(f"'{name}'" for name in RUNTIMES)
+        raise ValueError(
+            f"Unknown runtime: {runtime}. Valid values are: {valid_runtimes}"
         )
 
     context = {
@@ -124,21 +455,152 @@ def create_project(
         "author_email": author_email,
         "version": "latest",
     }
+    if runtime != "pyodide":
+        # Let other commands know which interpreter the app targets
+        context["runtime"] = runtime
 
-    app_dir = Path(".") / app_name
-    app_dir.mkdir()
-    manifest_file = app_dir / config["project_config_filename"]
+    # The project is generated in a temporary folder that is moved into place
+    # when complete, so that interrupted or concurrent runs don't leave half
+    # written projects behind
+    with atomic_directory(Path(".") / app_name, lock=CONFIG_FILE) as app_dir:
+        _write_project_files(
+            app_dir,
+            app_name,
+            app_or_file_name,
+            context,
+            pyscript_version,
+            template,
+            wrap,
+            command,
+            output,
+            embed,
+            runtime,
+            offline,
+            from_dir,
+            list(ignore),
+            link,
+            dedupe,
+        )
 
-    save_config_file(manifest_file, context)
+
+def _copy_to_store(src: Path, dst: Path) -> str:
+    if not _store.is_shareable(src):
+        return fast_copy(src, dst)
+    return "store" if _store.install_file(src, dst) else "copy"
+
+
+def _copy_source_dir(
+    app_dir: Path,
+    from_dir: Path,
+    ignore: list[str],
+    link: bool,
+    dedupe: bool,
+    generated: list[str],
+) -> dict[str, str]:
+    """Copy the files of `from_dir` into the project and return its `files` config."""
+    if (from_dir / "__init__.py").is_file():
+        target = app_dir / from_dir.resolve().name
+    else:
+        target = app_dir
+        # The files generated for the project take precedence
+        ignore = DEFAULT_ROOT_IGNORED + ignore + [f"/{name}" for name in generated]
+    with profiler.phase("copy source folder"):
+        copied = copy_tree(
+            from_dir,
+            target,
+            DEFAULT_IGNORED + ignore,
+            link,
+            copy=_copy_to_store if dedupe else None,
+        )
+
+    files = {}
+    for rel_path in copied:
+        url = (target / rel_path).relative_to(app_dir).as_posix()
+        # The main script is loaded by the page
+        if url != config["project_main_filename"]:
+            files[f"./{url}"] = f"./{url}"
+    return files
+
+
+def _load_source_config(from_dir: Path) -> dict:
+    """Return the config of the project in `from_dir`, if it's copied as the root
+    of the new project, or an empty config."""
+    config_file = from_dir / config["project_config_filename"]
+    if (from_dir / "__init__.py").is_file() or not config_file.is_file():
+        return {}
+    return load_config_file(config_file)
+
+
+def _write_project_files(
+    app_dir: Path,
+    app_name: str,
+    app_or_file_name: Optional[str],
+    context: dict,
+    pyscript_version: str,
+    template: str,
+    wrap: bool,
+    command: Optional[str],
+    output: Optional[str],
+    embed: bool,
+    runtime: str,
+    offline: bool,
+    from_dir: Optional[str] = None,
+    ignore: Optional[list[str]] = None,
+    link: bool = False,
+    dedupe: bool = False,
+) -> None:
     output_path = app_dir / "index.html" if output is None else app_dir / output
 
+    if wrap and embed:
+        python_code: Iterable[str]
+        if command:
+            python_code = [command]
+        else:
+            assert app_or_file_name is not None
+            python_code = _iter_file_chunks(Path(app_or_file_name))
+
+        create_project_html(
+            app_name,
+            config["project_main_filename"],
+            config["project_config_filename"],
+            output_path,
+            pyscript_version=pyscript_version,
+            template=template,
+            python_code=python_code,
+            project_config=context,
+            runtime=runtime,
+        )
+        return
+
+    if from_dir is not None:
+        generated = [config["project_config_filename"], output_path.name]
+        if offline:
+            generated.append(SERVICE_WORKER_FILENAME)
+        files = _copy_source_dir(
+            app_dir, Path(from_dir), ignore or [], link, dedupe, generated
+        )
+        source_config = _load_source_config(Path(from_dir))
+        # The interpreter is the one given to create
+        source_config.pop("runtime", None)
+        # The settings of the source project, i.e. its packages or snapshot, are
+        # kept, so that the page is generated with the config it will load
+        source_files = source_config.get("files", {})
+        if isinstance(source_files, dict):
+            files.update(source_files)
+        context = {**source_config, **context}
+        if files:
+            context["files"] = files
+
+    manifest_file = app_dir / config["project_config_filename"]
+    save_config_file(manifest_file, context)
+
     python_filepath = app_dir / "main.py"
 
     if not wrap:
         if app_or_file_name and app_or_file_name.endswith(".py"):
-            python_filepath.write_bytes(Path(app_or_file_name).read_bytes())
-        else:
-            # Save the new python file
+            shutil.copyfile(app_or_file_name, python_filepath)
+        elif not python_filepath.exists():
+            # Save the new python file, unless copied from the source folder
             with python_filepath.open("w", encoding="utf-8") as fp:
                 fp.write(TEMPLATE_PYTHON_CODE)
     else:
@@ -147,7 +609,22 @@ def create_project(
                 fp.write(command)
         else:
             assert app_or_file_name is not None
-            python_filepath.write_bytes(Path(app_or_file_name).read_bytes())
+            # copyfile copies in chunks (or with sendfile/fcopyfile where the
+            # platform allows), so memory use doesn't grow with the input size
+            shutil.copyfile(app_or_file_name, python_filepath)
+
+    service_worker = None
+    if offline:
+        service_worker = SERVICE_WORKER_FILENAME
+        create_service_worker(
+            app_name,
+            config["project_main_filename"],
+            config["project_config_filename"],
+            output_path.name,
+            app_dir / service_worker,
+            pyscript_version,
+            context,
+        )
 
     create_project_html(
         app_name,
@@ -156,6 +633,9 @@ def create_project(
         output_path,
         pyscript_version=pyscript_version,
         template=template,
+        project_config=context,
+        runtime=runtime,
+        service_worker=service_worker,
     )
 
 
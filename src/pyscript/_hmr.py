@@ -0,0 +1,327 @@
+"""Hot module replacement for the apps served by `pyscript run --hmr`.
+
+The server watches the Python files of the project and pushes the source of the
+changed ones to the pages through server-sent events. A small script injected
+in the served pages receives them and, in the interpreters already running on
+the main thread, writes the new source to the virtual filesystem and reloads the
+module. Modules are written where the `files` of the config put them, and the
+changes that can't be applied this way (to the main script, the config, the
+pages, modules that aren't loaded or apps running in workers) reload the page
+instead.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import posixpath
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from pyscript._config import load_config_file
+from pyscript._project import is_local_url, parse_page, resolve_local_url
+
+HMR_PATH = "/__pyscript_hmr__"
+# Besides these, hidden folders are not watched
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+WATCHED_SUFFIXES = {".py", ".html", ".toml", ".json"}
+# Seconds between keep-alive comments sent to idle clients
+KEEPALIVE_INTERVAL = 15
+
+_CORE_JS = re.compile(r"""<script[^>]+src=["']([^"']*/core\.js)["']""", re.IGNORECASE)
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+# Client script: the changed module is written to the virtual filesystem and
+# reloaded by a snippet of Python code, which gets its arguments as a JSON list,
+# i.e. a valid Python literal. Modules that aren't loaded reload the page, as
+# they may be imported under another name.
+CLIENT_SCRIPT = """
+<script type="module">
+const wrappers = [];
+const core = %(core_url)s;
+if (core) {
+  const { hooks } = await import(core);
+  hooks.main.onReady.add((wrap) => wrappers.push(wrap));
+}
+const reloadModule = `
+import sys
+_name, _path, _source = %%s
+with open(_path, "w") as _f:
+    _f.write(_source)
+if _name not in sys.modules:
+    raise ImportError(f"{_name} is not loaded")
+try:
+    import importlib
+    importlib.invalidate_caches()
+    importlib.reload(sys.modules[_name])
+except ImportError:
+    # i.e. MicroPython has no importlib.reload
+    del sys.modules[_name]
+    __import__(_name)
+del _name, _path, _source, _f
+`;
+const events = new EventSource("%(hmr_path)s");
+events.onmessage = (event) => {
+  const change = JSON.parse(event.data);
+  if (change.reload || !wrappers.length) {
+    location.reload();
+    return;
+  }
+  const args = JSON.stringify([change.module, change.path, change.source]);
+  for (const wrap of wrappers) {
+    try {
+      wrap.run(reloadModule.replace("%%s", () => args));
+      console.info(`[pyscript hmr] reloaded ${change.module}`);
+    } catch (error) {
+      console.error(`[pyscript hmr] couldn't reload ${change.module}`, error);
+      location.reload();
+    }
+  }
+};
+</script>
+"""
+
+
+def module_name(rel_path: str) -> str:
+    """Returns the name of the module of a Python file, i.e. `pkg.mod` for
+    `pkg/mod.py` and `pkg` for `pkg/__init__.py`."""
+    parts = rel_path[: -len(".py")].split("/")
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def inject_client(html: bytes) -> bytes:
+    """
+    Returns the page `html` with the HMR client script added to its head.
+
+    Args:
+        html(bytes): contents of the page.
+
+    Returns:
+        bytes: contents of the page including the client script.
+    """
+    match = _CORE_JS.search(html.decode("utf-8", errors="replace"))
+    script = CLIENT_SCRIPT % {
+        "core_url": json.dumps(match.group(1) if match else None),
+        "hmr_path": HMR_PATH,
+    }
+    encoded = script.encode("utf-8")
+    head_end = _HEAD_END.search(html)
+    if head_end is None:
+        return html + encoded
+    return html[: head_end.start()] + encoded + html[head_end.start() :]
+
+
+class HotReloader:
+    """
+    Watches the files of a project, polling their modification times, and
+    notifies the subscribed clients of the changes.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        interval: float = 0.5,
+        check: Optional[Callable[[Path], Optional[str]]] = None,
+    ):
+        """
+        Args:
+            folder(Path): folder of the project.
+            interval(float): seconds between two scans of the project files.
+            check(Callable): called with the path of each changed Python file,
+                             returns an error to skip pushing the file.
+        """
+        self.folder = folder
+        self.interval = interval
+        self.check = check
+        self._clients: list[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._mtimes = self._scan()
+        self._thread = threading.Thread(
+            target=self._watch, name="hmr-watcher", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            for client in self._clients:
+                client.put(None)
+
+    def subscribe(self) -> queue.Queue:
+        """Returns a queue receiving the changes, None when the reloader stops."""
+        client: queue.Queue = queue.Queue()
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client: queue.Queue) -> None:
+        with self._lock:
+            self._clients.remove(client)
+
+    def publish(self, change: dict) -> None:
+        with self._lock:
+            for client in self._clients:
+                client.put(change)
+
+    def stream(self, client: queue.Queue, write: Callable[[bytes], None]) -> None:
+        """
+        Writes the changes received by `client` as server-sent events until the
+        reloader stops or the connection is closed.
+
+        Args:
+            client(Queue): queue returned by `subscribe`.
+            write(Callable): writes and flushes data to the connection.
+        """
+        try:
+            while not self._stopped.is_set():
+                try:
+                    change = client.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    write(b": keep-alive\n\n")
+                    continue
+                if change is None:
+                    break
+                write(f"data: {json.dumps(change)}\n\n".encode("utf-8"))
+        except OSError:
+            # The page has been closed or reloaded
+            pass
+        finally:
+            self.unsubscribe(client)
+
+    def _scan(self) -> dict[str, int]:
+        mtimes = {}
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [
+                d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS
+            ]
+            for name in files:
+                if os.path.splitext(name)[1] in WATCHED_SUFFIXES:
+                    path = os.path.join(root, name)
+                    try:
+                        mtimes[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass
+        return mtimes
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            mtimes = self._scan()
+            changed = [
+                path
+                for path, mtime in mtimes.items()
+                if self._mtimes.get(path) != mtime
+            ]
+            deleted = self._mtimes.keys() - mtimes.keys()
+            self._mtimes = mtimes
+            if changed or deleted:
+                change = (
+                    {"reload": True}
+                    if deleted
+                    else self.describe_changes([Path(path) for path in changed])
+                )
+                if change is not None:
+                    self.publish(change)
+
+    def _entry_scripts(self) -> set[Path]:
+        """Returns the Python files run by the pages, rather than imported."""
+        scripts = set()
+        for html_path in self.folder.rglob("*.html"):
+            try:
+                page = parse_page(html_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            for url in page.python_urls:
+                if is_local_url(url):
+                    scripts.add(resolve_local_url(html_path.parent, url).resolve())
+        return scripts
+
+    def _file_destinations(self) -> dict[Path, Optional[str]]:
+        """Returns the paths the `files` of the configs of the pages are written
+        to in the virtual filesystem, by the project file they are fetched from.
+        The paths that can't be known are None, i.e. the ones of archives."""
+        destinations: dict[Path, Optional[str]] = {}
+        for html_path in self.folder.rglob("*.html"):
+            try:
+                page = parse_page(html_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            project_configs = list(page.inline_configs)
+            for config_url in page.config_urls:
+                try:
+                    project_configs.append(
+                        load_config_file(
+                            resolve_local_url(html_path.parent, config_url)
+                        )
+                    )
+                except (OSError, ValueError):
+                    continue
+            for project_config in project_configs:
+                files = project_config.get("files", {})
+                if not isinstance(files, dict):
+                    continue
+                for url, destination in files.items():
+                    if not is_local_url(url) or "{" in url:
+                        continue
+                    source = resolve_local_url(html_path.parent, url).resolve()
+                    destination = str(destination)
+                    if not destination or destination.endswith("/"):
+                        # The file keeps its name
+                        destination += url.rsplit("/", 1)[-1]
+                    destinations[source] = (
+                        None
+                        if "{" in destination or destination.endswith("/*")
+                        else posixpath.normpath(destination)
+                    )
+        return destinations
+
+    def describe_changes(self, paths: list[Path]) -> Optional[dict]:
+        """
+        Returns the change to be sent to the clients for the files changed, None
+        if there is nothing to be sent.
+
+        Args:
+            paths(list[Path]): the changed files.
+
+        Returns:
+            dict: either `{"reload": True}` or the module to be replaced, with
+                  its `module` name, `path` in the virtual filesystem, i.e. the
+                  destination given in the `files` of the config or else the path
+                  relative to the project, and `source`.
+        """
+        python_paths = [path for path in paths if path.suffix == ".py"]
+        if len(python_paths) != 1 or len(paths) != 1:
+            # Several files changed at once (i.e. a branch switch), or files that
+            # can only be applied reloading the page
+            return {"reload": True}
+
+        path = python_paths[0]
+        if path.resolve() in self._entry_scripts():
+            return {"reload": True}
+        if self.check is not None:
+            error = self.check(path)
+            if error:
+                # Wait until the code is fixed
+                return None
+        try:
+            source = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return {"reload": True}
+        destinations = self._file_destinations()
+        if path.resolve() in destinations:
+            vfs_path = destinations[path.resolve()]
+            if vfs_path is None or vfs_path.startswith("/"):
+                # Not importable from the working directory
+                return {"reload": True}
+        else:
+            vfs_path = path.relative_to(self.folder).as_posix()
+        if not vfs_path.endswith(".py"):
+            return {"reload": True}
+        return {"module": module_name(vfs_path), "path": vfs_path, "source": source}
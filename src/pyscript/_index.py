@@ -0,0 +1,212 @@
+"""Discovery of the PyScript projects in big folder trees.
+
+Folders are listed in parallel with `os.scandir`, skipping the folders ignored
+by `.gitignore` files and the usual tool and dependency folders. What has been
+found is saved in `DATA_DIR`, together with the modification time of each
+folder, so that the next searches of the same tree only list the folders that
+changed since.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from pyscript import DATA_DIR, config
+from pyscript._fs import atomic_write_text
+
+INDEX_DIR = DATA_DIR / "index"
+# Bump when the format of the saved index changes
+INDEX_VERSION = 1
+# Besides these, hidden folders (i.e. .git, .venv) are always ignored
+IGNORED_DIRS = {"__pycache__", "node_modules", "site-packages", "venv"}
+
+
+class IgnoreRule(NamedTuple):
+    """A folder pattern from a `.gitignore` file."""
+
+    # Folder of the .gitignore file, relative to the searched root
+    base: str
+    pattern: str
+    # Whether the pattern is matched against the path relative to `base`, rather
+    # than against the folder name
+    anchored: bool
+
+
+def parse_gitignore(text: str, base: str) -> list[IgnoreRule]:
+    """
+    Returns the rules of a `.gitignore` file that may match folders.
+
+    Negated patterns are not supported and are skipped.
+
+    Args:
+        text(str): contents of the .gitignore file.
+        base(str): folder of the .gitignore file, relative to the searched root.
+
+    Returns:
+        list[IgnoreRule]: the ignore rules.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        pattern = line.rstrip("/")
+        anchored = "/" in pattern
+        rules.append(IgnoreRule(base, pattern.lstrip("/"), anchored))
+    return rules
+
+
+def is_ignored(rel_path: str, rules: list[IgnoreRule]) -> bool:
+    """Returns whether the folder at `rel_path`, relative to the root, is ignored."""
+    name = rel_path.rsplit("/", 1)[-1]
+    if name.startswith(".") or name in IGNORED_DIRS:
+        return True
+    for rule in rules:
+        if rule.anchored:
+            prefix = f"{rule.base}/" if rule.base else ""
+            if rel_path.startswith(prefix) and fnmatch(
+                rel_path[len(prefix) :], rule.pattern
+            ):
+                return True
+        elif fnmatch(name, rule.pattern):
+            return True
+    return False
+
+
+def _index_file(root: Path) -> Path:
+    digest = hashlib.sha256(str(root).encode()).hexdigest()[:32]
+    return INDEX_DIR / f"{digest}.json"
+
+
+def _load_index(root: Path, marker: str) -> dict:
+    try:
+        with _index_file(root).open() as fp:
+            index = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION or index.get("marker") != marker:
+        return {}
+    return index.get("dirs", {})
+
+
+def _save_index(root: Path, marker: str, dirs: dict) -> None:
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    index = {
+        "version": INDEX_VERSION,
+        "root": str(root),
+        "marker": marker,
+        "dirs": dirs,
+    }
+    atomic_write_text(_index_file(root), json.dumps(index))
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan_dir(path: Path, marker: str, cached: Optional[dict]) -> Optional[dict]:
+    """Returns the index entry of a folder, reusing the cached one if it's current."""
+    mtime = _mtime(path)
+    if mtime is None:
+        return None
+    if cached and cached["mtime"] == mtime:
+        # Editing a .gitignore file in place doesn't change the folder mtime
+        if not cached["has_gitignore"] or (
+            _mtime(path / ".gitignore") == cached["gitignore_mtime"]
+        ):
+            return cached
+
+    subdirs, has_marker, has_gitignore = [], False, False
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name == marker:
+                    has_marker = True
+                elif entry.name == ".gitignore":
+                    has_gitignore = True
+    except OSError:
+        return None
+
+    entry_data = {
+        "mtime": mtime,
+        "subdirs": sorted(subdirs),
+        "has_marker": has_marker,
+        "has_gitignore": has_gitignore,
+        "gitignore_mtime": None,
+        "gitignore": "",
+    }
+    if has_gitignore:
+        gitignore = path / ".gitignore"
+        entry_data["gitignore_mtime"] = _mtime(gitignore)
+        try:
+            entry_data["gitignore"] = gitignore.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            pass
+    return entry_data
+
+
+def find_projects(
+    root: Path,
+    marker: Optional[str] = None,
+    use_index: bool = True,
+    jobs: Optional[int] = None,
+) -> list[Path]:
+    """
+    Returns the folders of the PyScript projects under `root`, identified by a
+    marker file, which defaults to the project config file.
+
+    Args:
+        root(Path): folder to be searched.
+        marker(str): name of the file identifying a project folder.
+        use_index(bool): reuse and update the saved index of `root`.
+        jobs(int): number of folders listed in parallel.
+
+    Returns:
+        list[Path]: the project folders, sorted.
+    """
+    root = root.absolute()
+    marker_name: str = marker or config["project_config_filename"]
+    cached_dirs = _load_index(root, marker_name) if use_index else {}
+    dirs: dict[str, dict] = {}
+    projects = []
+
+    # Folders are listed one level at a time, all the folders of each level in
+    # parallel. Each folder comes with the ignore rules of its parents.
+    level: list[tuple[str, list[IgnoreRule]]] = [("", [])]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while level:
+            scanned = executor.map(
+                lambda item: _scan_dir(
+                    root / item[0], marker_name, cached_dirs.get(item[0])
+                ),
+                level,
+            )
+            next_level = []
+            for (rel_path, rules), entry in zip(level, scanned):
+                if entry is None:
+                    continue
+                dirs[rel_path] = entry
+                if entry["has_marker"]:
+                    projects.append(root / rel_path)
+                if entry["gitignore"]:
+                    rules = rules + parse_gitignore(entry["gitignore"], rel_path)
+                for name in entry["subdirs"]:
+                    child = f"{rel_path}/{name}" if rel_path else name
+                    if not is_ignored(child, rules):
+                        next_level.append((child, rules))
+            level = next_level
+
+    if use_index:
+        _save_index(root, marker_name, dirs)
+    return sorted(projects)
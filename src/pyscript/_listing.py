@@ -0,0 +1,273 @@
+"""Directory listings of the local server, for folders without an `index.html`.
+
+Listing a folder with tens of thousands of files on every request is slow, so
+its entries are read once with `os.scandir` and cached until the modification
+time of the folder changes, i.e. when files are added, removed or renamed. Files
+rewritten in place don't change it: their sizes and dates are the ones of the
+last scan until then, as checking every file would cost as much as listing the
+folder again. Pages only render a slice of the sorted entries, as HTML or JSON.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qs, quote, urlencode
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10_000
+# Folders whose entries are kept in memory
+MAX_CACHED_DIRS = 128
+
+
+class ListingEntry(NamedTuple):
+    name: str
+    is_dir: bool
+    # In bytes, 0 for folders
+    size: int
+    # Modification time, in seconds since the epoch
+    mtime: float
+
+
+SORT_KEYS = {
+    "name": lambda entry: (entry.name.lower(), entry.name),
+    "size": lambda entry: (entry.size, entry.name.lower()),
+    "mtime": lambda entry: (entry.mtime, entry.name.lower()),
+}
+
+
+class ListingQuery(NamedTuple):
+    """Options of a listing, read from the query string of its URL."""
+
+    sort: str = "name"
+    reverse: bool = False
+    page: int = 1
+    per_page: int = DEFAULT_PAGE_SIZE
+    json: bool = False
+
+    def to_query_string(self, **changes) -> str:
+        query = self._replace(**changes)
+        params = {
+            "sort": query.sort,
+            "order": "desc" if query.reverse else "asc",
+            "page": query.page,
+            "per_page": query.per_page,
+        }
+        if query.json:
+            params["format"] = "json"
+        return urlencode(params)
+
+
+def parse_listing_query(query_string: str) -> ListingQuery:
+    """
+    Returns the options of a listing from the query string of its URL, i.e.
+    `sort=size&order=desc&page=2&per_page=100&format=json`.
+
+    Args:
+        query_string(str): the query string, without the leading `?`.
+
+    Returns:
+        ListingQuery: the options of the listing.
+
+    Raises:
+        ValueError: if an option is not valid.
+    """
+    params = {key: values[-1] for key, values in parse_qs(query_string).items()}
+    sort = params.get("sort", "name")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Invalid sort: {sort}. Valid values are: name, size, mtime")
+    order = params.get("order", "asc")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Invalid order: {order}. Valid values are: asc, desc")
+    output_format = params.get("format", "html")
+    if output_format not in ("html", "json"):
+        raise ValueError(
+            f"Invalid format: {output_format}. Valid values are: html, json"
+        )
+    page = params.get("page", "1")
+    per_page = params.get("per_page", str(DEFAULT_PAGE_SIZE))
+    if not page.isdigit() or int(page) < 1:
+        raise ValueError(f"Invalid page: {page}")
+    if not per_page.isdigit() or not 1 <= int(per_page) <= MAX_PAGE_SIZE:
+        raise ValueError(
+            f"Invalid per_page: {per_page}. It must be between 1 and {MAX_PAGE_SIZE}"
+        )
+    return ListingQuery(
+        sort=sort,
+        reverse=order == "desc",
+        page=int(page),
+        per_page=int(per_page),
+        json=output_format == "json",
+    )
+
+
+def scan_directory(path: Path) -> list[ListingEntry]:
+    """Returns the entries of a folder, following symbolic links."""
+    entries = []
+    with os.scandir(path) as it:
+        for dir_entry in it:
+            try:
+                stat = dir_entry.stat()
+                is_dir = dir_entry.is_dir()
+            except OSError:
+                # i.e. a broken symbolic link
+                entries.append(ListingEntry(dir_entry.name, False, 0, 0.0))
+                continue
+            size = 0 if is_dir else stat.st_size
+            entries.append(ListingEntry(dir_entry.name, is_dir, size, stat.st_mtime))
+    return entries
+
+
+class _CachedListing(NamedTuple):
+    mtime_ns: int
+    # Entries sorted in ascending order, by sort key
+    sorted_entries: dict[str, list[ListingEntry]]
+
+
+class ListingCache:
+    """
+    Entries of the folders listed by the server, cached by path and modification
+    time. The least recently listed folders are dropped first.
+    """
+
+    def __init__(self, max_dirs: int = MAX_CACHED_DIRS):
+        self.max_dirs = max_dirs
+        self._cache: OrderedDict[Path, _CachedListing] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def entries(self, path: Path, sort: str = "name") -> list[ListingEntry]:
+        """
+        Returns the entries of a folder, sorted in ascending order.
+
+        Args:
+            path(Path): path to the folder.
+            sort(str): key the entries are sorted by: name, size or mtime.
+
+        Returns:
+            list[ListingEntry]: the sorted entries, which mustn't be modified.
+
+        Raises:
+            OSError: if the folder can't be read.
+        """
+        # Read before scanning, so that changes made meanwhile trigger a new scan
+        mtime_ns = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self._cache.move_to_end(path)
+                if sort in cached.sorted_entries:
+                    return cached.sorted_entries[sort]
+                entries = next(iter(cached.sorted_entries.values()))
+            else:
+                cached = None
+
+        if cached is None:
+            cached = _CachedListing(mtime_ns, {})
+            entries = scan_directory(path)
+        sorted_entries = sorted(entries, key=SORT_KEYS[sort])
+
+        with self._lock:
+            cached.sorted_entries[sort] = sorted_entries
+            self._cache[path] = cached
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.max_dirs:
+                self._cache.popitem(last=False)
+        return sorted_entries
+
+
+def page_of(
+    entries: list[ListingEntry], query: ListingQuery
+) -> tuple[list[ListingEntry], int]:
+    """
+    Returns the entries shown in the page of a listing, and the number of pages.
+
+    Args:
+        entries(list[ListingEntry]): all the entries, sorted in ascending order.
+        query(ListingQuery): options of the listing.
+
+    Returns:
+        tuple(list[ListingEntry], int): the entries of the page and the number
+                                        of pages.
+    """
+    pages = max(1, -(-len(entries) // query.per_page))
+    start = (query.page - 1) * query.per_page
+    end = start + query.per_page
+    if query.reverse:
+        # Slice before reversing, to avoid copying all the entries
+        total = len(entries)
+        return entries[max(0, total - end) : max(0, total - start)][::-1], pages
+    return entries[start:end], pages
+
+
+def render_listing_json(
+    display_path: str, entries: list[ListingEntry], query: ListingQuery
+) -> bytes:
+    """Returns the page of the listing of a folder as JSON."""
+    shown, pages = page_of(entries, query)
+    return json.dumps(
+        {
+            "path": display_path,
+            "total": len(entries),
+            "page": query.page,
+            "pages": pages,
+            "per_page": query.per_page,
+            "entries": [entry._asdict() for entry in shown],
+        }
+    ).encode("utf-8")
+
+
+def render_listing_html(
+    display_path: str, entries: list[ListingEntry], query: ListingQuery
+) -> bytes:
+    """
+    Returns the page of the listing of a folder as HTML, with links to sort the
+    entries and to browse the pages.
+    """
+    shown, pages = page_of(entries, query)
+    title = html.escape(f"Directory listing for {display_path}", quote=False)
+
+    def sort_link(key: str, label: str) -> str:
+        reverse = not query.reverse if key == query.sort else False
+        href = "?" + query.to_query_string(sort=key, reverse=reverse, page=1)
+        return f'<a href="{html.escape(href)}">{label}</a>'
+
+    lines = [
+        "<!DOCTYPE HTML>",
+        '<html lang="en">',
+        "<head>",
+        '<meta charset="utf-8">',
+        f"<title>{title}</title>",
+        "</head>",
+        "<body>",
+        f"<h1>{title}</h1>",
+        f"<p>{len(entries)} entries, page {query.page} of {pages}. Sort by "
+        f"{sort_link('name', 'name')}, {sort_link('size', 'size')}, "
+        f"{sort_link('mtime', 'date')}.</p>",
+        "<hr>",
+        "<ul>",
+    ]
+    for entry in shown:
+        name = entry.name + ("/" if entry.is_dir else "")
+        lines.append(
+            f'<li><a href="{quote(name, errors="surrogatepass")}">'
+            f"{html.escape(name, quote=False)}</a></li>"
+        )
+    lines.append("</ul>")
+    lines.append("<hr>")
+    links = []
+    if query.page > 1:
+        href = "?" + query.to_query_string(page=query.page - 1)
+        links.append(f'<a href="{html.escape(href)}">Previous</a>')
+    if query.page < pages:
+        href = "?" + query.to_query_string(page=query.page + 1)
+        links.append(f'<a href="{html.escape(href)}">Next</a>')
+    if links:
+        lines.append(f"<p>{' '.join(links)}</p>")
+    lines.append("</body>")
+    lines.append("</html>")
+    return "\n".join(lines).encode("utf-8", "surrogateescape")
@@ -0,0 +1,117 @@
+"""Timing of the CLI phases and of the plugin hook calls, for `--profile`.
+
+Timings are always recorded, as they only cost a couple of `perf_counter` calls,
+and they are reported at the end of the command when profiling is enabled. As
+plugins are loaded before the command line is parsed, setting the environment
+variables is the only way to get the plugin loading in the cProfile statistics.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional, Sequence
+
+from pluggy import HookImpl, PluginManager
+from rich.console import Console
+from rich.table import Table
+
+PROFILE_ENV_VAR = "PYSCRIPT_PROFILE"
+PROFILE_OUTPUT_ENV_VAR = "PYSCRIPT_PROFILE_OUTPUT"
+
+
+class Profiler:
+    """Collects how many times each phase ran and how long it took in total."""
+
+    def __init__(self) -> None:
+        # Name of the phase -> [number of calls, total seconds]
+        self.timings: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        # Start times of the hook calls in progress, per thread
+        self._local = threading.local()
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Records how long the block takes under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def monitor_hooks(self, pm: PluginManager) -> None:
+        """Records the duration of every hook call made through `pm`."""
+        pm.add_hookcall_monitoring(self._before_hook, self._after_hook)
+
+    def _before_hook(
+        self, hook_name: str, hook_impls: Sequence[HookImpl], kwargs: Mapping[str, Any]
+    ) -> None:
+        starts = self._local.__dict__.setdefault("starts", [])
+        starts.append(time.perf_counter())
+
+    def _after_hook(
+        self,
+        outcome: Any,
+        hook_name: str,
+        hook_impls: Sequence[HookImpl],
+        kwargs: Mapping[str, Any],
+    ) -> None:
+        start = self._local.starts.pop()
+        plugins = ", ".join(impl.plugin_name for impl in hook_impls)
+        self.record(f"hook {hook_name} ({plugins})", time.perf_counter() - start)
+
+    def start_cprofile(self) -> None:
+        """Starts collecting cProfile statistics of the main thread."""
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def report(self, output: Optional[Path] = None) -> None:
+        """
+        Prints the recorded timings and, if `output` is provided, saves the
+        cProfile statistics to it.
+
+        Args:
+            output(Path): file the cProfile statistics are saved to, in the
+                          format read by `pstats`.
+        """
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            if output is not None:
+                self._cprofile.dump_stats(output)
+
+        table = Table(title="Profile")
+        table.add_column("Phase")
+        table.add_column("Calls", justify="right")
+        table.add_column("Total (ms)", justify="right")
+        table.add_column("Mean (ms)", justify="right")
+        with self._lock:
+            timings = sorted(self.timings.items(), key=lambda item: -item[1][1])
+        for name, (calls, total) in timings:
+            table.add_row(
+                name,
+                str(int(calls)),
+                f"{total * 1000:.1f}",
+                f"{total * 1000 / calls:.2f}",
+            )
+        # Keep the output of the command clean, i.e. for JSON reports
+        Console(stderr=True).print(table)
+        if output is not None:
+            Console(stderr=True).print(f"cProfile statistics saved to {output}")
+
+
+profiler = Profiler()
+
+if os.environ.get(PROFILE_OUTPUT_ENV_VAR):
+    profiler.start_cprofile()
@@ -0,0 +1,133 @@
+"""Helpers to inspect existing PyScript projects."""
+
+from __future__ import annotations
+
+import json
+import os
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+# Values of the `type` attribute of the script tags run by PyScript, and the
+# names of the equivalent custom elements.
+PYTHON_SCRIPT_TYPES = {"py", "mpy"}
+PYTHON_ELEMENTS = {
+    f"{script_type}-script": script_type for script_type in PYTHON_SCRIPT_TYPES
+}
+FETCHED_LINK_RELS = {"stylesheet", "modulepreload", "preload"}
+# Folders of generated files, which are not part of a project
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+
+
+class Page(NamedTuple):
+    """Resources referenced by a PyScript HTML page."""
+
+    # Every resource fetched by the page, in document order, without duplicates
+    urls: list[str]
+    # Python files run by the page
+    python_urls: list[str]
+    # Config files loaded by the page
+    config_urls: list[str]
+    # Configs embedded in the page
+    inline_configs: list[dict]
+    # Script types (i.e. "py" or "mpy") of the Python code run by the page
+    script_types: set[str]
+    # Why each of the embedded configs that can't be parsed is invalid
+    config_errors: list[str]
+
+
+class _PageParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.urls: dict[str, None] = {}
+        self.python_urls: list[str] = []
+        self.config_urls: list[str] = []
+        self.inline_configs: list[dict] = []
+        self.script_types: set[str] = set()
+        self.config_errors: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        attributes = {name: value or "" for name, value in attrs}
+        script_type = PYTHON_ELEMENTS.get(tag)
+        if tag == "script":
+            if attributes.get("type") in PYTHON_SCRIPT_TYPES:
+                script_type = attributes["type"]
+            elif attributes.get("src"):
+                self.urls[attributes["src"]] = None
+        elif tag == "link" and FETCHED_LINK_RELS & set(
+            attributes.get("rel", "").split()
+        ):
+            if attributes.get("href"):
+                self.urls[attributes["href"]] = None
+
+        if script_type is None:
+            return
+
+        self.script_types.add(script_type)
+        if attributes.get("src"):
+            self.python_urls.append(attributes["src"])
+            self.urls[attributes["src"]] = None
+        config = attributes.get("config", "").strip()
+        if config.startswith("{"):
+            try:
+                self.inline_configs.append(json.loads(config))
+            except ValueError as e:
+                self.config_errors.append(f"invalid inline config: {e}")
+        elif config:
+            self.config_urls.append(config)
+            self.urls[config] = None
+
+
+def parse_page(html_path: Path) -> Page:
+    """
+    Returns the resources referenced by the PyScript page at `html_path`.
+
+    Args:
+        html_path(Path): path to the HTML page.
+
+    Returns:
+        Page: the resources referenced by the page.
+    """
+    parser = _PageParser()
+    with html_path.open(encoding="utf-8") as fp:
+        for line in fp:
+            parser.feed(line)
+    parser.close()
+
+    return Page(
+        list(parser.urls),
+        parser.python_urls,
+        parser.config_urls,
+        parser.inline_configs,
+        parser.script_types,
+        parser.config_errors,
+    )
+
+
+def is_local_url(url: str) -> bool:
+    """Returns whether `url` points to a file served with the project."""
+    return "://" not in url and not url.startswith(("//", "data:", "blob:"))
+
+
+def resolve_local_url(base_dir: Path, url: str) -> Path:
+    """Returns the path of the file a relative `url` of a page in `base_dir` points to."""
+    return base_dir / url.split("?")[0].split("#")[0]
+
+
+def iter_project_files(project_dir: Path) -> Iterator[Path]:
+    """
+    Yields the files of a project, in a stable order, skipping hidden folders and
+    folders of generated files.
+
+    Args:
+        project_dir(Path): path to the project folder.
+
+    Returns:
+        Iterator[Path]: the paths of the project files.
+    """
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = sorted(
+            d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS
+        )
+        for name in sorted(files):
+            yield Path(root) / name
@@ -0,0 +1,241 @@
+"""Calls from the apps served by `pyscript run --rpc` to Python on the host.
+
+Plugins register host functions with the `pyscript_rpc_functions` hook. Apps
+call them by posting a batch of calls to `RPC_PATH`, encoded as JSON or, when
+msgpack is installed, as msgpack (which also carries bytes). The calls of a
+batch run in parallel in a pool of processes, so heavy work neither blocks the
+server nor is limited to one core, and the results are answered in the order
+of the calls:
+
+    request:  [{"function": "name", "args": [...], "kwargs": {...}}, ...]
+    response: [{"result": ...} or {"error": "..."}, ...]
+
+Host functions can do anything the user can, so only the apps served can call
+them: the server listens on the loopback interface, answers only requests for a
+local host name (which DNS rebinding can't fake), and requires a token, new on
+each run, that is added to the pages served and must be sent in `TOKEN_HEADER`.
+"""
+
+from __future__ import annotations
+
+import hmac
+import html
+import json
+import re
+import secrets
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Mapping, Optional
+
+RPC_PATH = "/__pyscript_rpc__"
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+# Bigger batches are rejected, to not exhaust the memory of the host
+MAX_BODY_SIZE = 64 * 1024 * 1024
+TOKEN_HEADER = "X-PyScript-RPC-Token"
+# Name of the meta tag the token is added to the pages in
+TOKEN_META_NAME = "pyscript-rpc-token"
+# The server only listens on, and answers requests for, these
+LOCAL_HOST = "127.0.0.1"
+LOCAL_HOSTNAMES = ("localhost", "127.0.0.1")
+
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+
+class RPCError(Exception):
+    """A batch of calls can't be decoded or encoded."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        raise RPCError(
+            "msgpack isn't installed on the host, install it with "
+            "`pip install msgpack` or send JSON.",
+            status=415,
+        )
+    return msgpack
+
+
+def decode_calls(body: bytes, content_type: str) -> list[tuple[str, list, dict]]:
+    """
+    Returns the calls of a batch.
+
+    Args:
+        body(bytes): the body of the request.
+        content_type(str): its content type, JSON_TYPE or MSGPACK_TYPE.
+
+    Returns:
+        list(tuple(str, list, dict)): the name, positional and keyword arguments
+                                      of each call.
+
+    Raises:
+        RPCError: if the batch is not valid.
+    """
+    try:
+        if content_type == MSGPACK_TYPE:
+            batch = _msgpack().unpackb(body)
+        elif content_type == JSON_TYPE:
+            batch = json.loads(body)
+        else:
+            raise RPCError(
+                f"Unsupported content type: {content_type}. "
+                f"Use {JSON_TYPE} or {MSGPACK_TYPE}.",
+                status=415,
+            )
+    except RPCError:
+        raise
+    except Exception as e:
+        raise RPCError(f"Invalid batch: {e}")
+
+    if not isinstance(batch, list):
+        raise RPCError("Invalid batch: expected a list of calls")
+    calls = []
+    for call in batch:
+        if not isinstance(call, dict) or not isinstance(call.get("function"), str):
+            raise RPCError("Invalid call: expected an object with a function name")
+        args = call.get("args", [])
+        kwargs = call.get("kwargs", {})
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise RPCError(f"Invalid arguments in the call of {call['function']}")
+        calls.append((call["function"], args, kwargs))
+    return calls
+
+
+def encode_results(results: list[dict], content_type: str) -> bytes:
+    """Returns the results of a batch, encoded like its calls were."""
+    try:
+        if content_type == MSGPACK_TYPE:
+            return _msgpack().packb(results)
+        return json.dumps(results).encode("utf-8")
+    except (TypeError, ValueError) as e:
+        raise RPCError(f"The results can't be encoded as {content_type}: {e}", 500)
+
+
+def new_token() -> str:
+    """Returns a new random token to authenticate the calls of the apps."""
+    return secrets.token_urlsafe(32)
+
+
+def inject_token(page: bytes, token: str) -> bytes:
+    """
+    Returns the page `page` with the token added to its head, as a meta tag
+    named `TOKEN_META_NAME`.
+
+    Args:
+        page(bytes): contents of the page.
+        token(str): the token of the server.
+
+    Returns:
+        bytes: contents of the page including the token.
+    """
+    meta = f'\n<meta name="{TOKEN_META_NAME}" content="{html.escape(token)}">\n'
+    encoded = meta.encode("utf-8")
+    head_end = _HEAD_END.search(page)
+    if head_end is None:
+        return encoded + page
+    return page[: head_end.start()] + encoded + page[head_end.start() :]
+
+
+def is_local_host(host: Optional[str], port: int) -> bool:
+    """
+    Returns whether the `Host` header of a request names the local server, i.e.
+    `localhost:8000`. Pages of other sites resolving their name to the loopback
+    address (DNS rebinding) send their own name instead.
+
+    Args:
+        host(str): the value of the `Host` header, None if missing.
+        port(int): the port the server listens on.
+
+    Returns:
+        bool: whether the request is for the local server.
+    """
+    if not host:
+        return False
+    host = host.lower()
+    if port == 80 and host in LOCAL_HOSTNAMES:
+        return True
+    return host in {f"{hostname}:{port}" for hostname in LOCAL_HOSTNAMES}
+
+
+def check_call_request(
+    headers: Mapping[str, str], port: int, token: str
+) -> Optional[str]:
+    """
+    Checks that a batch of calls comes from an app served by the local server.
+
+    Args:
+        headers(Mapping): the headers of the request.
+        port(int): the port the server listens on.
+        token(str): the token of the server.
+
+    Returns:
+        str: why the request is rejected, None if it's allowed.
+    """
+    if not is_local_host(headers.get("Host"), port):
+        return "Host not allowed"
+    origin = headers.get("Origin")
+    # Browsers send it on every POST, other clients don't
+    if origin is not None and not (
+        origin.startswith("http://") and is_local_host(origin[len("http://") :], port)
+    ):
+        return f"Origin not allowed: {origin}"
+    sent_token = headers.get(TOKEN_HEADER) or ""
+    if not hmac.compare_digest(sent_token.encode(), token.encode()):
+        return f"Missing or invalid {TOKEN_HEADER} header"
+    return None
+
+
+def _describe_error(error: BaseException) -> str:
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
+
+
+class FunctionPool:
+    """
+    Runs the registered host functions in a pool of processes. The apps must
+    send its `token` with their calls.
+    """
+
+    def __init__(
+        self, functions: dict[str, Callable], max_workers: Optional[int] = None
+    ):
+        self.functions = functions
+        self.token = new_token()
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def call_batch(self, calls: list[tuple[str, list, dict]]) -> list[dict]:
+        """
+        Runs a batch of calls in parallel.
+
+        Args:
+            calls(list): the name, positional and keyword arguments of each call.
+
+        Returns:
+            list(dict): `{"result": ...}` or `{"error": "..."}` for each call.
+        """
+        futures: list[Optional[Future]] = []
+        for name, args, kwargs in calls:
+            function = self.functions.get(name)
+            futures.append(
+                None
+                if function is None
+                else self._executor.submit(function, *args, **kwargs)
+            )
+
+        results = []
+        for (name, _, _), future in zip(calls, futures):
+            if future is None:
+                results.append({"error": f"Unknown function: {name}"})
+            elif (error := future.exception()) is not None:
+                results.append({"error": _describe_error(error)})
+            else:
+                results.append({"result": future.result()})
+        return results
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
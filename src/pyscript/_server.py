@@ -0,0 +1,379 @@
+"""The HTTP server of `pyscript run`, also used to serve apps programmatically,
+i.e. by `pyscript test`.
+
+Requests are handled in parallel threads. Folders without an `index.html` are
+listed from a cache, and the server can check the syntax of the Python files,
+push their changes to the pages, simulate slow networks and run host functions.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import socketserver
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from pyscript import console
+from pyscript._hmr import HMR_PATH, HotReloader, inject_client
+from pyscript._listing import (
+    ListingCache,
+    parse_listing_query,
+    render_listing_html,
+    render_listing_json,
+)
+from pyscript._profiling import profiler
+from pyscript._rpc import (
+    LOCAL_HOST,
+    MAX_BODY_SIZE,
+    RPC_PATH,
+    FunctionPool,
+    RPCError,
+    check_call_request,
+    decode_calls,
+    encode_results,
+    inject_token,
+    is_local_host,
+)
+from pyscript._throttle import Throttle
+
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+
+
+class SyntaxChecker:
+    """
+    Compiles the Python files served to the browser, so that syntax errors are
+    reported as soon as they are requested instead of after the runtime boots.
+    Results are cached by path and modification time.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._cache: dict[Path, tuple[int, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="syntax-check"
+        )
+
+    def check(self, path: Path) -> Optional[str]:
+        """
+        Compiles a Python file, unless it didn't change since its last check.
+
+        Args:
+            path(Path): path to the Python file.
+
+        Returns:
+            str: the description of the syntax error, None if the file is valid.
+        """
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        error = None
+        try:
+            compile(path.read_bytes(), str(path), "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            error = "".join(traceback.format_exception_only(type(e), e))
+        with self._lock:
+            self._cache[path] = (mtime, error)
+        return error
+
+    def warm(self, folder: Path) -> None:
+        """
+        Checks all the Python files in a folder in background threads, reporting
+        the errors found to the console.
+
+        Args:
+            folder(Path): folder to be checked.
+        """
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [
+                d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS
+            ]
+            for name in files:
+                if name.endswith(".py"):
+                    self._executor.submit(self._warm_file, Path(root) / name)
+
+    def _warm_file(self, path: Path) -> None:
+        error = self.check(path)
+        if error:
+            report_syntax_error(path, error)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def report_syntax_error(path: Path, error: str) -> None:
+    console.print(f"Syntax error in {path}:\n{error}", style="red", markup=False)
+
+
+def get_folder_based_http_request_handler(
+    folder: Path,
+    syntax_checker: Optional[SyntaxChecker] = None,
+    hot_reloader: Optional[HotReloader] = None,
+    throttle: Optional[Throttle] = None,
+    function_pool: Optional[FunctionPool] = None,
+) -> type[SimpleHTTPRequestHandler]:
+    """
+    Returns a FolderBasedHTTPRequestHandler with the specified directory.
+    Folders without an `index.html` are listed from a cache, a page at a time.
+
+    Args:
+        folder (str): The folder that will be served.
+        syntax_checker (SyntaxChecker): If provided, Python files with syntax
+                                        errors are answered with an error page.
+        hot_reloader (HotReloader): If provided, its client script is added to
+                                    the HTML pages served, and its changes are
+                                    streamed to them.
+        throttle (Throttle): If provided, the network conditions simulated when
+                             answering the requests.
+        function_pool (FunctionPool): If provided, runs the host functions
+                                      called by posting to `RPC_PATH`. Its token
+                                      is added to the HTML pages served, and
+                                      requests for other hosts are rejected.
+
+    Returns:
+        FolderBasedHTTPRequestHandler: The SimpleHTTPRequestHandler with the
+                                        specified directory.
+    """
+    listing_cache = ListingCache()
+
+    class FolderBasedHTTPRequestHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=folder, **kwargs)
+
+        def handle_one_request(self):
+            self._throttled = False
+            try:
+                with profiler.phase("serve request"):
+                    super().handle_one_request()
+            finally:
+                if self._throttled:
+                    throttle.end_request()
+
+        def parse_request(self):
+            if not super().parse_request():
+                return False
+            # Other sites mustn't read the pages holding the RPC token
+            if function_pool is not None and not is_local_host(
+                self.headers.get("Host"), self.server.server_address[1]
+            ):
+                self.send_error(403, "Host not allowed")
+                return False
+            # The HMR events stream stays open, it mustn't take a connection slot
+            if throttle is not None and self.path != HMR_PATH:
+                throttle.start_request()
+                self._throttled = True
+            return True
+
+        def copyfile(self, source, outputfile):
+            if throttle is None:
+                return super().copyfile(source, outputfile)
+            while chunk := source.read(throttle.CHUNK_SIZE):
+                throttle.wait_to_send(len(chunk))
+                outputfile.write(chunk)
+
+        def do_GET(self):
+            if hot_reloader is not None and self.path == HMR_PATH:
+                client = hot_reloader.subscribe()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                hot_reloader.stream(client, self._write_event)
+                self.close_connection = True
+            else:
+                super().do_GET()
+
+        def do_POST(self):
+            if function_pool is None or urlsplit(self.path).path != RPC_PATH:
+                self.send_error(501, "Unsupported method ('POST')")
+                return
+            error = check_call_request(
+                self.headers, self.server.server_address[1], function_pool.token
+            )
+            if error is not None:
+                self.send_error(403, "RPC call not allowed", error)
+                return
+            content_type = self.headers.get_content_type()
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_SIZE:
+                self.send_error(413, "Batch too large")
+                return
+            try:
+                calls = decode_calls(self.rfile.read(length), content_type)
+                with profiler.phase("rpc calls"):
+                    results = function_pool.call_batch(calls)
+                body = encode_results(results, content_type)
+            except RPCError as e:
+                self.send_error(e.status, "Invalid RPC batch", str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_event(self, data: bytes) -> None:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+        def send_head(self):
+            path = Path(self.translate_path(self.path))
+            if syntax_checker is not None:
+                if path.suffix == ".py" and path.is_file():
+                    error = syntax_checker.check(path)
+                    if error:
+                        report_syntax_error(path, error)
+                        self.send_error(500, "Syntax error", error)
+                        return None
+            if hot_reloader is not None or function_pool is not None:
+                if path.is_dir() and self.path.split("?")[0].endswith("/"):
+                    path = path / "index.html"
+                if path.suffix == ".html" and path.is_file():
+                    html = path.read_bytes()
+                    if hot_reloader is not None:
+                        html = inject_client(html)
+                    if function_pool is not None:
+                        html = inject_token(html, function_pool.token)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(html)))
+                    self.end_headers()
+                    return io.BytesIO(html)
+            return super().send_head()
+
+        def list_directory(self, path):
+            url = urlsplit(self.path)
+            try:
+                query = parse_listing_query(url.query)
+            except ValueError as e:
+                self.send_error(400, "Bad listing options", str(e))
+                return None
+            try:
+                entries = listing_cache.entries(Path(path), query.sort)
+            except OSError:
+                self.send_error(404, "No permission to list directory")
+                return None
+
+            display_path = unquote(url.path, errors="surrogatepass")
+            if query.json:
+                body = render_listing_json(display_path, entries, query)
+                content_type = "application/json"
+            else:
+                body = render_listing_html(display_path, entries, query)
+                content_type = "text/html; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return io.BytesIO(body)
+
+        def end_headers(self):
+            self.send_header("Cross-Origin-Opener-Policy", "same-origin")
+            self.send_header("Cross-Origin-Embedder-Policy", "require-corp")
+            self.send_header("Cross-Origin-Resource-Policy", "cross-origin")
+            self.send_header("Cache-Control", "no-cache, must-revalidate")
+            SimpleHTTPRequestHandler.end_headers(self)
+
+    return FolderBasedHTTPRequestHandler
+
+
+def split_path_and_filename(path: Path) -> tuple[Path, str]:
+    """Receives a path to a pyscript project or file and returns the base
+    path of the project and the filename that should be opened (filename defaults
+    to "" (empty string) if the path points to a folder).
+
+    Args:
+        path (str): The path to the pyscript project or file.
+
+    Returns:
+        tuple(str, str): The base path of the project and the filename
+    """
+    abs_path = path.absolute()
+    if path.is_file():
+        return Path("/".join(abs_path.parts[:-1])), abs_path.parts[-1]
+    else:
+        return abs_path, ""
+
+
+def create_server(
+    folder: Path,
+    port: int,
+    syntax_checker: Optional[SyntaxChecker] = None,
+    hot_reloader: Optional[HotReloader] = None,
+    throttle: Optional[Throttle] = None,
+    function_pool: Optional[FunctionPool] = None,
+) -> socketserver.TCPServer:
+    """
+    Creates a server for the folder specified, handling requests in parallel.
+
+    Args:
+        folder(Path): The folder that will be served.
+        port(int): The port that the server will listen on, 0 for any free port.
+        syntax_checker(SyntaxChecker): If provided, used to check the syntax of
+                                       the Python files before serving them.
+        hot_reloader(HotReloader): If provided, the changes it detects are pushed
+                                   to the pages served.
+        throttle(Throttle): If provided, the network conditions simulated.
+        function_pool(FunctionPool): If provided, runs the host functions called
+                                     by the apps. The server then only listens
+                                     on the loopback interface.
+
+    Returns:
+        socketserver.TCPServer: the server, ready to serve requests.
+    """
+    # We need to set the allow_resuse_address to True because socketserver will
+    # keep the port in use for a while after the server is stopped.
+    # see https://stackoverflow.com/questions/31745040/
+    socketserver.TCPServer.allow_reuse_address = True
+
+    CustomHTTPRequestHandler = get_folder_based_http_request_handler(
+        folder, syntax_checker, hot_reloader, throttle, function_pool
+    )
+    # Host functions can't be called from other computers
+    host = LOCAL_HOST if function_pool is not None else ""
+    server = socketserver.ThreadingTCPServer((host, port), CustomHTTPRequestHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_background(
+    folder: Path,
+    port: int = 0,
+    syntax_checker: Optional[SyntaxChecker] = None,
+    hot_reloader: Optional[HotReloader] = None,
+    throttle: Optional[Throttle] = None,
+    function_pool: Optional[FunctionPool] = None,
+) -> socketserver.TCPServer:
+    """
+    Serves the folder specified from a background thread, i.e. to drive the
+    apps in it programmatically. Call `shutdown()` on the returned server to
+    stop it.
+
+    Args:
+        folder(Path): The folder that will be served.
+        port(int): The port that the server will listen on, 0 for any free port.
+        syntax_checker(SyntaxChecker): If provided, used to check the syntax of
+                                       the Python files before serving them.
+        hot_reloader(HotReloader): If provided, the changes it detects are pushed
+                                   to the pages served.
+        throttle(Throttle): If provided, the network conditions simulated.
+        function_pool(FunctionPool): If provided, runs the host functions called
+                                     by the apps.
+
+    Returns:
+        socketserver.TCPServer: the running server. The port it listens on is
+                                `server.server_address[1]`.
+    """
+    server = create_server(
+        folder, port, syntax_checker, hot_reloader, throttle, function_pool
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,166 @@
+"""Registry of the servers started by `pyscript run`, for `ps` and `stop`.
+
+Each server adds itself to a JSON file in the data folder once it listens, and
+removes itself when it stops. Servers that died without removing themselves,
+i.e. after a crash, are dropped the next time the registry is read.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from pyscript import DATA_DIR
+from pyscript._fs import atomic_write_text, file_lock
+
+REGISTRY_FILE = DATA_DIR / "servers.json"
+# Output of the detached servers
+LOGS_DIR = DATA_DIR / "logs"
+
+
+class ServerInfo(NamedTuple):
+    pid: int
+    port: int
+    # Resolved path of the folder served
+    path: str
+    # Time the server started, in seconds since the epoch
+    started: float
+    # Options of `pyscript run` it was started with, but the port
+    options: tuple[str, ...] = ()
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.port}/"
+
+
+def is_process_running(pid: int) -> bool:
+    """Returns whether a process with the id `pid` exists."""
+    if sys.platform == "win32":  # pragma: no cover
+        import ctypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists, but belongs to another user
+        return True
+    return True
+
+
+def is_port_open(port: int, timeout: float = 0.5) -> bool:
+    """Returns whether a server accepts connections on a local port."""
+    try:
+        with socket.create_connection(("localhost", port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _read_registry() -> list[ServerInfo]:
+    try:
+        entries = json.loads(REGISTRY_FILE.read_text())
+        return [
+            ServerInfo(**dict(entry, options=tuple(entry.get("options", ()))))
+            for entry in entries
+        ]
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def _write_registry(servers: list[ServerInfo]) -> None:
+    REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(
+        REGISTRY_FILE, json.dumps([server._asdict() for server in servers], indent=2)
+    )
+
+
+def list_servers() -> list[ServerInfo]:
+    """
+    Returns the running servers, dropping the ones that died from the registry.
+
+    Returns:
+        list[ServerInfo]: the running servers, in the order they started.
+    """
+    with file_lock(REGISTRY_FILE):
+        servers = _read_registry()
+        running = [server for server in servers if is_process_running(server.pid)]
+        if len(running) != len(servers):
+            _write_registry(running)
+    return running
+
+
+def find_server(path: Path) -> Optional[ServerInfo]:
+    """
+    Returns the running server of a folder, if any. As process ids are reused,
+    the server must also accept connections on its port.
+
+    Args:
+        path(Path): the folder served.
+
+    Returns:
+        ServerInfo: the server, None if the folder isn't served.
+    """
+    folder = str(path.resolve())
+    for server in list_servers():
+        if server.path == folder and is_port_open(server.port):
+            return server
+    return None
+
+
+def register_server(server: ServerInfo) -> None:
+    with file_lock(REGISTRY_FILE):
+        servers = [entry for entry in _read_registry() if entry.pid != server.pid]
+        _write_registry(servers + [server])
+
+
+def unregister_server(pid: int) -> None:
+    with file_lock(REGISTRY_FILE):
+        servers = _read_registry()
+        _write_registry([server for server in servers if server.pid != pid])
+
+
+def stop_server(server: ServerInfo, timeout: float = 5.0) -> bool:
+    """
+    Asks a server to stop, and waits for it to exit.
+
+    Args:
+        server(ServerInfo): the server to be stopped.
+        timeout(float): seconds to wait for it to exit.
+
+    Returns:
+        bool: whether the server exited in time.
+    """
+    try:
+        os.kill(server.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    deadline = time.monotonic() + timeout
+    while is_process_running(server.pid):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    # In case it was killed before it could remove itself
+    unregister_server(server.pid)
+    return True
+
+
+def log_file(port: int) -> Path:
+    """Returns the file the output of a detached server on `port` goes to."""
+    return LOGS_DIR / f"server-{port}.log"
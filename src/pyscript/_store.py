@@ -0,0 +1,264 @@
+"""Content addressed store of the files shared by projects, i.e. runtimes.
+
+Files are stored once in the data folder, named after the SHA-256 of their
+contents, and hard linked into the projects using them, so identical files take
+the disk space of one. Stored files are read-only, as changes through one of
+their links would show in all the projects: tools replacing files, like most
+editors, break the link instead. Only artifacts that are never edited, like the
+runtime and the wheels, are shared this way, see `is_shareable`.
+
+A stored file linked by no project has a single link left, so `collect_garbage`
+can tell which files to delete without tracking the projects. The downloads of
+immutable URLs are stored too, so that they aren't downloaded again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from pyscript import DATA_DIR
+from pyscript._fs import _umask_mode, atomic_write_text, fast_copy, file_lock
+
+STORE_DIR = DATA_DIR / "store"
+READ_CHUNK_SIZE = 1024 * 1024
+# Seconds after which the temporary files of interrupted writes are garbage
+STALE_TMP_AGE = 3600
+# Built files, never edited in place, that projects can share through the store
+SHAREABLE_SUFFIXES = (".whl", ".wasm")
+
+
+def _objects_dir() -> Path:
+    return STORE_DIR / "objects"
+
+
+def _urls_file() -> Path:
+    return STORE_DIR / "urls.json"
+
+
+def blob_path(digest: str) -> Path:
+    """Returns the path of the stored file with the SHA-256 `digest`."""
+    return _objects_dir() / digest[:2] / digest[2:]
+
+
+def is_shareable(path: Path) -> bool:
+    """
+    Returns whether a file of a project can be linked from the store. Sources
+    can be edited in place by some tools, i.e. after making them writable, which
+    would change them in all the projects: they are copied instead.
+    """
+    return path.name.endswith(SHAREABLE_SUFFIXES)
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        while chunk := fp.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_blob(digest: str, write: Callable[[Path], object]) -> Path:
+    """Stores a file written by `write` as `digest`, unless already stored."""
+    blob = blob_path(digest)
+    if blob.exists():
+        return blob
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=blob.parent, prefix=".", suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        write(tmp_path)
+        os.chmod(tmp_path, _umask_mode(0o444))
+        # Another process storing the same contents is fine: they're the same
+        os.replace(tmp_path, blob)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return blob
+
+
+def add_file(path: Path) -> str:
+    """
+    Stores a copy of a file.
+
+    Args:
+        path(Path): the file to be stored.
+
+    Returns:
+        str: the SHA-256 of its contents, which identifies it in the store.
+    """
+    digest = _hash_file(path)
+    _store_blob(digest, lambda tmp_path: fast_copy(path, tmp_path))
+    return digest
+
+
+def add_bytes(data: bytes) -> str:
+    """Stores `data`, returning its SHA-256."""
+    digest = hashlib.sha256(data).hexdigest()
+    _store_blob(digest, lambda tmp_path: tmp_path.write_bytes(data))
+    return digest
+
+
+def link(digest: str, dst: Path) -> bool:
+    """
+    Links the stored file `digest` at `dst`, replacing `dst` if it exists. Files
+    are copied instead when they can't be linked, i.e. across filesystems.
+
+    Args:
+        digest(str): the SHA-256 of the stored file.
+        dst(Path): the path to be linked.
+
+    Returns:
+        bool: whether the file was linked, False if it was copied.
+
+    Raises:
+        FileNotFoundError: if the file isn't stored.
+    """
+    blob = blob_path(digest)
+    tmp_dst = dst.with_name(f".{dst.name}.{digest[:16]}.tmp")
+    tmp_dst.unlink(missing_ok=True)
+    try:
+        os.link(blob, tmp_dst)
+        linked = True
+    except FileNotFoundError:
+        raise
+    except OSError:
+        fast_copy(blob, tmp_dst)
+        os.chmod(tmp_dst, _umask_mode(0o666))
+        linked = False
+    os.replace(tmp_dst, dst)
+    return linked
+
+
+def install_file(src: Path, dst: Path) -> bool:
+    """Stores `src` and links it at `dst`, see `link`."""
+    digest = add_file(src)
+    try:
+        return link(digest, dst)
+    except FileNotFoundError:
+        # Collected meanwhile
+        return link(add_file(src), dst)
+
+
+def install_bytes(data: bytes, dst: Path) -> bool:
+    """Stores `data` and links it at `dst`, see `link`."""
+    try:
+        return link(add_bytes(data), dst)
+    except FileNotFoundError:
+        # Collected meanwhile
+        return link(add_bytes(data), dst)
+
+
+def _load_urls() -> dict[str, str]:
+    try:
+        return json.loads(_urls_file().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def fetch(url: str, download: Callable[[str], bytes]) -> str:
+    """
+    Returns the SHA-256 of the stored contents of an immutable URL, i.e. of a
+    release of a runtime, downloading them with `download` unless stored.
+
+    Args:
+        url(str): URL whose contents never change.
+        download(Callable): returns the contents of a URL.
+
+    Returns:
+        str: the SHA-256 of the contents.
+    """
+    digest = _load_urls().get(url)
+    if digest is not None and blob_path(digest).exists():
+        return digest
+
+    digest = add_bytes(download(url))
+    with file_lock(_urls_file()):
+        urls = _load_urls()
+        urls[url] = digest
+        atomic_write_text(_urls_file(), json.dumps(urls, indent=2, sort_keys=True))
+    return digest
+
+
+def install_url(url: str, download: Callable[[str], bytes], dst: Path) -> bool:
+    """Links the stored contents of an immutable URL at `dst`, see `fetch`."""
+    try:
+        return link(fetch(url, download), dst)
+    except FileNotFoundError:
+        # Collected meanwhile: `fetch` downloads it again
+        return link(fetch(url, download), dst)
+
+
+def read_url(url: str, download: Callable[[str], bytes]) -> bytes:
+    """Returns the stored contents of an immutable URL, see `fetch`."""
+    try:
+        return blob_path(fetch(url, download)).read_bytes()
+    except FileNotFoundError:
+        # Collected meanwhile: `fetch` downloads it again
+        return blob_path(fetch(url, download)).read_bytes()
+
+
+class GarbageStats(NamedTuple):
+    # Stored files, before collecting
+    files: int
+    size: int
+    # Files linked by no project, deleted unless in a dry run
+    unused_files: int
+    unused_size: int
+
+
+def collect_garbage(dry_run: bool = False) -> GarbageStats:
+    """
+    Deletes the stored files that no project links to anymore. Files linked
+    meanwhile keep working, as deleting a hard link doesn't affect the others.
+
+    Args:
+        dry_run(bool): only count the files that would be deleted.
+
+    Returns:
+        GarbageStats: the stored and unused files, with their size in bytes.
+    """
+    files = size = unused_files = unused_size = 0
+    objects_dir = _objects_dir()
+    if not objects_dir.is_dir():
+        return GarbageStats(0, 0, 0, 0)
+
+    for prefix_dir in objects_dir.iterdir():
+        if not prefix_dir.is_dir():
+            continue
+        for blob in prefix_dir.iterdir():
+            try:
+                stat = blob.stat()
+            except FileNotFoundError:
+                # Collected by another process
+                continue
+            files += 1
+            size += stat.st_size
+            if blob.name.endswith(".tmp"):
+                # Leftovers of interrupted writes are garbage too
+                unused = time.time() - stat.st_mtime > STALE_TMP_AGE
+            else:
+                unused = stat.st_nlink == 1
+            if unused:
+                unused_files += 1
+                unused_size += stat.st_size
+                if not dry_run:
+                    blob.unlink(missing_ok=True)
+
+    if not dry_run:
+        with file_lock(_urls_file()):
+            urls = _load_urls()
+            kept = {
+                url: digest
+                for url, digest in urls.items()
+                if blob_path(digest).exists()
+            }
+            if kept != urls:
+                atomic_write_text(_urls_file(), json.dumps(kept, indent=2))
+    return GarbageStats(files, size, unused_files, unused_size)
@@ -0,0 +1,167 @@
+"""Simulation of slow networks in the local server, for `--throttle`.
+
+The bandwidth is shared by all the connections, as they would share a real link,
+and each request is delayed by the latency of the profile, plus a random jitter.
+The local server only slows down the files it serves: `pyscript test` throttles
+the whole page in Chromium instead, see `cdp_network_conditions`.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+
+
+class ThrottleProfile(NamedTuple):
+    """Conditions of a simulated network."""
+
+    # Bytes per second, None for no limit
+    bandwidth: Optional[float] = None
+    # Seconds each request waits before being answered
+    latency: float = 0.0
+    # Maximum random seconds added to the latency of each request
+    jitter: float = 0.0
+    # Requests answered at once, the others wait for their turn. None for no limit
+    connections: Optional[int] = None
+
+
+# Similar to the presets of the browser developer tools
+THROTTLE_PROFILES = {
+    "slow-3g": ThrottleProfile(
+        bandwidth=400_000 / 8, latency=2.0, jitter=0.2, connections=6
+    ),
+    "fast-3g": ThrottleProfile(
+        bandwidth=1_600_000 / 8, latency=0.56, jitter=0.05, connections=6
+    ),
+    "4g": ThrottleProfile(bandwidth=9_000_000 / 8, latency=0.17, jitter=0.02),
+}
+
+_BANDWIDTH_UNITS = {"bps": 1 / 8, "kbps": 1000 / 8, "mbps": 1_000_000 / 8}
+_TIME_UNITS = {"ms": 0.001, "s": 1.0}
+_QUANTITY = re.compile(r"(?P<number>\d+(\.\d*)?)\s*(?P<unit>[a-z]*)")
+
+
+def _parse_quantity(value: str, units: dict[str, float], default_unit: str) -> float:
+    match = _QUANTITY.fullmatch(value.strip().lower())
+    if not match or (match.group("unit") or default_unit) not in units:
+        valid_units = ", ".join(units)
+        raise ValueError(f"Invalid value: {value}. Valid units are: {valid_units}")
+    return float(match.group("number")) * units[match.group("unit") or default_unit]
+
+
+def parse_throttle(spec: str) -> ThrottleProfile:
+    """
+    Returns the network conditions described by `spec`: the name of a profile
+    and/or comma separated settings overriding it, i.e. `fast-3g`,
+    `bandwidth=2mbps,latency=300ms` or `slow-3g,connections=2`.
+
+    Args:
+        spec(str): the network conditions.
+
+    Returns:
+        ThrottleProfile: the parsed conditions.
+
+    Raises:
+        ValueError: if `spec` is not valid.
+    """
+    profile = ThrottleProfile()
+    for item in spec.split(","):
+        item = item.strip()
+        if "=" not in item:
+            if item not in THROTTLE_PROFILES:
+                valid_profiles = ", ".join(THROTTLE_PROFILES)
+                raise ValueError(
+                    f"Unknown throttle profile: {item}. "
+                    f"Valid profiles are: {valid_profiles}"
+                )
+            profile = THROTTLE_PROFILES[item]
+            continue
+
+        key, value = (part.strip() for part in item.split("=", 1))
+        if key == "bandwidth":
+            profile = profile._replace(
+                bandwidth=_parse_quantity(value, _BANDWIDTH_UNITS, "kbps")
+            )
+        elif key == "latency":
+            profile = profile._replace(
+                latency=_parse_quantity(value, _TIME_UNITS, "ms")
+            )
+        elif key == "jitter":
+            profile = profile._replace(jitter=_parse_quantity(value, _TIME_UNITS, "ms"))
+        elif key == "connections":
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"Invalid number of connections: {value}")
+            profile = profile._replace(connections=int(value))
+        else:
+            raise ValueError(
+                f"Unknown throttle setting: {key}. Valid settings are: "
+                "bandwidth, latency, jitter, connections"
+            )
+    return profile
+
+
+def cdp_network_conditions(profile: ThrottleProfile) -> dict:
+    """
+    Returns the parameters of the `Network.emulateNetworkConditions` command of
+    the Chrome DevTools Protocol simulating a profile, for all the requests of a
+    page, i.e. the downloads of the runtime and the packages from the CDN. The
+    browser can't limit the connections, and applies the average jitter.
+
+    Args:
+        profile(ThrottleProfile): the network conditions.
+
+    Returns:
+        dict: the parameters of the command.
+    """
+    # -1 disables the limit
+    throughput = profile.bandwidth or -1
+    return {
+        "offline": False,
+        "latency": (profile.latency + profile.jitter / 2) * 1000,
+        "downloadThroughput": throughput,
+        "uploadThroughput": throughput,
+    }
+
+
+class Throttle:
+    """Applies a `ThrottleProfile` to the requests of a server."""
+
+    # Bytes sent at once, small enough to keep the transfers smooth
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self, profile: ThrottleProfile):
+        self.profile = profile
+        self._lock = threading.Lock()
+        # When the link will be free to send more data
+        self._next_free = 0.0
+        self._slots = (
+            threading.BoundedSemaphore(profile.connections)
+            if profile.connections
+            else None
+        )
+
+    def start_request(self) -> None:
+        """Waits for a free connection and for the latency of the request."""
+        if self._slots is not None:
+            self._slots.acquire()
+        delay = self.profile.latency + random.uniform(0, self.profile.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def end_request(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    def wait_to_send(self, size: int) -> None:
+        """Waits until the link can send `size` more bytes."""
+        if not self.profile.bandwidth:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + size / self.profile.bandwidth
+            delay = self._next_free - now
+        time.sleep(delay)
@@ -1,14 +1,30 @@
 """The main CLI entrypoint and commands."""
 
 import sys
+import time
+from pathlib import Path
 from typing import Any, Optional
 
 from pluggy import PluginManager
 
 from pyscript import __version__, app, console, plugins, typer
+from pyscript._profiling import PROFILE_ENV_VAR, PROFILE_OUTPUT_ENV_VAR, profiler
 from pyscript.plugins import hookspecs
 
-DEFAULT_PLUGINS = ["create", "run"]
+DEFAULT_PLUGINS = [
+    "analyze",
+    "check",
+    "create",
+    "deploy",
+    "gc",
+    "ps",
+    "run",
+    "snapshot",
+    "stop",
+    "test",
+    "trim",
+    "upgrade",
+]
 
 
 def ok(msg: str = ""):
@@ -34,9 +50,24 @@ class Abort(typer.Abort):
 
 @app.callback(invoke_without_command=True, no_args_is_help=True)
 def main(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None, "--version", help="Show project version and exit."
-    )
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        envvar=PROFILE_ENV_VAR,
+        help="Report how long loading the plugins, each plugin hook call and the "
+        "command took.",
+    ),
+    profile_output: Optional[Path] = typer.Option(
+        None,
+        "--profile-output",
+        envvar=PROFILE_OUTPUT_ENV_VAR,
+        help="Save cProfile statistics of the command to this file, i.e. to read "
+        "them with pstats or snakeviz. Implies --profile.",
+    ),
 ):
     """
     Command Line Interface for PyScript.
@@ -45,18 +76,33 @@ def main(
         console.print(f"PyScript CLI version: {__version__}", style="bold green")
         raise typer.Exit()
 
+    if profile or profile_output:
+        if profile_output:
+            profiler.start_cprofile()
+        start = time.perf_counter()
+
+        def report():
+            profiler.record(
+                f"command {ctx.invoked_subcommand}", time.perf_counter() - start
+            )
+            profiler.report(profile_output)
+
+        ctx.call_on_close(report)
+
 
 # Create the default PluginManager
 pm = PluginManager("pyscript")
 
 # Register the hooks specifications available for PyScript Plugins
 pm.add_hookspecs(hookspecs)
+profiler.monitor_hooks(pm)
 
 # Register the default plugins available with the bare pyscript cli installation
 for modname in DEFAULT_PLUGINS:
     importspec = f"pyscript.plugins.{modname}"
     try:
-        __import__(importspec)
+        with profiler.phase(f"import plugin {modname}"):
+            __import__(importspec)
     except ImportError as e:
         raise ImportError(
             f'Error importing plugin "{modname}": {e.args[0]}'
@@ -67,9 +113,11 @@ for modname in DEFAULT_PLUGINS:
 
 
 # Load plugins registered via setuptools entrypoints
-loaded = pm.load_setuptools_entrypoints("pyscript")
+with profiler.phase("load entrypoint plugins"):
+    loaded = pm.load_setuptools_entrypoints("pyscript")
 
 # Register the commands from plugins that have been loaded and used the
 # `pyscript_subcommand` hook.
-for cmd in pm.hook.pyscript_subcommand():
-    plugins._add_cmd(cmd)
+with profiler.phase("register commands"):
+    for cmd in pm.hook.pyscript_subcommand():
+        plugins._add_cmd(cmd)
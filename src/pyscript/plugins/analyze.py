@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import requests
+import typer
+from rich.table import Table
+
+from pyscript import app, cli, console, plugins
+from pyscript._config import load_config_file
+from pyscript._generator import DEFAULT_PYODIDE_VERSION, pyodide_base_url
+from pyscript._project import is_local_url, parse_page, resolve_local_url
+
+# Approximate sizes in bytes, (uncompressed, compressed), of the files each runtime
+# downloads on its own before running any code. Measure them with `--fetch-remote`
+# for the exact figures of the release in use.
+RUNTIME_ASSETS = {
+    "pyodide": {
+        "pyodide.mjs": (15_000, 5_000),
+        "pyodide.asm.js": (1_200_000, 250_000),
+        "pyodide.asm.wasm": (9_000_000, 3_000_000),
+        "python_stdlib.zip": (2_400_000, 2_300_000),
+        "pyodide-lock.json": (230_000, 30_000),
+    },
+    "micropython": {
+        "micropython.mjs": (60_000, 15_000),
+        "micropython.wasm": (450_000, 180_000),
+    },
+}
+SIZE_UNITS = {"": 1, "K": 1_000, "M": 1_000_000, "G": 1_000_000_000}
+# Describes the packages of the Pyodide distribution, in the folder of the runtime
+LOCK_FILE = "pyodide-lock.json"
+PYPI_URL = "https://pypi.org/pypi"
+# A package name, pinned to a version or not, i.e. "numpy" or "attrs==23.2.0"
+REQUIREMENT = re.compile(
+    r"\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(==\s*(?P<version>[^\s;,]+))?"
+)
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class Resource(NamedTuple):
+    """A resource fetched by the browser to load an app."""
+
+    kind: str
+    url: str
+    # None if the size is unknown
+    size: Optional[int]
+    compressed_size: Optional[int]
+    # Whether the sizes are estimated rather than measured
+    estimated: bool = False
+
+
+def parse_size(value: str) -> int:
+    """
+    Parses a size in bytes, with an optional K, M or G suffix (i.e. "1.5M").
+
+    Args:
+        value(str): the size to be parsed.
+
+    Returns:
+        int: the size in bytes.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", value.upper())
+    if not match:
+        raise typer.BadParameter(f"'{value}' is not a valid size.")
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def _check_size(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        parse_size(value)
+    return value
+
+
+def measure_file(path: Path) -> tuple[int, int]:
+    """
+    Measures the size of a file as stored and as sent with gzip compression.
+
+    Args:
+        path(Path): path to the file.
+
+    Returns:
+        tuple(int, int): the uncompressed and compressed sizes in bytes.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    size = compressed_size = 0
+    with path.open("rb") as fp:
+        while chunk := fp.read(READ_CHUNK_SIZE):
+            size += len(chunk)
+            compressed_size += len(compressor.compress(chunk))
+    compressed_size += len(compressor.flush())
+    return size, compressed_size
+
+
+def measure_url(url: str) -> tuple[Optional[int], Optional[int]]:
+    """
+    Measures the size of a remote resource, as it is sent and once decompressed.
+
+    Args:
+        url(str): URL of the resource.
+
+    Returns:
+        tuple(int, int): the uncompressed and compressed sizes in bytes, or
+                         (None, None) if the resource couldn't be fetched.
+    """
+    try:
+        response = requests.get(
+            url, stream=True, timeout=30, headers={"Accept-Encoding": "gzip"}
+        )
+        if not response.ok:
+            return None, None
+        decompressor = zlib.decompressobj(47)
+        compressed = response.headers.get("Content-Encoding") == "gzip"
+        size = compressed_size = 0
+        for chunk in response.raw.stream(READ_CHUNK_SIZE, decode_content=False):
+            compressed_size += len(chunk)
+            size += len(decompressor.decompress(chunk)) if compressed else len(chunk)
+        return size, compressed_size
+    except Exception:
+        return None, None
+
+
+def fetch_json(url: str) -> Optional[dict]:
+    """
+    Downloads a JSON document, i.e. the description of a package.
+
+    Args:
+        url(str): URL of the document.
+
+    Returns:
+        dict: the document, None if it couldn't be fetched.
+    """
+    try:
+        response = requests.get(url, timeout=30)
+        if not response.ok:
+            return None
+        return response.json()
+    except Exception:
+        return None
+
+
+def _runtime_base_url(runtime: str, interpreter: Optional[str]) -> Optional[str]:
+    """Returns the URL of the folder the runtime is downloaded from, if known."""
+    if interpreter and "/" in interpreter:
+        return interpreter.rsplit("/", 1)[0] + "/"
+    if runtime == "pyodide":
+        # The interpreter can also be set to a version of Pyodide
+        return pyodide_base_url(interpreter or DEFAULT_PYODIDE_VERSION)
+    return None
+
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def package_wheels(
+    package: str, lock: dict, base_url: Optional[str], seen: set[str]
+) -> list[tuple[str, Optional[str]]]:
+    """
+    Returns the wheels the runtime downloads to install a package: the ones of
+    the package and of its dependencies from the Pyodide distribution, or the
+    pure Python wheel of the package from PyPI, whose dependencies are only
+    known to micropip.
+
+    Args:
+        package(str): the package, as listed in the project config.
+        lock(dict): the packages of the Pyodide distribution, by normalized name,
+                    as described by its lock file.
+        base_url(str): URL of the folder the runtime is downloaded from.
+        seen(set[str]): the normalized names of the packages already counted,
+                        which are skipped and updated.
+
+    Returns:
+        list[tuple[str, str]]: the names of the packages with the URLs of their
+                               wheels, None if a wheel can't be found.
+    """
+    match = REQUIREMENT.match(package)
+    if not match:
+        return [(package, None)]
+    name = _normalize_name(match.group("name"))
+    if name not in lock:
+        if name in seen:
+            return []
+        seen.add(name)
+        version = match.group("version")
+        info = fetch_json(
+            f"{PYPI_URL}/{name}/{version}/json"
+            if version
+            else f"{PYPI_URL}/{name}/json"
+        )
+        urls = [
+            entry["url"]
+            for entry in (info or {}).get("urls", [])
+            if entry.get("filename", "").endswith("-none-any.whl")
+        ]
+        return [(package, urls[0] if urls else None)]
+
+    wheels: list[tuple[str, Optional[str]]] = []
+    pending = [(package, name)]
+    while pending:
+        label, name = pending.pop(0)
+        if name in seen or name not in lock:
+            continue
+        seen.add(name)
+        wheels.append((label, f"{base_url}{lock[name]['file_name']}"))
+        for dependency in lock[name].get("depends", []):
+            pending.append((dependency, _normalize_name(dependency)))
+    return wheels
+
+
+def collect_resources(
+    project_dir: Path, html_file: str, fetch_remote: bool = False
+) -> tuple[list[Resource], list[str]]:
+    """
+    Collects the resources the browser fetches to load a project page, from the
+    page itself and from the project config.
+
+    Args:
+        project_dir(Path): path to the project folder.
+        html_file(str): name of the HTML page in the project folder.
+        fetch_remote(bool): measure remote resources instead of using estimates,
+                            including the runtime and the packages, found in
+                            the Pyodide distribution or on PyPI.
+
+    Returns:
+        tuple(list[Resource], list[str]): the resources the browser fetches, and
+                                          the problems that may hide some, i.e.
+                                          invalid inline configs.
+    """
+    html_path = project_dir / html_file
+    page = parse_page(html_path)
+    problems = [f"{html_file}: {error}" for error in page.config_errors]
+    resources = [Resource("page", html_file, *measure_file(html_path))]
+
+    project_configs = list(page.inline_configs)
+    for config_url in page.config_urls:
+        config_path = resolve_local_url(project_dir, config_url)
+        if is_local_url(config_url) and config_path.is_file():
+            project_configs.append(load_config_file(config_path))
+
+    urls = list(page.urls)
+    packages: list[str] = []
+    for project_config in project_configs:
+        urls.extend(url for url in project_config.get("files", {}) if url not in urls)
+        packages.extend(project_config.get("packages", []))
+
+    for url in urls:
+        if url in packages:
+            # i.e. a preloaded wheel, counted with the packages
+            continue
+        if url in page.python_urls:
+            kind = "python"
+        elif url in page.config_urls:
+            kind = "config"
+        else:
+            kind = "file"
+
+        if is_local_url(url):
+            path = resolve_local_url(project_dir, url)
+            if path.is_file():
+                resources.append(Resource(kind, url, *measure_file(path)))
+            else:
+                resources.append(Resource(kind, url, None, None))
+        elif fetch_remote:
+            resources.append(Resource("remote", url, *measure_url(url)))
+        else:
+            resources.append(Resource("remote", url, None, None))
+
+    runtime = "micropython" if page.script_types == {"mpy"} else "pyodide"
+    interpreters = [c["interpreter"] for c in project_configs if "interpreter" in c]
+    interpreter = str(interpreters[0]) if interpreters else None
+    local_runtime = (
+        interpreter is not None and "/" in interpreter and is_local_url(interpreter)
+    )
+    base_url = None if local_runtime else _runtime_base_url(runtime, interpreter)
+    for name, (size, compressed_size) in RUNTIME_ASSETS[runtime].items():
+        if local_runtime:
+            # The runtime is served with the app, i.e. by `pyscript trim`
+            assert interpreter is not None
+            path = resolve_local_url(project_dir, interpreter).parent / name
+            measured = measure_file(path) if path.is_file() else (None, None)
+            resources.append(Resource("runtime", name, *measured))
+        elif fetch_remote and base_url:
+            url = f"{base_url}{name}"
+            resources.append(Resource("runtime", name, *measure_url(url)))
+        else:
+            resources.append(Resource("runtime", name, size, compressed_size, True))
+
+    lock: dict = {}
+    if fetch_remote and packages and runtime == "pyodide" and base_url:
+        lock_data = fetch_json(f"{base_url}{LOCK_FILE}") or {}
+        lock = {
+            _normalize_name(name): info
+            for name, info in lock_data.get("packages", {}).items()
+        }
+    seen: set[str] = set()
+    for package in packages:
+        if is_local_url(package) and resolve_local_url(project_dir, package).is_file():
+            path = resolve_local_url(project_dir, package)
+            resources.append(Resource("package", package, *measure_file(path)))
+        elif fetch_remote:
+            for name, wheel_url in package_wheels(package, lock, base_url, seen):
+                measured = measure_url(wheel_url) if wheel_url else (None, None)
+                resources.append(Resource("package", name, *measured))
+        else:
+            resources.append(Resource("package", package, None, None))
+
+    return resources, problems
+
+
+def _format_size(size: Optional[int], estimated: bool = False) -> str:
+    if size is None:
+        return "?"
+    return f"{'~' if estimated else ''}{size / 1000:,.1f} kB"
+
+
+@app.command()
+def analyze(
+    path: Path = typer.Argument(Path("."), help="The path of the project to analyze."),
+    html_file: str = typer.Option(
+        "index.html", "--html", help="Name of the HTML page of the project."
+    ),
+    max_bytes: Optional[str] = typer.Option(
+        None,
+        "--max-bytes",
+        help="Fail if the compressed page weight is above this size (i.e. 5M, 800K).",
+        callback=_check_size,
+    ),
+    max_requests: Optional[int] = typer.Option(
+        None, "--max-requests", help="Fail if the page makes more requests than this."
+    ),
+    fetch_remote: bool = typer.Option(
+        False,
+        "--fetch-remote",
+        help="Download remote resources to measure them, instead of using estimates.",
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+):
+    """
+    Reports the bytes and requests the browser needs to load a project, and
+    optionally fails when they are over budget.
+    """
+    if not (path / html_file).is_file():
+        raise cli.Abort(f"Error: {path / html_file} does not exist.")
+
+    resources, problems = collect_resources(path, html_file, fetch_remote)
+    total_size = sum(r.size or 0 for r in resources)
+    total_compressed_size = sum(r.compressed_size or 0 for r in resources)
+    unknown = [r.url for r in resources if r.compressed_size is None]
+    if max_bytes is not None and unknown:
+        problems.append(
+            f"the size of {len(unknown)} resources is unknown and not counted in "
+            f"the --max-bytes budget: {', '.join(unknown)}"
+        )
+
+    if as_json:
+        report = {
+            "resources": [r._asdict() for r in resources],
+            "requests": len(resources),
+            "size": total_size,
+            "compressed_size": total_compressed_size,
+            "unknown_sizes": unknown,
+            "problems": problems,
+        }
+        console.print_json(json.dumps(report))
+    else:
+        table = Table(title=f"Page weight of {path / html_file}")
+        table.add_column("Kind")
+        table.add_column("Resource")
+        table.add_column("Size", justify="right")
+        table.add_column("Compressed", justify="right")
+        for r in resources:
+            table.add_row(
+                r.kind,
+                r.url,
+                _format_size(r.size, r.estimated),
+                _format_size(r.compressed_size, r.estimated),
+            )
+        table.add_section()
+        table.add_row(
+            "total",
+            f"{len(resources)} requests",
+            _format_size(total_size),
+            _format_size(total_compressed_size),
+        )
+        console.print(table)
+        if unknown:
+            console.print(
+                f"The size of {len(unknown)} resources is unknown and not included "
+                "in the total. Use --fetch-remote to measure remote resources.",
+                style="yellow",
+            )
+        for problem in problems:
+            console.print(f"Warning: {problem}", style="yellow", markup=False)
+
+    errors = []
+    if max_bytes is not None and total_compressed_size > parse_size(max_bytes):
+        errors.append(
+            f"page weight {_format_size(total_compressed_size)} is over the "
+            f"{_format_size(parse_size(max_bytes))} budget"
+        )
+    if max_requests is not None and len(resources) > max_requests:
+        errors.append(
+            f"{len(resources)} requests are over the {max_requests} requests budget"
+        )
+    if errors:
+        raise cli.Abort(f"Error: {' and '.join(errors)}.")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return analyze
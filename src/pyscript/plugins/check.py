@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from pyscript import DATA_DIR, __version__, app, cli, config, console, plugins
+from pyscript._config import load_config_file
+from pyscript._fs import atomic_write_text
+from pyscript._generator import find_unavailable_micropython_imports
+from pyscript._index import find_projects
+from pyscript._project import (
+    is_local_url,
+    iter_project_files,
+    parse_page,
+    resolve_local_url,
+)
+
+CACHE_FILE = DATA_DIR / "check-cache.json"
+# Expected types of the PyScript config keys
+CONFIG_TYPES: dict[str, type] = {
+    "packages": list,
+    "files": dict,
+    "fetch": list,
+    "plugins": list,
+    "js_modules": dict,
+    "interpreter": str,
+    "sync_main_only": bool,
+}
+UNRENDERED_TEMPLATE = re.compile(r"{{.*?}}|{%.*?%}")
+# Inline code can legitimately contain braces, i.e. in f-strings
+INLINE_CODE = re.compile(
+    r"(<(py-script|mpy-script|script)\b[^>]*>).*?(</\2>)", re.DOTALL
+)
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_project(project_dir: Path) -> str:
+    """
+    Returns a digest of the names and contents of all the project files.
+
+    Args:
+        project_dir(Path): path to the project folder.
+
+    Returns:
+        str: hex digest identifying the current state of the project.
+    """
+    digest = hashlib.sha256(__version__.encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    for path in iter_project_files(project_dir):
+        digest.update(path.relative_to(project_dir).as_posix().encode() + b"\0")
+        with path.open("rb") as fp:
+            while chunk := fp.read(READ_CHUNK_SIZE):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _check_config(project_dir: Path, project_config: dict) -> list[str]:
+    errors = []
+    for key, expected_type in CONFIG_TYPES.items():
+        if key in project_config and not isinstance(project_config[key], expected_type):
+            errors.append(
+                f"config: '{key}' should be a {expected_type.__name__}, "
+                f"not a {type(project_config[key]).__name__}"
+            )
+
+    files = project_config.get("files", {})
+    if isinstance(files, dict):
+        for url in files:
+            if is_local_url(url) and "{" not in url:
+                if not resolve_local_url(project_dir, url).is_file():
+                    errors.append(f"config: file {url} does not exist")
+    packages = project_config.get("packages", [])
+    if isinstance(packages, list):
+        for package in packages:
+            if str(package).endswith(".whl") and is_local_url(package):
+                if not resolve_local_url(project_dir, package).is_file():
+                    errors.append(f"config: package {package} does not exist")
+    return errors
+
+
+def check_project(project_dir: Path) -> list[str]:
+    """
+    Checks a project for the mistakes that would otherwise only show up in the
+    browser: invalid configs, missing files, unrendered templates and Python
+    syntax errors.
+
+    Args:
+        project_dir(Path): path to the project folder.
+
+    Returns:
+        list[str]: the errors found, empty if the project is valid.
+    """
+    errors = []
+    project_config: dict = {}
+    config_path = project_dir / config["project_config_filename"]
+    if config_path.is_file():
+        try:
+            project_config = load_config_file(config_path)
+        except Exception as e:
+            errors.append(f"config: {config_path.name} can't be parsed: {e}")
+        else:
+            errors.extend(_check_config(project_dir, project_config))
+
+    for html_path in sorted(project_dir.glob("*.html")):
+        html = INLINE_CODE.sub(r"\1\3", html_path.read_text("utf-8"))
+        for match in UNRENDERED_TEMPLATE.finditer(html):
+            errors.append(f"{html_path.name}: unrendered template tag {match.group()}")
+        page = parse_page(html_path)
+        errors.extend(f"{html_path.name}: {error}" for error in page.config_errors)
+        for url in page.urls:
+            if is_local_url(url) and not resolve_local_url(project_dir, url).is_file():
+                errors.append(f"{html_path.name}: {url} does not exist")
+        for inline_config in page.inline_configs:
+            errors.extend(_check_config(project_dir, inline_config))
+
+    micropython = project_config.get("runtime") == "micropython"
+    python_paths = [p for p in iter_project_files(project_dir) if p.suffix == ".py"]
+    local_modules = {p.stem for p in python_paths} | {
+        p.parent.name for p in python_paths if p.name == "__init__.py"
+    }
+    for path in python_paths:
+        name = path.relative_to(project_dir).as_posix()
+        try:
+            source = path.read_text("utf-8")
+            compile(source, name, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError, UnicodeDecodeError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        if micropython:
+            missing = find_unavailable_micropython_imports(source, local_modules)
+            if missing:
+                errors.append(
+                    f"{name}: modules not available in MicroPython: {', '.join(missing)}"
+                )
+
+    return errors
+
+
+def _check_if_changed(
+    project_dir: Path, cached_digest: Optional[str]
+) -> tuple[str, Optional[list[str]]]:
+    # Hashing and checking in the same task keeps all the file reads in the workers
+    digest = hash_project(project_dir)
+    if digest == cached_digest:
+        return digest, None
+    return digest, check_project(project_dir)
+
+
+def _load_cache() -> dict:
+    try:
+        with CACHE_FILE.open() as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: dict) -> None:
+    atomic_write_text(CACHE_FILE, json.dumps(cache))
+
+
+@app.command()
+def check(
+    paths: Optional[list[Path]] = typer.Argument(
+        None,
+        help="The paths of the projects to check, or of folders containing projects. "
+        "Defaults to the current folder.",
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "-j", "--jobs", help="Number of projects checked in parallel."
+    ),
+    use_cache: bool = typer.Option(
+        True, "--cache/--no-cache", help="Skip the projects unchanged since last check."
+    ),
+):
+    """
+    Checks projects for config, file reference and Python syntax errors.
+    """
+    project_dirs = []
+    for path in paths or [Path(".")]:
+        path = path.absolute()
+        if not path.is_dir():
+            raise cli.Abort(f"Error: Path {path} is not a folder.")
+        elif (path / config["project_config_filename"]).is_file():
+            project_dirs.append(path)
+        else:
+            project_dirs.extend(find_projects(path, jobs=jobs))
+    if not project_dirs:
+        raise cli.Abort("Error: No PyScript projects found.")
+
+    cache = _load_cache() if use_cache else {}
+    cached = [cache.get(str(p), {}) for p in project_dirs]
+    cached_digests = [c.get("digest") for c in cached]
+
+    if len(project_dirs) == 1:
+        results = [_check_if_changed(project_dirs[0], cached_digests[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(_check_if_changed, project_dirs, cached_digests)
+            )
+
+    failed = 0
+    for project_dir, (digest, errors), previous in zip(project_dirs, results, cached):
+        if errors is None:
+            errors = previous["errors"]
+        cache[str(project_dir)] = {"digest": digest, "errors": errors}
+        if errors:
+            failed += 1
+            console.print(f"✗ {project_dir}", style="red")
+            for error in errors:
+                console.print(f"    {error}", style="red")
+        else:
+            console.print(f"✓ {project_dir}", style="green")
+
+    _save_cache(cache)
+    if failed:
+        raise cli.Abort(f"Error: {failed} of {len(project_dirs)} projects have errors.")
+    cli.ok(f"{len(project_dirs)} projects checked.")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return check
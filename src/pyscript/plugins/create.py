@@ -1,9 +1,10 @@
+from pathlib import Path
 from typing import Optional
 
 import typer
 
-from pyscript import app, cli, plugins
-from pyscript._generator import create_project
+from pyscript import app, cli, console, plugins
+from pyscript._generator import create_project, find_unavailable_micropython_imports
 
 
 @app.command()
@@ -22,7 +23,8 @@ def create(
     project_type: str = typer.Option(
         "app",
         "--project-type",
-        help="Type of project that is being created. Supported types are: 'app'",
+        help="Type of project that is being created. Supported types are: 'app' and "
+        "'worker' (runs python in a web worker)",
     ),
     wrap: bool = typer.Option(
         False,
@@ -42,24 +44,81 @@ def create(
         "--output",
         help="""Name of the resulting HTML output file. Meant to be used with `-w/--wrap`""",
     ),
+    embed: bool = typer.Option(
+        False,
+        "--embed",
+        help="Inline the python code and config in the HTML file, producing a single "
+        "file app. Meant to be used with `-w/--wrap`",
+    ),
+    runtime: str = typer.Option(
+        "pyodide",
+        "--runtime",
+        help="Interpreter the app runs on. Supported runtimes are: 'pyodide' and "
+        "'micropython' (smaller and faster to start, with a reduced standard library)",
+    ),
+    offline: bool = typer.Option(
+        False,
+        "--offline",
+        help="Add a service worker caching the app, the runtime and the packages, "
+        "for fast repeated loads and offline use",
+    ),
+    from_dir: Optional[Path] = typer.Option(
+        None,
+        "--from-dir",
+        help="Copy the files of a folder, i.e. a package, into the project and list "
+        "them in its config",
+    ),
+    ignore: Optional[list[str]] = typer.Option(
+        None,
+        "--ignore",
+        help="Glob pattern of the files and folders not copied by `--from-dir`, "
+        "i.e. 'tests' or 'docs/*.md'. Can be used several times",
+    ),
+    link: bool = typer.Option(
+        False,
+        "--link",
+        help="Hard link the files of `--from-dir` instead of copying them, so that "
+        "changes to them show in both places",
+    ),
+    dedupe: bool = typer.Option(
+        False,
+        "--dedupe",
+        help="Link the wheels and WebAssembly files of `--from-dir` from the asset "
+        "store shared by the projects, so identical files are stored once. They "
+        "are read-only, as editing them in place would change them in every "
+        "project. Other files are copied. See `pyscript gc`",
+    ),
 ):
     """
     Create a new pyscript project with the passed in name, creating a new
     directory in the current directory. Alternatively, use `--wrap` so as to embed
     a python file instead.
     """
+    if from_dir is not None:
+        if not from_dir.is_dir():
+            raise cli.Abort(f"Error: {from_dir} is not a folder.")
+        if wrap:
+            raise cli.Abort("`--from-dir` can't be used with `--wrap`")
+
     if not app_or_file_name and not command:
-        app_or_file_name = typer.prompt("App name", default="my-pyscript-app")
+        default_name = from_dir.resolve().name if from_dir else "my-pyscript-app"
+        app_or_file_name = typer.prompt("App name", default=default_name)
 
     if app_or_file_name and command:
         raise cli.Abort("Cannot provide both an input '.py' file and '-c' option.")
 
-    if (output or command) and (not wrap):
+    if (output or command or embed) and (not wrap):
         raise cli.Abort(
-            """`--output/-o`, and `--command/-c`
+            """`--output/-o`, `--command/-c` and `--embed`
             are meant to be used with `--wrap/-w`"""
         )
 
+    if offline and embed:
+        raise cli.Abort("`--offline` can't be used with `--embed`")
+
+    if runtime == "micropython":
+        _warn_micropython_imports(app_or_file_name, command)
+
     if not app_description:
         app_description = typer.prompt("App description", default="")
     if not author_name:
@@ -78,6 +137,13 @@ def create(
             wrap,
             command,
             output,
+            embed,
+            runtime,
+            offline,
+            str(from_dir) if from_dir is not None else None,
+            ignore or [],
+            link,
+            dedupe,
         )
     except FileExistsError:
         raise cli.Abort(
@@ -85,6 +151,29 @@ def create(
         )
 
 
+def _warn_micropython_imports(
+    app_or_file_name: Optional[str], command: Optional[str]
+) -> None:
+    """Warn about modules imported by the app code that MicroPython doesn't provide."""
+    if command:
+        missing = find_unavailable_micropython_imports(command)
+    elif app_or_file_name and app_or_file_name.endswith(".py"):
+        source_path = Path(app_or_file_name)
+        local_modules = {path.stem for path in source_path.parent.iterdir()}
+        missing = find_unavailable_micropython_imports(
+            source_path.read_text(encoding="utf-8"), local_modules
+        )
+    else:
+        return
+
+    if missing:
+        console.print(
+            "Warning: the following modules are not available in MicroPython: "
+            f"{', '.join(missing)}",
+            style="yellow",
+        )
+
+
 @plugins.register
 def pyscript_subcommand():
     return create
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+import typer
+
+from pyscript import app, cli, config, console, plugins
+from pyscript._deploy import (
+    DeployBackend,
+    DeployError,
+    DirectoryBackend,
+    S3Backend,
+    deploy_files,
+)
+from pyscript._project import iter_project_files
+
+
+def get_backend(destination: str, **options) -> DeployBackend:
+    """
+    Returns the backend for the destination URL, among the ones provided by the
+    plugins. Destinations without a scheme are local folders, as are the ones
+    starting with a drive letter on Windows, i.e. `C:\\site`.
+
+    Args:
+        destination(str): URL of the destination, i.e. `s3://bucket/prefix`.
+        options: options of the backend, i.e. `endpoint_url`.
+
+    Returns:
+        DeployBackend: the backend handling the destination.
+    """
+    # The plugin manager is only ready once all the plugins have been loaded
+    from pyscript.cli import pm
+
+    backends: dict[str, type[DeployBackend]] = {}
+    for plugin_backends in pm.hook.pyscript_deploy_backend():
+        backends.update((backend.scheme, backend) for backend in plugin_backends)
+
+    scheme = urlparse(destination).scheme
+    if not scheme or (len(scheme) == 1 and scheme not in backends):
+        scheme = "file"
+    if scheme not in backends:
+        valid_schemes = ", ".join(sorted(backends))
+        raise DeployError(
+            f"Unsupported destination: {destination}. "
+            f"Supported schemes are: {valid_schemes}"
+        )
+    return backends[scheme](destination, **options)
+
+
+def project_files(project_dir: Path, exclude: Optional[Path] = None) -> dict[str, Path]:
+    """
+    Returns the files of a project to be deployed, by their key.
+
+    Args:
+        project_dir(Path): path to the project folder.
+        exclude(Path): if provided, folder whose files are not deployed, i.e. the
+                       destination folder, when it's inside the project.
+
+    Returns:
+        dict[str, Path]: the paths of the files, by their key.
+    """
+    project_dir = project_dir.resolve()
+    excluded = exclude.resolve() if exclude is not None else None
+    return {
+        path.relative_to(project_dir).as_posix(): path
+        for path in iter_project_files(project_dir)
+        if not path.name.startswith(".")
+        and (excluded is None or not path.is_relative_to(excluded))
+    }
+
+
+@app.command()
+def deploy(
+    destination: str = typer.Argument(
+        ...,
+        help="Where to deploy the project: a folder or an s3://bucket/prefix URL.",
+    ),
+    path: Path = typer.Option(
+        Path("."), "--path", help="The path of the project to deploy."
+    ),
+    endpoint_url: Optional[str] = typer.Option(
+        None,
+        "--endpoint-url",
+        help="URL of an S3 compatible service, i.e. MinIO or Cloudflare R2.",
+    ),
+    delete: bool = typer.Option(
+        False, "--delete", help="Delete the deployed files removed from the project."
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only show the files that would be uploaded."
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "-j", "--jobs", help="Number of files uploaded in parallel."
+    ),
+):
+    """
+    Uploads the project files that changed since the last deploy.
+    """
+    if not (path / config["project_config_filename"]).is_file():
+        raise cli.Abort(f"Error: {path} is not a PyScript project.")
+
+    try:
+        backend = get_backend(destination, endpoint_url=endpoint_url)
+        with console.status("Deploying..."):
+            uploaded, deleted = deploy_files(
+                backend,
+                # Deploying to a folder of the project mustn't deploy it again
+                project_files(
+                    path,
+                    backend.root if isinstance(backend, DirectoryBackend) else None,
+                ),
+                jobs=jobs,
+                delete=delete,
+                dry_run=dry_run,
+                on_upload=lambda key: console.print(f"Uploaded {key}"),
+            )
+    except DeployError as e:
+        raise cli.Abort(f"Error: {e}")
+
+    if dry_run:
+        for key in uploaded:
+            console.print(f"Would upload {key}")
+        for key in deleted:
+            console.print(f"Would delete {key}")
+    else:
+        for key in deleted:
+            console.print(f"Deleted {key}")
+    verb = "would be" if dry_run else "have been"
+    cli.ok(f"{len(uploaded)} files {verb} uploaded, {len(deleted)} deleted.")
+
+
+@plugins.register
+def pyscript_deploy_backend():
+    return [DirectoryBackend, S3Backend]
+
+
+@plugins.register
+def pyscript_subcommand():
+    return deploy
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import typer
+
+from pyscript import _store, app, cli, plugins
+
+
+@app.command()
+def gc(
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only show how much space would be reclaimed."
+    ),
+):
+    """
+    Deletes the files of the shared asset store that no project uses anymore.
+    """
+    stats = _store.collect_garbage(dry_run=dry_run)
+    verb = "Would delete" if dry_run else "Deleted"
+    cli.ok(
+        f"{verb} {stats.unused_files} unused files "
+        f"({stats.unused_size / 1_000_000:.1f}MB) of the {stats.files} files "
+        f"({stats.size / 1_000_000:.1f}MB) in {_store.STORE_DIR}"
+    )
+
+
+@plugins.register
+def pyscript_subcommand():
+    return gc
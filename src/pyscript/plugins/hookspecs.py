@@ -6,3 +6,20 @@ hookspec = HookspecMarker("pyscript")
 @hookspec
 def pyscript_subcommand():
     """My special little hook that you can customize."""
+
+
+@hookspec
+def pyscript_deploy_backend():
+    """
+    Returns the `pyscript._deploy.DeployBackend` subclasses provided by a plugin,
+    each one handling the destinations of `pyscript deploy` with its URL scheme.
+    """
+
+
+@hookspec
+def pyscript_rpc_functions():
+    """
+    Returns a dict of the host functions that the apps served by
+    `pyscript run --rpc` can call, by name. They run in other processes, so they
+    must be importable, i.e. defined at the top level of a module.
+    """
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import time
+
+import typer
+from rich.table import Table
+
+from pyscript import app, console, plugins
+from pyscript._servers import list_servers
+
+
+def _format_uptime(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02}m"
+    if minutes:
+        return f"{minutes}m{seconds:02}s"
+    return f"{seconds}s"
+
+
+@app.command()
+def ps(
+    output_json: bool = typer.Option(
+        False, "--json", help="Print the servers as JSON, i.e. for scripts."
+    ),
+):
+    """
+    Lists the running servers started with `pyscript run`.
+    """
+    servers = list_servers()
+    if output_json:
+        console.print_json(
+            json.dumps([dict(server._asdict(), url=server.url) for server in servers])
+        )
+        return
+    if not servers:
+        console.print("No servers are running.")
+        return
+
+    table = Table()
+    table.add_column("PID", justify="right")
+    table.add_column("URL")
+    table.add_column("Folder")
+    table.add_column("Uptime", justify="right")
+    now = time.time()
+    for server in servers:
+        table.add_row(
+            str(server.pid),
+            server.url,
+            server.path,
+            _format_uptime(now - server.started),
+        )
+    console.print(table)
+
+
+@plugins.register
+def pyscript_subcommand():
+    return ps
@@ -1,64 +1,73 @@
 from __future__ import annotations
 
-import socketserver
+import os
+import signal
+import subprocess
+import sys
 import threading
+import time
 import webbrowser
 from functools import partial
-from http.server import SimpleHTTPRequestHandler
 from pathlib import Path
+from typing import Any, Callable, Optional
 
 import typer
 
 from pyscript import app, cli, console, plugins
+from pyscript._hmr import HotReloader
+from pyscript._rpc import RPC_PATH, TOKEN_HEADER, FunctionPool
+from pyscript._server import (
+    SyntaxChecker,
+    create_server,
+    report_syntax_error,
+    split_path_and_filename,
+)
+from pyscript._servers import (
+    ServerInfo,
+    find_server,
+    list_servers,
+    log_file,
+    register_server,
+    unregister_server,
+)
+from pyscript._throttle import Throttle, parse_throttle
 
 
-def get_folder_based_http_request_handler(
-    folder: Path,
-) -> type[SimpleHTTPRequestHandler]:
-    """
-    Returns a FolderBasedHTTPRequestHandler with the specified directory.
-
-    Args:
-        folder (str): The folder that will be served.
-
-    Returns:
-        FolderBasedHTTPRequestHandler: The SimpleHTTPRequestHandler with the
-                                        specified directory.
-    """
+def _check_before_reload(
+    syntax_checker: Optional[SyntaxChecker],
+) -> Callable[[Path], Optional[str]]:
+    """Returns the check of the modules to be hot reloaded, reporting their errors."""
+    checker = syntax_checker or SyntaxChecker(max_workers=1)
 
-    class FolderBasedHTTPRequestHandler(SimpleHTTPRequestHandler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, directory=folder, **kwargs)
+    def check(path: Path) -> Optional[str]:
+        error = checker.check(path)
+        if error:
+            report_syntax_error(path, error)
+        return error
 
-        def end_headers(self):
-            self.send_header("Cross-Origin-Opener-Policy", "same-origin")
-            self.send_header("Cross-Origin-Embedder-Policy", "require-corp")
-            self.send_header("Cross-Origin-Resource-Policy", "cross-origin")
-            self.send_header("Cache-Control", "no-cache, must-revalidate")
-            SimpleHTTPRequestHandler.end_headers(self)
+    return check
 
-    return FolderBasedHTTPRequestHandler
 
+def rpc_functions() -> dict[str, Callable]:
+    """Returns the host functions registered by the plugins, by name."""
+    # The plugin manager is only ready once all the plugins have been loaded
+    from pyscript.cli import pm
 
-def split_path_and_filename(path: Path) -> tuple[Path, str]:
-    """Receives a path to a pyscript project or file and returns the base
-    path of the project and the filename that should be opened (filename defaults
-    to "" (empty string) if the path points to a folder).
+    functions: dict[str, Callable] = {}
+    for plugin_functions in pm.hook.pyscript_rpc_functions():
+        functions.update(plugin_functions)
+    return functions
 
-    Args:
-        path (str): The path to the pyscript project or file.
 
-    Returns:
-        tuple(str, str): The base path of the project and the filename
-    """
-    abs_path = path.absolute()
-    if path.is_file():
-        return Path("/".join(abs_path.parts[:-1])), abs_path.parts[-1]
-    else:
-        return abs_path, ""
-
-
-def start_server(path: Path, show: bool, port: int):
+def start_server(
+    path: Path,
+    show: bool,
+    port: int,
+    check_syntax: bool = False,
+    hmr: bool = False,
+    throttle: Optional[str] = None,
+    rpc: bool = False,
+):
     """
     Creates a local server to run the app on the path and port specified.
 
@@ -66,20 +75,55 @@ def start_server(path: Path, show: bool, port: int):
         path(str): The path of the project that will run.
         show(bool): Open the app in web browser.
         port(int): The port that the app will run on.
+        check_syntax(bool): Check the syntax of the Python files before serving them.
+        hmr(bool): Push the changes to the Python modules to the running apps.
+        throttle(str): The network conditions to simulate, see `parse_throttle`.
+        rpc(bool): Let the app call the host functions registered by plugins.
 
     Returns:
         None
     """
-    # We need to set the allow_resuse_address to True because socketserver will
-    # keep the port in use for a while after the server is stopped.
-    # see https://stackoverflow.com/questions/31745040/
-    socketserver.TCPServer.allow_reuse_address = True
-
     app_folder, filename = split_path_and_filename(path)
-    CustomHTTPRequestHandler = get_folder_based_http_request_handler(app_folder)
+    syntax_checker = SyntaxChecker() if check_syntax else None
+    if syntax_checker is not None:
+        syntax_checker.warm(app_folder)
+    hot_reloader = None
+    if hmr:
+        hot_reloader = HotReloader(
+            app_folder, check=_check_before_reload(syntax_checker)
+        )
+        hot_reloader.start()
+
+    network = Throttle(parse_throttle(throttle)) if throttle else None
+    function_pool = None
+    if rpc:
+        functions = rpc_functions()
+        if not functions:
+            console.print(
+                "No host functions are registered by the installed plugins.",
+                style="yellow",
+            )
+        function_pool = FunctionPool(functions)
 
     # Start the server within a context manager to make sure we clean up after
-    with socketserver.TCPServer(("", port), CustomHTTPRequestHandler) as httpd:
+    with create_server(
+        app_folder, port, syntax_checker, hot_reloader, network, function_pool
+    ) as httpd:
+        # `pyscript stop` terminates the server: clean up like on Ctrl+C
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, _interrupt)
+        # The port the server got, when any free port was asked for
+        port = httpd.server_address[1]
+        # Registered by resolved path, as `find_server` looks servers up
+        register_server(
+            ServerInfo(
+                os.getpid(),
+                port,
+                str(app_folder.resolve()),
+                time.time(),
+                tuple(run_options(check_syntax, hmr, throttle, rpc)),
+            )
+        )
         console.print(
             f"Serving from {app_folder} at port {port}. To stop, press Ctrl+C.",
             style="green",
@@ -95,14 +139,91 @@ def start_server(path: Path, show: bool, port: int):
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
+            unregister_server(os.getpid())
             console.print("\nStopping server... Bye bye!")
 
             # Clean up resources....
             httpd.shutdown()
             httpd.socket.close()
+            if syntax_checker is not None:
+                syntax_checker.shutdown()
+            if hot_reloader is not None:
+                hot_reloader.stop()
+            if function_pool is not None:
+                function_pool.shutdown()
             raise typer.Exit(1)
 
 
+def run_options(
+    check_syntax: bool, hmr: bool, throttle: Optional[str], rpc: bool
+) -> list[str]:
+    """Returns the options of the `run` command starting a server like this one."""
+    options = []
+    if check_syntax:
+        options.append("--check-syntax")
+    if hmr:
+        options.append("--hmr")
+    if throttle:
+        options += ["--throttle", throttle]
+    if rpc:
+        options.append("--rpc")
+    return options
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def start_detached_server(
+    path: Path, port: int, options: list[str], timeout: float = 10.0
+) -> Optional[ServerInfo]:
+    """
+    Starts a server in a background process, that keeps running after the
+    command exits. Its output goes to `log_file(port)`.
+
+    Args:
+        path(Path): The path of the project that will run.
+        port(int): The port that the app will run on.
+        options(list[str]): Other options of the `run` command.
+        timeout(float): Seconds to wait for the server to listen.
+
+    Returns:
+        ServerInfo: the running server, None if it failed to start.
+    """
+    log_path = log_file(port)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    command = [sys.executable, "-m", "pyscript", "run", str(path.absolute())]
+    command += ["--no-view", "--port", str(port), *options]
+    # Detach the server from the terminal, so that it isn't stopped with it
+    popen_options: dict[str, Any] = {}
+    if sys.platform == "win32":  # pragma: no cover
+        popen_options["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        popen_options["start_new_session"] = True
+    with log_path.open("wb") as log:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            **popen_options,
+        )
+
+    # The server registers itself once it listens
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for server in list_servers():
+            if server.pid == process.pid:
+                return server
+        if process.poll() is not None:
+            return None
+        time.sleep(0.1)
+    process.terminate()
+    return None
+
+
 @app.command()
 def run(
     path: Path = typer.Argument(
@@ -110,6 +231,38 @@ def run(
     ),
     view: bool = typer.Option(True, help="Open the app in web browser."),
     port: int = typer.Option(8000, help="The port that the app will run on."),
+    check_syntax: bool = typer.Option(
+        False,
+        "--check-syntax",
+        help="Check the syntax of the Python files before serving them, reporting "
+        "errors without waiting for the runtime to boot.",
+    ),
+    hmr: bool = typer.Option(
+        False,
+        "--hmr",
+        help="Push the changes to the Python modules to the running apps, which "
+        "reload them without restarting the runtime.",
+    ),
+    throttle: Optional[str] = typer.Option(
+        None,
+        "--throttle",
+        help="Simulate a slow network: a profile (slow-3g, fast-3g, 4g) and/or "
+        "settings, i.e. 'bandwidth=2mbps,latency=300ms,jitter=50ms,connections=6'.",
+    ),
+    rpc: bool = typer.Option(
+        False,
+        "--rpc",
+        help=f"Let the app call the host functions registered by plugins, by "
+        f"posting to {RPC_PATH} with the {TOKEN_HEADER} header. The server then "
+        f"only accepts connections from this computer.",
+    ),
+    detach: bool = typer.Option(
+        False,
+        "--detach",
+        "-d",
+        help="Run the server in the background, or reuse the one already serving "
+        "the project. See `pyscript ps` and `pyscript stop`.",
+    ),
 ):
     """
     Creates a local server to run the app on the path and port specified.
@@ -119,8 +272,26 @@ def run(
     if not path.exists():
         raise cli.Abort(f"Error: Path {str(path)} does not exist.", style="red")
 
+    if throttle:
+        try:
+            parse_throttle(throttle)
+        except ValueError as e:
+            raise cli.Abort(f"Error: {e}")
+
+    if detach:
+        run_detached(path, view, port, check_syntax, hmr, throttle, rpc)
+        return
+
     try:
-        start_server(path, view, port)
+        start_server(
+            path,
+            view,
+            port,
+            check_syntax=check_syntax,
+            hmr=hmr,
+            throttle=throttle,
+            rpc=rpc,
+        )
     except OSError as e:
         if e.errno == 48:
             console.print(
@@ -134,6 +305,49 @@ def run(
         raise cli.Abort("")
 
 
+def run_detached(
+    path: Path,
+    show: bool,
+    port: int,
+    check_syntax: bool,
+    hmr: bool,
+    throttle: Optional[str],
+    rpc: bool,
+) -> None:
+    """Starts a server in the background, unless the project is already served."""
+    app_folder, filename = split_path_and_filename(path)
+    options = run_options(check_syntax, hmr, throttle, rpc)
+    server = find_server(app_folder)
+    if server is not None:
+        console.print(
+            f"{app_folder} is already served at {server.url} (pid {server.pid}).",
+            style="green",
+        )
+        # Port 0 asks for any free port
+        if port not in (0, server.port) or list(server.options) != options:
+            started_with = " ".join(["--port", str(server.port), *server.options])
+            console.print(
+                f"Warning: the server was started with `{started_with}`, not with "
+                "the options given. Run `pyscript stop` first to use them.",
+                style="yellow",
+            )
+    else:
+        with console.status("Starting the server..."):
+            server = start_detached_server(path, port, options)
+        if server is None:
+            raise cli.Abort(
+                f"Error: the server didn't start, see its output in {log_file(port)}"
+            )
+        console.print(
+            f"Serving from {app_folder} at {server.url} in the background "
+            f"(pid {server.pid}). To stop, run `pyscript stop`.",
+            style="green",
+        )
+
+    if show:
+        webbrowser.open_new_tab(f"{server.url}{filename}")
+
+
 @plugins.register
 def pyscript_subcommand():
     return run
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import typer
+
+from pyscript import app, cli, config, console, plugins
+from pyscript._config import load_config_file, update_config_file
+
+# Python version of the Pyodide release used by default by PyScript.
+DEFAULT_PYTHON_VERSION = "3.11"
+DEFAULT_SNAPSHOT_FILENAME = "snapshot.zip"
+
+
+def install_packages(
+    packages: list[str], target: Path, python_version: str, cwd: Path
+) -> tuple[list[str], list[str]]:
+    """
+    Installs the pure python wheels of `packages`, and their dependencies, into
+    the `target` folder.
+
+    Args:
+        packages(list[str]): requirements to be installed, as listed in the
+                             project config.
+        target(Path): folder where the packages will be installed.
+        python_version(str): Python version of the interpreter running the app.
+        cwd(Path): folder relative paths to local wheels are resolved from.
+
+    Returns:
+        tuple(list[str], list[str]): the packages that have been installed and the
+                                     ones without a pure python wheel, which need
+                                     to be installed by the runtime.
+    """
+    installed, skipped = [], []
+    for package in packages:
+        # Installing one package at a time means that a package that is only
+        # available for Pyodide (i.e. numpy) doesn't fail the whole snapshot.
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--quiet",
+                "--disable-pip-version-check",
+                "--no-compile",
+                "--only-binary=:all:",
+                "--platform=any",
+                "--implementation=py",
+                f"--python-version={python_version}",
+                f"--target={target}",
+                "--upgrade",
+                package,
+            ],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode == 0:
+            installed.append(package)
+        else:
+            skipped.append(package)
+
+    return installed, skipped
+
+
+def write_archive(source: Path, archive: Path) -> int:
+    """
+    Writes the contents of the `source` folder to the `archive` zip file.
+
+    Args:
+        source(Path): folder to be archived.
+        archive(Path): path of the zip file to be written.
+
+    Returns:
+        int: the number of files written to the archive.
+    """
+    count = 0
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and "__pycache__" not in path.parts:
+                zf.write(path, path.relative_to(source).as_posix())
+                count += 1
+    return count
+
+
+@app.command()
+def snapshot(
+    path: Path = typer.Argument(
+        Path("."), help="The path of the project to be snapshotted."
+    ),
+    output: str = typer.Option(
+        DEFAULT_SNAPSHOT_FILENAME,
+        "-o",
+        "--output",
+        help="Name of the archive to be written in the project folder.",
+    ),
+    python_version: str = typer.Option(
+        DEFAULT_PYTHON_VERSION,
+        "--python-version",
+        help="Python version of the interpreter that runs the app.",
+    ),
+):
+    """
+    Pre-installs the project packages into a single archive that the app mounts
+    at startup, instead of installing the packages one by one on every load.
+    """
+    config_path = path / config["project_config_filename"]
+    if not config_path.is_file():
+        raise cli.Abort(f"Error: {config_path} is not a PyScript project config file.")
+
+    project_config = load_config_file(config_path)
+    archive_url = f"./{output}"
+    # Packages of a previous snapshot have been moved out of the "packages"
+    # list, so we need to install them again alongside the current ones.
+    previous = project_config.get("snapshot", {}).get("packages", [])
+    packages = list(dict.fromkeys(previous + project_config.get("packages", [])))
+    if not packages:
+        raise cli.Abort("Error: the project config doesn't list any packages.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        installed, skipped = install_packages(
+            packages, Path(tmp_dir), python_version, cwd=path
+        )
+        if not installed:
+            raise cli.Abort(
+                "Error: none of the project packages has a pure python wheel."
+            )
+        count = write_archive(Path(tmp_dir), path / output)
+
+    # The runtime unpacks archives whose destination ends with "/*". The
+    # interpreter working directory is in sys.path, so that's where they go.
+    files = project_config.get("files", {})
+    files[archive_url] = "./*"
+    update_config_file(
+        config_path,
+        {
+            "packages": skipped,
+            "files": files,
+            "snapshot": {"archive": archive_url, "packages": installed},
+        },
+    )
+
+    if skipped:
+        console.print(
+            "These packages will still be installed by the runtime: "
+            f"{', '.join(skipped)}",
+            style="yellow",
+        )
+    cli.ok(f"Wrote {count} files from {len(installed)} packages to {path / output}")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return snapshot
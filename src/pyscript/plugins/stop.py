@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import typer
+
+from pyscript import app, cli, console, plugins
+from pyscript._server import split_path_and_filename
+from pyscript._servers import find_server, is_port_open, list_servers, stop_server
+
+
+@app.command()
+def stop(
+    path: Path = typer.Argument(
+        Path("."), help="The path of the project whose server will stop."
+    ),
+    all_servers: bool = typer.Option(
+        False, "--all", help="Stop all the servers started with `pyscript run`."
+    ),
+):
+    """
+    Stops the server started with `pyscript run` for a project.
+    """
+    if all_servers:
+        # As process ids are reused, only stop the ones still listening
+        servers = [server for server in list_servers() if is_port_open(server.port)]
+    else:
+        app_folder, _ = split_path_and_filename(path)
+        server = find_server(app_folder)
+        if server is None:
+            raise cli.Abort(f"Error: {app_folder} is not served.")
+        servers = [server]
+
+    failed = []
+    for server in servers:
+        if stop_server(server):
+            console.print(f"Stopped the server of {server.path} (pid {server.pid}).")
+        else:
+            failed.append(server)
+    if failed:
+        pids = ", ".join(str(server.pid) for server in failed)
+        raise cli.Abort(f"Error: the servers with pids {pids} didn't stop.")
+    cli.ok(f"{len(servers)} servers stopped.")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return stop
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import typer
+
+from pyscript import app, cli, config, console, plugins
+from pyscript._index import find_projects
+from pyscript._server import serve_in_background
+from pyscript._throttle import (
+    Throttle,
+    ThrottleProfile,
+    cdp_network_conditions,
+    parse_throttle,
+)
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:  # pragma: no cover
+    sync_playwright = None  # type: ignore
+
+# Records when PyScript reaches each boot milestone, in ms since navigation start.
+TIMINGS_SCRIPT = """
+window.__pyscriptTimings = {};
+const mark = (name) => {
+  if (!(name in window.__pyscriptTimings)) {
+    window.__pyscriptTimings[name] = performance.now();
+  }
+};
+for (const type of ["py", "mpy"]) {
+  addEventListener(`${type}:ready`, () => mark("ready"), true);
+  addEventListener(`${type}:done`, () => mark("done"), true);
+}
+// Output goes either to the console or to a PyScript terminal
+for (const method of ["log", "info", "warn", "error"]) {
+  const original = console[method];
+  console[method] = (...args) => { mark("first_output"); original(...args); };
+}
+new MutationObserver((mutations) => {
+  if (mutations.some((m) => m.target.closest?.(".xterm-rows, .py-terminal"))) {
+    mark("first_output");
+  }
+}).observe(document, { childList: true, subtree: true, characterData: true });
+"""
+# Computes the boot metrics once the app is done.
+METRICS_SCRIPT = """
+() => {
+  const timings = window.__pyscriptTimings;
+  const runtime = performance.getEntriesByType("resource").filter(
+    (entry) => /pyodide|micropython|python_stdlib/.test(entry.name)
+  );
+  const downloadEnd = runtime.length
+    ? Math.max(...runtime.map((entry) => entry.responseEnd))
+    : null;
+  const downloadStart = runtime.length
+    ? Math.min(...runtime.map((entry) => entry.startTime))
+    : null;
+  return {
+    runtime_download_ms: runtime.length ? downloadEnd - downloadStart : null,
+    runtime_bytes: runtime.reduce((total, entry) => total + entry.transferSize, 0),
+    init_ms: runtime.length && timings.ready ? timings.ready - downloadEnd : null,
+    ready_ms: timings.ready ?? null,
+    first_output_ms: timings.first_output ?? null,
+    done_ms: timings.done ?? null,
+  };
+}
+"""
+
+
+def measure_project(
+    playwright: Any,
+    project_dir: Path,
+    html_file: str,
+    browser_name: str,
+    timeout: float,
+    throttle: Optional[ThrottleProfile] = None,
+) -> dict:
+    """
+    Loads a project page in a headless browser, waits for its main Python code to
+    finish and collects how long each step of the boot took.
+
+    Args:
+        playwright(Playwright): the Playwright instance driving the browser.
+        project_dir(Path): path to the project folder.
+        html_file(str): name of the HTML page of the project.
+        browser_name(str): browser to be used, i.e. "chromium".
+        timeout(float): seconds to wait for the app to be done.
+        throttle(ThrottleProfile): network conditions simulated for all the
+                                   requests of the page in Chromium, including
+                                   the CDN, and only for the project files
+                                   served locally in other browsers.
+
+    Returns:
+        dict: the boot metrics of the project, in milliseconds.
+    """
+    result: dict[str, Any] = {"project": str(project_dir), "ok": False, "error": None}
+    network_conditions = None
+    server_throttle = None
+    if throttle is not None and browser_name == "chromium":
+        # Chromium slows down all the requests, but can't limit the connections
+        network_conditions = cdp_network_conditions(throttle)
+        server_throttle = Throttle(ThrottleProfile(connections=throttle.connections))
+    elif throttle is not None:
+        server_throttle = Throttle(throttle)
+    server = serve_in_background(project_dir, throttle=server_throttle)
+    errors: list[str] = []
+    try:
+        browser = getattr(playwright, browser_name).launch(headless=True)
+        try:
+            page = browser.new_page()
+            if network_conditions is not None:
+                cdp = page.context.new_cdp_session(page)
+                cdp.send("Network.enable")
+                cdp.send("Network.emulateNetworkConditions", network_conditions)
+            page.on("pageerror", lambda error: errors.append(str(error)))
+            page.add_init_script(TIMINGS_SCRIPT)
+            started = time.perf_counter()
+            page.goto(f"http://localhost:{server.server_address[1]}/{html_file}")
+            page.wait_for_function(
+                "() => 'done' in window.__pyscriptTimings", timeout=timeout * 1000
+            )
+            result["wall_ms"] = (time.perf_counter() - started) * 1000
+            result.update(page.evaluate(METRICS_SCRIPT))
+            result["ok"] = not errors
+        finally:
+            browser.close()
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if errors:
+        result["error"] = "\n".join(errors)
+    return result
+
+
+def _measure_in_thread(
+    project_dir: Path,
+    html_file: str,
+    browser_name: str,
+    timeout: float,
+    throttle: Optional[ThrottleProfile],
+) -> dict:
+    # The Playwright sync API can't be shared across threads
+    with sync_playwright() as playwright:
+        return measure_project(
+            playwright, project_dir, html_file, browser_name, timeout, throttle
+        )
+
+
+@app.command()
+def test(
+    paths: Optional[list[Path]] = typer.Argument(
+        None,
+        help="The paths of the projects to test, or of folders containing projects. "
+        "Defaults to the current folder.",
+    ),
+    html_file: str = typer.Option(
+        "index.html", "--html", help="Name of the HTML page of the projects."
+    ),
+    browser_name: str = typer.Option(
+        "chromium", "--browser", help="Browser to use: chromium, firefox or webkit."
+    ),
+    timeout: float = typer.Option(
+        120, help="Seconds to wait for each app to run its main Python code."
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "-j", "--jobs", help="Number of projects tested in parallel."
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "-o", "--output", help="Write the JSON results to this file."
+    ),
+    throttle: Optional[str] = typer.Option(
+        None,
+        "--throttle",
+        help="Simulate a slow network, with the profiles and settings of "
+        "`pyscript run --throttle`. In Chromium, the downloads from the CDN are "
+        "slowed down too.",
+    ),
+):
+    """
+    Loads projects in a headless browser and reports how long they take to boot.
+    """
+    if sync_playwright is None:
+        raise cli.Abort(
+            "Error: the test command needs Playwright. Install it with "
+            "`pip install playwright` and `playwright install chromium`."
+        )
+
+    try:
+        network = parse_throttle(throttle) if throttle else None
+    except ValueError as e:
+        raise cli.Abort(f"Error: {e}")
+    if network is not None and browser_name != "chromium":
+        console.print(
+            f"Only the project files are throttled in {browser_name}, the "
+            "downloads from the CDN aren't. Use Chromium to throttle them too.",
+            style="yellow",
+        )
+
+    project_dirs = []
+    for path in paths or [Path(".")]:
+        path = path.absolute()
+        if (path / config["project_config_filename"]).is_file():
+            project_dirs.append(path)
+        elif path.is_dir():
+            project_dirs.extend(find_projects(path))
+    if not project_dirs:
+        raise cli.Abort("Error: No PyScript projects found.")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(
+            executor.map(
+                lambda project_dir: _measure_in_thread(
+                    project_dir, html_file, browser_name, timeout, network
+                ),
+                project_dirs,
+            )
+        )
+
+    report = json.dumps(
+        {"timestamp": time.time(), "browser": browser_name, "results": results},
+        indent=2,
+    )
+    if output:
+        output.write_text(report)
+    else:
+        console.print_json(report)
+
+    failed = [result["project"] for result in results if not result["ok"]]
+    if failed:
+        raise cli.Abort(f"Error: {len(failed)} of {len(results)} projects failed.")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return test
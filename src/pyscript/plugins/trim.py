@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import ast
+import io
+import json
+import sysconfig
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+import requests
+import typer
+
+from pyscript import _store, app, cli, config, console, plugins
+from pyscript._config import load_config_file, update_config_file
+from pyscript._generator import DEFAULT_PYODIDE_VERSION, pyodide_base_url
+
+DEFAULT_OUTPUT_DIR = "pyodide"
+RUNTIME_FILES = ["pyodide.mjs", "pyodide.asm.js", "pyodide.asm.wasm"]
+LOCK_FILE = "pyodide-lock.json"
+STDLIB_FILE = "python_stdlib.zip"
+
+# Modules used by Pyodide and PyScript themselves, kept with their imports
+# whatever the app imports.
+ALWAYS_KEPT = [
+    "_pyodide",
+    "pyodide",
+    "encodings",
+    "site",
+    "sysconfig",
+    "asyncio",
+    "base64",
+    "html",
+    "inspect",
+    "json",
+    "pathlib",
+    "shutil",
+    "tarfile",
+    "zipfile",
+]
+# Modules used by micropip to install the `packages` of the config, which can't
+# be analyzed as they are only downloaded by the app.
+MICROPIP_KEPT = [
+    "email",
+    "importlib",
+    "platform",
+    "tempfile",
+    "urllib",
+    "hashlib",
+    "dataclasses",
+    "logging",
+]
+
+
+def _download(url: str) -> bytes:
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return response.content
+
+
+def _top_level(name: str) -> str:
+    return name.split(".", 1)[0]
+
+
+def find_imports(source: str, module: str = "", is_package: bool = False) -> set[str]:
+    """
+    Returns the names of the modules imported by `source`. For
+    `from package import name`, `package.name` is included too, as it may be a
+    submodule.
+
+    Args:
+        source(str): Python source code.
+        module(str): name of the module of the code, to resolve relative imports.
+        is_package(bool): whether the code is the `__init__` of a package.
+
+    Returns:
+        set[str]: the absolute names of the imported modules.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+
+    package_parts = module.split(".") if module else []
+    if not is_package and package_parts:
+        package_parts.pop()
+
+    imported: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package_parts[: len(package_parts) - node.level + 1]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                imported.add(base)
+                imported.update(f"{base}.{alias.name}" for alias in node.names)
+    return imported
+
+
+def _module_name(path: str) -> Optional[tuple[str, bool]]:
+    """Returns the module name of a path in an archive and whether it's a package."""
+    pure = PurePosixPath(path)
+    if pure.suffix not in (".py", ".pyc"):
+        return None
+    parts = list(pure.with_suffix("").parts)
+    is_package = parts[-1] == "__init__"
+    if is_package:
+        parts.pop()
+    return ".".join(parts), is_package
+
+
+def project_imports(project_dir: Path, project_config: dict) -> set[str]:
+    """
+    Returns the modules imported by the Python code of a project, including the
+    code of the archives unpacked by the runtime, i.e. snapshots.
+
+    Args:
+        project_dir(Path): path to the project folder.
+        project_config(dict): configuration of the project.
+
+    Returns:
+        set[str]: the absolute names of the imported modules.
+    """
+    imported: set[str] = set()
+    for path in project_dir.rglob("*.py"):
+        if any(part.startswith(".") for part in path.relative_to(project_dir).parts):
+            continue
+        imported |= find_imports(path.read_text(encoding="utf-8", errors="replace"))
+
+    for url, destination in project_config.get("files", {}).items():
+        path = project_dir / url
+        if not (str(destination).endswith("/*") and zipfile.is_zipfile(path)):
+            continue
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                module = _module_name(name)
+                if module and name.endswith(".py"):
+                    source = zf.read(name).decode("utf-8", errors="replace")
+                    imported |= find_imports(source, *module)
+    return imported
+
+
+def reachable_packages(
+    stdlib: zipfile.ZipFile, roots: set[str], host_stdlib: Optional[Path] = None
+) -> set[str]:
+    """
+    Returns the top level modules and packages of the standard library that can
+    be imported starting from the `roots` modules.
+
+    Whole top level packages are kept, as their modules often import each other
+    lazily. When the archive only holds bytecode, the imports are read from the
+    sources of the standard library of the local Python, which is close enough.
+
+    Args:
+        stdlib(ZipFile): the standard library archive of the runtime.
+        roots(set[str]): names of the modules imported by the app.
+        host_stdlib(Path): folder of the local standard library sources.
+
+    Returns:
+        set[str]: the names of the top level modules and packages to keep.
+    """
+    if host_stdlib is None:
+        host_stdlib = Path(sysconfig.get_paths()["stdlib"])
+
+    # Top level name -> [(module name, is package, path in the archive)]
+    modules: dict[str, list[tuple[str, bool, str]]] = {}
+    for name in stdlib.namelist():
+        if module_info := _module_name(name):
+            modules.setdefault(_top_level(module_info[0]), []).append(
+                (*module_info, name)
+            )
+
+    kept: set[str] = set()
+    pending = [_top_level(name) for name in roots]
+    while pending:
+        top = pending.pop()
+        if top in kept or top not in modules:
+            continue
+        kept.add(top)
+        for module, is_package, name in modules[top]:
+            if name.endswith(".py"):
+                source = stdlib.read(name).decode("utf-8", errors="replace")
+            else:
+                host_path = host_stdlib / PurePosixPath(name).with_suffix(".py")
+                if not host_path.is_file():
+                    continue
+                source = host_path.read_text(encoding="utf-8", errors="replace")
+            pending.extend(
+                _top_level(imported)
+                for imported in find_imports(source, module, is_package)
+            )
+    return kept
+
+
+def write_trimmed_stdlib(
+    stdlib: zipfile.ZipFile, kept: set[str], output: Path
+) -> tuple[int, int]:
+    """
+    Writes the files of the standard library archive that belong to the `kept`
+    top level modules, and the ones that aren't modules, to `output`.
+
+    Args:
+        stdlib(ZipFile): the standard library archive of the runtime.
+        kept(set[str]): top level modules and packages to keep.
+        output(Path): path of the archive to be written.
+
+    Returns:
+        tuple(int, int): the number of files kept and of files in `stdlib`.
+    """
+    names = stdlib.namelist()
+    count = 0
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name in names:
+            top = PurePosixPath(name).parts[0]
+            module = _module_name(name)
+            is_dir_entry = name.endswith("/")
+            if module is not None:
+                keep = _top_level(module[0]) in kept
+            else:
+                # Data files of packages go with them, files at the root stay
+                keep = "/" not in name.rstrip("/") or top in kept
+            if keep and not is_dir_entry:
+                zf.writestr(stdlib.getinfo(name), stdlib.read(name))
+                count += 1
+    return count, len([name for name in names if not name.endswith("/")])
+
+
+def _lock_file_with_absolute_urls(lock_data: bytes, base_url: str) -> str:
+    # Packages are downloaded relative to the lock file: point them to the CDN,
+    # so that only the runtime itself needs to be served with the app.
+    lock = json.loads(lock_data)
+    for package in lock.get("packages", {}).values():
+        file_name = package.get("file_name", "")
+        if file_name and "://" not in file_name:
+            package["file_name"] = f"{base_url}{file_name}"
+    return json.dumps(lock)
+
+
+@app.command()
+def trim(
+    path: Path = typer.Argument(Path("."), help="The path of the project to trim."),
+    keep: Optional[list[str]] = typer.Option(
+        None,
+        "-k",
+        "--keep",
+        help="Module of the standard library to keep, i.e. because it's imported "
+        "dynamically. Can be used several times.",
+    ),
+    pyodide_version: Optional[str] = typer.Option(
+        None,
+        "--pyodide-version",
+        help=f"Version of Pyodide the app runs on. Defaults to the one used by a "
+        f"previous run, or {DEFAULT_PYODIDE_VERSION}.",
+    ),
+    output_dir: str = typer.Option(
+        DEFAULT_OUTPUT_DIR,
+        "-o",
+        "--output",
+        help="Folder of the project the runtime is written to.",
+    ),
+):
+    """
+    Bundles the Pyodide runtime with a standard library reduced to the modules the
+    app can import, which is faster to download and to load.
+    """
+    config_path = path / config["project_config_filename"]
+    if not config_path.is_file():
+        raise cli.Abort(f"Error: {config_path} is not a PyScript project config file.")
+
+    project_config = load_config_file(config_path)
+    if project_config.get("runtime") == "micropython":
+        raise cli.Abort("Error: only the standard library of Pyodide can be trimmed.")
+
+    previous = project_config.get("stdlib", {})
+    version = pyodide_version or previous.get(
+        "pyodide_version", DEFAULT_PYODIDE_VERSION
+    )
+    kept_modules = sorted(set(previous.get("keep", [])) | set(keep or []))
+    base_url = pyodide_base_url(version)
+
+    roots = project_imports(path, project_config) | set(ALWAYS_KEPT) | set(kept_modules)
+    if project_config.get("packages"):
+        roots |= set(MICROPIP_KEPT)
+
+    target = path / output_dir
+    target.mkdir(exist_ok=True)
+    try:
+        # The files of a release never change: they are downloaded once, and
+        # shared by the projects through the store
+        with console.status(f"Downloading Pyodide {version}..."):
+            for name in RUNTIME_FILES:
+                _store.install_url(f"{base_url}{name}", _download, target / name)
+            lock_data = _store.read_url(f"{base_url}{LOCK_FILE}", _download)
+            stdlib_data = _store.read_url(f"{base_url}{STDLIB_FILE}", _download)
+    except requests.RequestException as e:
+        raise cli.Abort(f"Error: couldn't download Pyodide {version}: {e}")
+    _store.install_bytes(
+        _lock_file_with_absolute_urls(lock_data, base_url).encode("utf-8"),
+        target / LOCK_FILE,
+    )
+
+    with zipfile.ZipFile(io.BytesIO(stdlib_data)) as stdlib:
+        # sysconfig imports the module describing the platform by its name
+        roots.update(
+            _top_level(module[0])
+            for name in stdlib.namelist()
+            if (module := _module_name(name)) and module[0].startswith("_sysconfigdata")
+        )
+        kept = reachable_packages(stdlib, roots)
+        # A previous archive is a read-only link to the store: don't write to it
+        (target / STDLIB_FILE).unlink(missing_ok=True)
+        count, total = write_trimmed_stdlib(stdlib, kept, target / STDLIB_FILE)
+    # Projects keeping the same modules share their archive
+    _store.install_file(target / STDLIB_FILE, target / STDLIB_FILE)
+    trimmed_size = (target / STDLIB_FILE).stat().st_size
+
+    update_config_file(
+        config_path,
+        {
+            "interpreter": f"./{output_dir}/pyodide.mjs",
+            "stdlib": {"pyodide_version": version, "keep": kept_modules},
+        },
+    )
+
+    if project_config.get("packages"):
+        console.print(
+            "The imports of the packages installed by the runtime can't be analyzed: "
+            "if they fail, use --keep to keep the modules they need.",
+            style="yellow",
+        )
+    cli.ok(
+        f"Kept {count} of {total} files of the standard library "
+        f"({trimmed_size / 1_000_000:.1f}MB instead of "
+        f"{len(stdlib_data) / 1_000_000:.1f}MB) in {target / STDLIB_FILE}"
+    )
+
+
+@plugins.register
+def pyscript_subcommand():
+    return trim
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import difflib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import unquote
+
+import typer
+
+from pyscript import app, cli, config, console, plugins
+from pyscript._config import load_config_file
+from pyscript._fs import atomic_write_text
+from pyscript._generator import (
+    PYSCRIPT_RELEASES_URL,
+    SERVICE_WORKER_FILENAME,
+    _get_latest_pyscript_version,
+    render_service_worker,
+)
+from pyscript._index import find_projects
+from pyscript._project import parse_page
+
+RELEASE_URL = re.compile(
+    re.escape(PYSCRIPT_RELEASES_URL) + r"/(?P<version>[^/\"'\s]+)/"
+)
+# Name of the app in the caches of a generated service worker
+CACHE_APP = re.compile(r"^const CACHE_APP = (?P<name>.+);$", re.MULTILINE)
+
+
+def project_files(project_dir: Path) -> list[Path]:
+    """Returns the files of a project that may reference a PyScript release."""
+    return [
+        *sorted(project_dir.glob("*.html")),
+        project_dir / config["project_config_filename"],
+    ]
+
+
+def upgrade_file(path: Path, version: str, dry_run: bool) -> Optional[str]:
+    """
+    Points the PyScript release URLs in a file to `version`.
+
+    Args:
+        path(Path): path to the file to be upgraded.
+        version(str): PyScript version the file should use.
+        dry_run(bool): don't write the changes to the file.
+
+    Returns:
+        str: the diff of the changes made to the file, None if it was up to date.
+    """
+    text = path.read_text(encoding="utf-8")
+    new_text = RELEASE_URL.sub(f"{PYSCRIPT_RELEASES_URL}/{version}/", text)
+    return _write_changes(path, text, new_text, dry_run)
+
+
+def upgrade_service_worker(
+    project_dir: Path, version: str, dry_run: bool
+) -> Optional[str]:
+    """
+    Generates the service worker of an offline project again for `version`, so
+    that it precaches that release, under a new cache name.
+
+    Args:
+        project_dir(Path): path to the project folder.
+        version(str): PyScript version the project should use.
+        dry_run(bool): don't write the changes to the service worker.
+
+    Returns:
+        str: the diff of the changes made to the service worker, None if it was
+             up to date or the project doesn't register one.
+    """
+    path = project_dir / SERVICE_WORKER_FILENAME
+    registration = f'register("./{SERVICE_WORKER_FILENAME}")'
+    for page_path in sorted(project_dir.glob("*.html")):
+        if registration in page_path.read_text(encoding="utf-8"):
+            break
+    else:
+        return None
+
+    page = parse_page(page_path)
+    config_file = project_dir / config["project_config_filename"]
+    project_config = load_config_file(config_file) if config_file.is_file() else {}
+    text = path.read_text(encoding="utf-8")
+    # Keep the name of the app, so the new worker drops the caches of the old one
+    match = CACHE_APP.search(text)
+    title = (
+        unquote(json.loads(match.group("name")))
+        if match
+        else project_config.get("name", project_dir.name)
+    )
+    new_text = render_service_worker(
+        title,
+        _page_path(page.python_urls, config["project_main_filename"]),
+        _page_path(page.config_urls, config["project_config_filename"]),
+        page_path.name,
+        version,
+        project_config,
+    )
+    return _write_changes(path, text, new_text, dry_run)
+
+
+def _page_path(urls: list[str], default: str) -> str:
+    return urls[0].removeprefix("./") if urls else default
+
+
+def _write_changes(
+    path: Path, text: str, new_text: str, dry_run: bool
+) -> Optional[str]:
+    """Writes `new_text` to `path`, unless it didn't change, and returns the diff."""
+    if new_text == text:
+        return None
+
+    if not dry_run:
+        atomic_write_text(path, new_text)
+    return "".join(
+        difflib.unified_diff(
+            text.splitlines(keepends=True),
+            new_text.splitlines(keepends=True),
+            fromfile=str(path),
+            tofile=str(path),
+        )
+    )
+
+
+@app.command()
+def upgrade(
+    root: Path = typer.Argument(
+        Path("."), help="The folder to search for projects to upgrade."
+    ),
+    version: Optional[str] = typer.Option(
+        None,
+        "--to",
+        help="PyScript version to upgrade to. Defaults to the latest release.",
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Show the changes without writing them."
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "-j", "--jobs", help="Number of files upgraded in parallel."
+    ),
+    use_index: bool = typer.Option(
+        True,
+        "--index/--no-index",
+        help="Reuse the saved list of projects in the folder.",
+    ),
+):
+    """
+    Upgrades the PyScript version used by all the projects in a folder.
+    """
+    if not root.is_dir():
+        raise cli.Abort(f"Error: Path {root} is not a folder.")
+    target_version = version or _get_latest_pyscript_version()
+
+    project_dirs = find_projects(root, use_index=use_index, jobs=jobs)
+    upgrades: list[Callable[[], Optional[str]]] = [
+        partial(upgrade_file, path, target_version, dry_run)
+        for project_dir in project_dirs
+        for path in project_files(project_dir)
+        if path.is_file()
+    ]
+    # Service workers are generated again, as they name their cache after the
+    # release they precache
+    upgrades += [
+        partial(upgrade_service_worker, project_dir, target_version, dry_run)
+        for project_dir in project_dirs
+        if (project_dir / SERVICE_WORKER_FILENAME).is_file()
+    ]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        diffs = list(executor.map(lambda upgrade: upgrade(), upgrades))
+
+    changed = [diff for diff in diffs if diff]
+    if dry_run:
+        for diff in changed:
+            console.print(diff, end="", markup=False, highlight=False, soft_wrap=True)
+        cli.ok(f"{len(changed)} files would be upgraded to PyScript {target_version}.")
+    cli.ok(f"{len(changed)} files upgraded to PyScript {target_version}.")
+
+
+@plugins.register
+def pyscript_subcommand():
+    return upgrade
@@ -0,0 +1,80 @@
+// Service worker of {{ title }}, generated by pyscript-cli.
+//
+// The files of the app and the PyScript release are downloaded when the worker
+// is installed. The PyScript release, the runtime and the packages, which never
+// change for a given URL, are then served from the cache first, while the files
+// of the app and the package index are fetched from the network first, falling
+// back to the cache when offline.
+const CACHE_APP = {{ cache_app|tojson }};
+const CACHE_NAME = {{ cache_name|tojson }};
+const PRECACHE_URLS = {{ precache_urls|tojson }};
+const IMMUTABLE_ORIGINS = {{ immutable_origins|tojson }};
+const NETWORK_FIRST_ORIGINS = [self.location.origin, ...{{ network_first_origins|tojson }}];
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(
+    caches
+      .open(CACHE_NAME)
+      .then((cache) =>
+        cache.addAll(
+          PRECACHE_URLS.map((url) => new Request(url, { mode: "cors" }))
+        )
+      )
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", (event) => {
+  // Drop the caches of the previous versions of the app, named
+  // `pyscript:<app>:<version>-<digest>`, but not the ones of the other apps
+  // of the origin, even when their name starts like its own
+  const isOldCache = (name) => {
+    const [prefix, app] = name.split(":");
+    return prefix === "pyscript" && app === CACHE_APP && name !== CACHE_NAME;
+  };
+  event.waitUntil(
+    caches
+      .keys()
+      .then((names) =>
+        Promise.all(names.filter(isOldCache).map((name) => caches.delete(name)))
+      )
+      .then(() => self.clients.claim())
+  );
+});
+
+const cacheFirst = async (request) => {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    const cache = await caches.open(CACHE_NAME);
+    cache.put(request, response.clone());
+  }
+  return response;
+};
+
+const networkFirst = async (request) => {
+  try {
+    const response = await fetch(request);
+    if (response.ok) {
+      const cache = await caches.open(CACHE_NAME);
+      cache.put(request, response.clone());
+    }
+    return response;
+  } catch (error) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    throw error;
+  }
+};
+
+self.addEventListener("fetch", (event) => {
+  const { request } = event;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+  if (IMMUTABLE_ORIGINS.includes(url.origin)) {
+    event.respondWith(cacheFirst(request));
+  } else if (NETWORK_FIRST_ORIGINS.includes(url.origin)) {
+    event.respondWith(networkFirst(request));
+  }
+});
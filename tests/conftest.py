@@ -20,6 +20,31 @@ def requests():
         yield mocked_requests
 
 
+@pytest.fixture(autouse=True)
+def index_dir(monkeypatch, tmp_path_factory) -> Path:
+    """Keep the project indexes written by the tests out of the user data folder."""
+    index_dir = tmp_path_factory.mktemp("index")
+    monkeypatch.setattr("pyscript._index.INDEX_DIR", index_dir)
+    return index_dir
+
+
+@pytest.fixture(autouse=True)
+def servers_registry(monkeypatch, tmp_path_factory) -> Path:
+    """Keep the servers started by the tests out of the user data folder."""
+    data_dir = tmp_path_factory.mktemp("servers")
+    monkeypatch.setattr("pyscript._servers.REGISTRY_FILE", data_dir / "servers.json")
+    monkeypatch.setattr("pyscript._servers.LOGS_DIR", data_dir / "logs")
+    return data_dir / "servers.json"
+
+
+@pytest.fixture(autouse=True)
+def store_dir(monkeypatch, tmp_path_factory) -> Path:
+    """Keep the files stored by the tests out of the user data folder."""
+    store_dir = tmp_path_factory.mktemp("store")
+    monkeypatch.setattr("pyscript._store.STORE_DIR", store_dir)
+    return store_dir
+
+
 @pytest.fixture
 def auto_enter(monkeypatch):
     """
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _generator as gen
+from pyscript.plugins import analyze
+from pyscript.plugins.analyze import RUNTIME_ASSETS, parse_size
+
+
+@pytest.fixture()
+def project_path(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    gen.create_project("app", "", "", "", pyscript_version="2024.2.1")
+    project_path = tmp_path / "app"
+    (project_path / "data.csv").write_text("a,b\n" * 1000)
+    (project_path / "pyscript.toml").write_text(
+        'name = "app"\npackages = ["numpy"]\n\n[files]\n"./data.csv" = "data.csv"\n'
+    )
+    return project_path
+
+
+def test_analyze_json(invoke_cli: CLIInvoker, project_path: Path):  # noqa: F811
+    """
+    Test that analyze reports every resource fetched by the page, with their sizes
+    """
+    # GIVEN a call to analyze with the JSON output
+    result = invoke_cli("analyze", str(project_path), "--json")
+
+    # EXPECT the command to succeed
+    assert result.exit_code == 0
+    report = json.loads(result.stdout)
+
+    # EXPECT the page, its local files, the runtime and the packages to be listed
+    resources = {r["url"]: r for r in report["resources"]}
+    assert resources["./data.csv"]["kind"] == "file"
+    assert resources["./data.csv"]["size"] == 4000
+    assert resources["./data.csv"]["compressed_size"] < 4000
+    assert resources["./main.py"]["kind"] == "python"
+    assert resources["./pyscript.toml"]["kind"] == "config"
+    assert resources["numpy"] == {
+        "kind": "package",
+        "url": "numpy",
+        "size": None,
+        "compressed_size": None,
+        "estimated": False,
+    }
+    assert set(RUNTIME_ASSETS["pyodide"]) < set(resources)
+    assert "https://pyscript.net/releases/2024.2.1/core.js" in report["unknown_sizes"]
+    assert report["requests"] == len(report["resources"])
+    assert report["compressed_size"] == sum(
+        r["compressed_size"] or 0 for r in report["resources"]
+    )
+
+
+def test_analyze_local_runtime(
+    invoke_cli: CLIInvoker, project_path: Path  # noqa: F811
+):
+    """
+    Test that the runtime files served with the app, i.e. by trim, are measured
+    """
+    # GIVEN a project loading a local Pyodide
+    runtime_path = project_path / "pyodide"
+    runtime_path.mkdir()
+    for name in RUNTIME_ASSETS["pyodide"]:
+        (runtime_path / name).write_bytes(b"x" * 100)
+    (project_path / "pyscript.toml").write_text(
+        'name = "app"\ninterpreter = "./pyodide/pyodide.mjs"\n'
+    )
+
+    result = invoke_cli("analyze", str(project_path), "--json")
+
+    # EXPECT the sizes of the local runtime files to be reported
+    assert result.exit_code == 0
+    resources = {r["url"]: r for r in json.loads(result.stdout)["resources"]}
+    assert resources["python_stdlib.zip"]["size"] == 100
+    assert not resources["python_stdlib.zip"]["estimated"]
+
+
+@pytest.mark.parametrize(
+    "budget_args, exit_code",
+    [
+        (("--max-bytes", "100M"), 0),
+        (("--max-bytes", "100K"), 1),
+        (("--max-requests", "100"), 0),
+        (("--max-requests", "3"), 1),
+    ],
+)
+def test_analyze_budget(
+    invoke_cli: CLIInvoker, project_path: Path, budget_args, exit_code  # noqa: F811
+):
+    """
+    Test that analyze fails when the page is over budget
+    """
+    result = invoke_cli("analyze", str(project_path), *budget_args)
+
+    assert result.exit_code == exit_code
+    if exit_code:
+        assert "budget" in result.stdout
+
+
+def test_analyze_budget_unknown_sizes(
+    invoke_cli: CLIInvoker, project_path: Path  # noqa: F811
+):
+    """
+    Test that the budget check says which resources it can't count
+    """
+    result = invoke_cli("analyze", str(project_path), "--max-bytes", "100M")
+
+    assert result.exit_code == 0
+    # The console wraps long lines
+    output = " ".join(result.stdout.split())
+    assert "not counted in the --max-bytes budget" in output
+    assert "core.css, numpy" in output
+
+
+def test_analyze_invalid_max_bytes(
+    invoke_cli: CLIInvoker, project_path: Path  # noqa: F811
+):
+    """
+    Test that an invalid budget is reported before analyzing the page
+    """
+    with mock.patch.object(analyze, "collect_resources") as collect_resources_mock:
+        result = invoke_cli("analyze", str(project_path), "--max-bytes", "lots")
+
+    assert result.exit_code == 2
+    assert "'lots' is not a valid size" in result.output
+    collect_resources_mock.assert_not_called()
+
+
+def test_analyze_fetch_remote(invoke_cli: CLIInvoker, project_path: Path):  # noqa: F811
+    """
+    Test that --fetch-remote measures the runtime from the Pyodide CDN, and the
+    packages with their dependencies from the Pyodide distribution or PyPI
+    """
+    # GIVEN packages from the Pyodide distribution and from PyPI
+    (project_path / "pyscript.toml").write_text(
+        'name = "app"\npackages = ["numpy", "pandas", "attrs==23.2.0"]\n'
+    )
+    base_url = "https://cdn.jsdelivr.net/pyodide/v0.25.0/full/"
+    attrs_url = "https://files.pythonhosted.org/attrs-23.2.0-py3-none-any.whl"
+    documents = {
+        f"{base_url}pyodide-lock.json": {
+            "packages": {
+                "numpy": {"file_name": "numpy-1.26.1-cp311.whl", "depends": []},
+                "pandas": {
+                    "file_name": "pandas-1.5.3-cp311.whl",
+                    "depends": ["numpy", "python-dateutil"],
+                },
+                "python-dateutil": {
+                    "file_name": "python_dateutil-2.8.2-py2.py3-none-any.whl",
+                    "depends": [],
+                },
+            }
+        },
+        "https://pypi.org/pypi/attrs/23.2.0/json": {
+            "urls": [
+                {"filename": "attrs-23.2.0.tar.gz", "url": "sdist"},
+                {"filename": "attrs-23.2.0-py3-none-any.whl", "url": attrs_url},
+            ]
+        },
+    }
+    measured: list[str] = []
+
+    def measure_url(url: str) -> tuple[int, int]:
+        measured.append(url)
+        return 1000, 100
+
+    with mock.patch.object(analyze, "measure_url", measure_url), mock.patch.object(
+        analyze, "fetch_json", documents.get
+    ):
+        result = invoke_cli("analyze", str(project_path), "--json", "--fetch-remote")
+
+    # EXPECT every resource to be measured where the browser downloads it from
+    assert result.exit_code == 0
+    report = json.loads(result.stdout)
+    assert report["unknown_sizes"] == []
+    assert f"{base_url}pyodide.asm.wasm" in measured
+    assert [r["url"] for r in report["resources"] if r["kind"] == "package"] == [
+        "numpy",
+        "pandas",
+        "python-dateutil",
+        "attrs==23.2.0",
+    ]
+    assert f"{base_url}pandas-1.5.3-cp311.whl" in measured
+    assert attrs_url in measured
+    assert report["compressed_size"] == sum(
+        r["compressed_size"] for r in report["resources"]
+    )
+
+
+def test_analyze_invalid_inline_config(
+    invoke_cli: CLIInvoker, project_path: Path  # noqa: F811
+):
+    """
+    Test that analyze reports inline configs that can't be parsed, instead of
+    crashing
+    """
+    (project_path / "index.html").write_text(
+        '<script type="py" src="./main.py" config="{not json"></script>'
+    )
+
+    result = invoke_cli("analyze", str(project_path), "--json")
+
+    assert result.exit_code == 0
+    [problem] = json.loads(result.stdout)["problems"]
+    assert problem.startswith("index.html: invalid inline config")
+
+    result = invoke_cli("analyze", str(project_path))
+    assert result.exit_code == 0
+    assert "Warning: index.html: invalid inline config" in result.stdout
+
+
+def test_analyze_preloaded_wheel(
+    invoke_cli: CLIInvoker, project_path: Path  # noqa: F811
+):
+    """
+    Test that the local wheels preloaded by the page are only counted once, as
+    packages
+    """
+    (project_path / "lib-1.0-py3-none-any.whl").write_bytes(b"x" * 1000)
+    (project_path / "pyscript.toml").write_text(
+        'name = "app"\npackages = ["./lib-1.0-py3-none-any.whl"]\n'
+    )
+    html = (project_path / "index.html").read_text()
+    (project_path / "index.html").write_text(
+        html.replace(
+            "</head>",
+            '<link rel="preload" href="./lib-1.0-py3-none-any.whl" as="fetch">'
+            "</head>",
+        )
+    )
+
+    result = invoke_cli("analyze", str(project_path), "--json")
+
+    assert result.exit_code == 0
+    wheels = [
+        r
+        for r in json.loads(result.stdout)["resources"]
+        if r["url"] == "./lib-1.0-py3-none-any.whl"
+    ]
+    assert [r["kind"] for r in wheels] == ["package"]
+    assert wheels[0]["size"] == 1000
+
+
+def test_analyze_missing_page(invoke_cli: CLIInvoker):  # noqa: F811
+    result = invoke_cli("analyze", "--html", "missing.html")
+
+    assert result.exit_code == 1
+    assert "missing.html does not exist" in result.stdout
+
+
+@pytest.mark.parametrize(
+    "value, expected", [("1000", 1000), ("1.5K", 1500), ("2mb", 2_000_000)]
+)
+def test_parse_size(value: str, expected: int):
+    assert parse_size(value) == expected
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _generator as gen
+from pyscript.plugins import check
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path: Path, monkeypatch) -> Path:
+    cache_file = tmp_path / "check-cache.json"
+    monkeypatch.setattr(check, "CACHE_FILE", cache_file)
+    return cache_file
+
+
+@pytest.fixture()
+def projects(tmp_path: Path, monkeypatch) -> list[Path]:
+    monkeypatch.chdir(tmp_path)
+    for name in ("app1", "app2"):
+        gen.create_project(name, "", "", "", pyscript_version="2024.2.1")
+    return [tmp_path / "app1", tmp_path / "app2"]
+
+
+def test_check_valid_projects(
+    invoke_cli: CLIInvoker, projects: list[Path]  # noqa: F811
+):
+    """
+    Test that check succeeds on freshly created projects
+    """
+    result = invoke_cli("check", *map(str, projects))
+
+    assert result.exit_code == 0
+    assert "2 projects checked" in result.stdout
+
+
+def test_check_folder_of_projects(
+    invoke_cli: CLIInvoker, tmp_path: Path, projects: list[Path]  # noqa: F811
+):
+    """
+    Test that check finds the projects in the folders it's given
+    """
+    result = invoke_cli("check", str(tmp_path))
+
+    assert result.exit_code == 0
+    assert "2 projects checked" in result.stdout
+
+
+def test_check_errors(invoke_cli: CLIInvoker, projects: list[Path]):  # noqa: F811
+    """
+    Test that check reports broken configs, missing files, unrendered templates
+    and syntax errors
+    """
+    # GIVEN a project with a broken config and a syntax error
+    app1, app2 = projects
+    (app1 / "pyscript.toml").write_text('packages = "numpy"\n[files]\n"./x.csv" = ""\n')
+    (app1 / "main.py").write_text("print('hi'))\n")
+    # AND a project with an unrendered page and a missing python file
+    (app2 / "index.html").write_text(
+        '<title>{{ title }}</title><script type="py" src="./other.py"></script>'
+        '<script type="py" config="{not json"></script>'
+    )
+
+    result = invoke_cli("check", *map(str, projects))
+
+    # EXPECT the command to fail, reporting all the errors
+    assert result.exit_code == 1
+    assert "'packages' should be a list, not a str" in result.stdout
+    assert "config: file ./x.csv does not exist" in result.stdout
+    # The message of the error depends on the Python version, not its location
+    assert re.search(r"main\.py: .+ \(main\.py, line 1\)", result.stdout)
+    assert "index.html: unrendered template tag {{ title }}" in result.stdout
+    assert "index.html: ./other.py does not exist" in result.stdout
+    assert "index.html: invalid inline config" in result.stdout
+    assert "2 of 2 projects have errors" in result.stdout
+
+
+def test_check_unparsable_config(
+    invoke_cli: CLIInvoker, projects: list[Path]  # noqa: F811
+):
+    (projects[0] / "pyscript.toml").write_text("name = \n")
+
+    result = invoke_cli("check", str(projects[0]))
+
+    assert result.exit_code == 1
+    assert "pyscript.toml can't be parsed" in result.stdout
+
+
+def test_check_micropython_imports(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    gen.create_project("app", "", "", "", runtime="micropython")
+    (tmp_path / "app" / "helpers.py").write_text("import json\n")
+    (tmp_path / "app" / "main.py").write_text("import helpers\nimport numpy\n")
+
+    errors = check.check_project(tmp_path / "app")
+
+    assert errors == ["main.py: modules not available in MicroPython: numpy"]
+
+
+def test_check_cached(invoke_cli: CLIInvoker, projects: list[Path]):  # noqa: F811
+    """
+    Test that unchanged projects are not checked again
+    """
+    # GIVEN a first check of a broken and a valid project
+    app1, app2 = projects
+    (app1 / "main.py").write_text("print('hi'\n")
+    first_result = invoke_cli("check", str(app1))
+    invoke_cli("check", str(app2))
+
+    # AND a change to the valid project
+    (app2 / "main.py").write_text("print('changed')\n")
+
+    with mock.patch.object(
+        check, "check_project", wraps=check.check_project
+    ) as check_project_mock:
+        result_app1 = invoke_cli("check", str(app1))
+        result_app2 = invoke_cli("check", str(app2))
+
+    # EXPECT the cached errors to be reported for the unchanged project
+    assert result_app1.exit_code == 1
+    assert result_app1.stdout == first_result.stdout
+    # EXPECT only the project that changed since its last check to be checked
+    assert result_app2.exit_code == 0
+    check_project_mock.assert_called_once_with(app2)
+
+
+def test_check_no_cache(invoke_cli: CLIInvoker, projects: list[Path]):  # noqa: F811
+    invoke_cli("check", str(projects[0]))
+
+    with mock.patch.object(
+        check, "check_project", wraps=check.check_project
+    ) as check_project_mock:
+        result = invoke_cli("check", str(projects[0]), "--no-cache")
+
+    assert result.exit_code == 0
+    check_project_mock.assert_called_once()
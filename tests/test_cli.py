@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import pstats
+import subprocess
+import sys
 from pathlib import Path
 from typing import TYPE_CHECKING, Callable
 
 import pytest
+import toml
 from mypy_extensions import VarArg
 from typer.testing import CliRunner, Result
 
@@ -41,6 +45,20 @@ def invoke_cli(tmp_path: Path, monkeypatch: MonkeyPatch) -> CLIInvoker:
     return f
 
 
+@pytest.mark.parametrize("plugin", ["check", "deploy", "run", "stop", "test"])
+def test_import_plugin_first(plugin: str) -> None:
+    """
+    Test that a plugin can be imported before the CLI, which imports all the
+    plugins, i.e. that plugins don't import each other
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", f"import pyscript.plugins.{plugin}"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
 def test_version() -> None:
     runner = CliRunner()
     result = runner.invoke(app, "--version")
@@ -78,7 +96,7 @@ def test_create_command_bad_app_type(
     result = invoke_cli("create", "myapp", "--project-type", "bad_type")
     assert (
         str(result.exception)
-        == "Unknown project type: bad_type. Valid values are: 'app'"
+        == "Unknown project type: bad_type. Valid values are: 'app', 'worker'"
     )
 
 
@@ -141,6 +159,117 @@ def test_create_command_with_single_py_file(
     assert 'author_name = "tester"' in config_text
 
 
+def test_create_micropython_warns_about_imports(
+    invoke_cli: CLIInvoker, tmp_path: Path, app_details_args: list[str]
+) -> None:
+    input_file = tmp_path / "hello.py"
+    input_file.write_text("import numpy\nimport json\n")
+
+    result = invoke_cli(
+        "create", "hello.py", "--runtime", "micropython", *app_details_args
+    )
+
+    assert result.exit_code == 0
+    assert "not available in MicroPython: numpy" in result.stdout
+    assert (tmp_path / "hello" / "index.html").exists()
+
+
+def test_create_offline_adds_service_worker(
+    invoke_cli: CLIInvoker, tmp_path: Path, app_details_args: list[str]
+) -> None:
+    result = invoke_cli("create", "myapp", "--offline", *app_details_args)
+
+    assert result.exit_code == 0
+    html = (tmp_path / "myapp" / "index.html").read_text()
+    assert 'navigator.serviceWorker.register("./sw.js")' in html
+    service_worker = (tmp_path / "myapp" / "sw.js").read_text()
+    assert '"./main.py"' in service_worker
+    assert '"./pyscript.toml"' in service_worker
+    assert "/core.js" in service_worker
+
+
+def test_create_from_dir(
+    invoke_cli: CLIInvoker, tmp_path: Path, app_details_args: list[str]
+) -> None:
+    package = tmp_path / "mylib"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "notes.md").write_text("")
+
+    result = invoke_cli(
+        "create",
+        "myapp",
+        "--from-dir",
+        "mylib",
+        "--ignore",
+        "*.md",
+        *app_details_args,
+    )
+
+    assert result.exit_code == 0
+    assert (tmp_path / "myapp" / "mylib" / "__init__.py").exists()
+    assert not (tmp_path / "myapp" / "mylib" / "notes.md").exists()
+    config_text = (tmp_path / "myapp" / "pyscript.toml").read_text()
+    assert '"./mylib/__init__.py" = "./mylib/__init__.py"' in config_text
+
+
+def test_create_from_dir_resource_hints(
+    invoke_cli: CLIInvoker, tmp_path: Path, app_details_args: list[str]
+) -> None:
+    """
+    Test that the page of a project created from a snapshotted app preloads its
+    files, wheels and archive, and preconnects to the package index
+    """
+    source = tmp_path / "existing"
+    source.mkdir()
+    (source / "main.py").write_text("import numpy")
+    (source / "data.csv").write_text("1,2")
+    (source / "lib-1.0-py3-none-any.whl").write_bytes(b"wheel")
+    (source / "snapshot.zip").write_bytes(b"zip")
+    (source / "pyscript.toml").write_text(
+        'name = "existing"\n'
+        'packages = ["numpy", "./lib-1.0-py3-none-any.whl"]\n'
+        '[files]\n"./snapshot.zip" = "./*"\n'
+        '[snapshot]\narchive = "./snapshot.zip"\npackages = ["attrs"]\n'
+    )
+
+    result = invoke_cli(
+        "create", "myapp", "--from-dir", "existing", "--offline", *app_details_args
+    )
+
+    assert result.exit_code == 0
+    manifest = toml.load(tmp_path / "myapp" / "pyscript.toml")
+    assert manifest["name"] == "myapp"
+    assert manifest["files"]["./snapshot.zip"] == "./*"
+    assert manifest["snapshot"]["packages"] == ["attrs"]
+    html = (tmp_path / "myapp" / "index.html").read_text()
+    for url in ("./data.csv", "./lib-1.0-py3-none-any.whl", "./snapshot.zip"):
+        assert f'<link rel="preload" href="{url}" as="fetch" crossorigin>' in html
+    assert '<link rel="preconnect" href="https://pypi.org" crossorigin>' in html
+    service_worker = (tmp_path / "myapp" / "sw.js").read_text()
+    assert '"./snapshot.zip"' in service_worker
+
+
+def test_create_from_missing_dir_fails(
+    invoke_cli: CLIInvoker, app_details_args: list[str]
+) -> None:
+    result = invoke_cli("create", "myapp", "--from-dir", "nowhere", *app_details_args)
+
+    assert result.exit_code == 1
+    assert "nowhere is not a folder" in result.stdout
+
+
+def test_create_offline_embed_fails(
+    invoke_cli: CLIInvoker, app_details_args: list[str]
+) -> None:
+    result = invoke_cli(
+        "create", "--wrap", "-c", "print(1)", "--embed", "--offline", *app_details_args
+    )
+
+    assert result.exit_code == 1
+    assert "`--offline` can't be used with `--embed`" in result.stdout
+
+
 @pytest.mark.parametrize("flag", ["-c", "--command"])
 def test_wrap_command(
     invoke_cli: CLIInvoker, tmp_path: Path, flag: str, app_details_args: list[str]
@@ -203,6 +332,48 @@ def test_wrap_file(
     assert command in py_text
 
 
+def test_wrap_embed_command(
+    invoke_cli: CLIInvoker, tmp_path: Path, app_details_args: list[str]
+) -> None:
+    """
+    Test that when wrap is called with --embed, the code and config are inlined
+    in a single HTML file
+    """
+    command = 'print("<b>Hello</b> & </py-script> World!")'
+    result = invoke_cli(
+        "create",
+        "--wrap",
+        "--embed",
+        "-c",
+        command,
+        "-o",
+        "output.html",
+        *app_details_args,
+    )
+    assert result.exit_code == 0
+
+    # EXPECT only the HTML file to be created
+    app_path = tmp_path / "output"
+    assert [p.name for p in app_path.iterdir()] == ["output.html"]
+
+    html_text = (app_path / "output.html").read_text()
+    # EXPECT the code to be HTML escaped inside the inline tag
+    assert (
+        "print(&#34;&lt;b&gt;Hello&lt;/b&gt; &amp; &lt;/py-script&gt; World!&#34;)"
+        in html_text
+    )
+    assert "<py-script config=" in html_text
+    assert "&#34;author_name&#34;: &#34;tester&#34;" in html_text
+    assert 'src="./main.py"' not in html_text
+
+
+def test_embed_without_wrap_aborts(
+    invoke_cli: CLIInvoker, app_details_args: list[str]
+) -> None:
+    result = invoke_cli("create", "myapp", "--embed", *app_details_args)
+    assert result.exit_code == 1
+
+
 @pytest.mark.parametrize(
     "version, expected_version",
     [(None, LATEST_PYSCRIPT_VERSION), ("2023.11.1", "2023.11.1")],
@@ -366,3 +537,34 @@ def test_create_project_version(
     # EXPECT the folder to also contain the config file
     config_file = expected_app_path / config["project_config_filename"]
     assert config_file.exists()
+
+
+def test_profile(invoke_cli: CLIInvoker, tmp_path: Path) -> None:
+    """
+    Test that --profile reports the time spent in each phase and saves the cProfile
+    statistics when asked to
+    """
+    profile_path = tmp_path / "create.prof"
+    result = invoke_cli(
+        "--profile-output",
+        str(profile_path),
+        "create",
+        "myapp",
+        "--app-description",
+        "",
+        "--author-name",
+        "",
+        "--author-email",
+        "",
+        "--pyscript-version",
+        LATEST_PYSCRIPT_VERSION,
+    )
+    assert result.exit_code == 0
+    assert "import plugin create" in result.stdout
+    assert "hook pyscript_subcommand" in result.stdout
+    assert "render template" in result.stdout
+    assert "command create" in result.stdout
+
+    # EXPECT the statistics to be readable by pstats
+    stats = pstats.Stats(str(profile_path))
+    assert stats.total_calls > 0  # type: ignore[attr-defined]
@@ -0,0 +1,152 @@
+"""
+Tests for reading and writing project config files in the _config.py module.
+"""
+
+import json
+import os
+from pathlib import Path
+from textwrap import dedent
+from unittest import mock
+
+import toml
+
+from pyscript import _config
+
+CONFIG_TEXT = dedent(
+    """\
+    # My app
+    name = "app"  # shown in the title
+    packages = [
+        "numpy",  # for the maths
+        "pandas",
+    ]
+
+    [files]
+    # some data
+    "./a.csv" = "a.csv"
+    "./b.csv" = "b.csv"
+    """
+)
+
+
+def test_load_config_file_cached(tmp_path: Path) -> None:
+    """Configs are only parsed again when the file changes."""
+    config_path = tmp_path / "pyscript.toml"
+    config_path.write_text(CONFIG_TEXT)
+
+    with mock.patch.object(_config, "_parse", wraps=_config._parse) as parse_mock:
+        first = _config.load_config_file(config_path)
+        first["name"] = "changed by the caller"
+        second = _config.load_config_file(config_path)
+        assert parse_mock.call_count == 1
+
+        config_path.write_text('name = "new name"\n')
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        third = _config.load_config_file(config_path)
+        assert parse_mock.call_count == 2
+
+    assert second["name"] == "app"
+    assert third == {"name": "new name"}
+
+
+def test_save_config_file_json(tmp_path: Path) -> None:
+    config_path = tmp_path / "pyscript.json"
+
+    _config.save_config_file(config_path, {"name": "app", "packages": ["numpy"]})
+
+    assert json.loads(config_path.read_text()) == {"name": "app", "packages": ["numpy"]}
+    assert _config.load_config_file(config_path)["packages"] == ["numpy"]
+
+
+def test_update_config_file_preserves_formatting(tmp_path: Path) -> None:
+    """Updating a TOML config keeps comments, order and untouched values as they are."""
+    config_path = tmp_path / "pyscript.toml"
+    config_path.write_text(CONFIG_TEXT)
+
+    updated = _config.update_config_file(
+        config_path,
+        {
+            "packages": ["numpy"],
+            "version": "0.1",
+            "files": {"./a.csv": "data/a.csv", "./c.csv": "c.csv"},
+            "snapshot": {"archive": "./snapshot.zip"},
+        },
+    )
+
+    assert config_path.read_text() == dedent(
+        """\
+        # My app
+        name = "app"  # shown in the title
+        packages = ["numpy"]
+        version = "0.1"
+
+        [files]
+        # some data
+        "./a.csv" = "data/a.csv"
+        "./c.csv" = "c.csv"
+
+        [snapshot]
+        archive = "./snapshot.zip"
+        """
+    )
+    assert updated == toml.loads(config_path.read_text())
+    assert _config.load_config_file(config_path) == updated
+
+    # Removing keys and tables
+    _config.update_config_file(config_path, {"snapshot": None, "version": None})
+
+    assert config_path.read_text() == dedent(
+        """\
+        # My app
+        name = "app"  # shown in the title
+        packages = ["numpy"]
+
+        [files]
+        # some data
+        "./a.csv" = "data/a.csv"
+        "./c.csv" = "c.csv"
+        """
+    )
+
+
+def test_update_config_file_dotted_keys_and_subtables(tmp_path: Path) -> None:
+    """Configs using dotted keys and subtables are edited in place too."""
+    config_path = tmp_path / "pyscript.toml"
+    config_path.write_text(
+        dedent(
+            """\
+            # My app
+            name = "app"
+            stdlib.keep = ["json"]  # needed by main.py
+
+            [files.nested]
+            # old data
+            key = "value"
+            """
+        )
+    )
+
+    _config.update_config_file(
+        config_path, {"files": {"./a.csv": "a.csv"}, "version": "0.1"}
+    )
+
+    text = config_path.read_text()
+    assert "# My app" in text
+    assert 'stdlib.keep = ["json"]  # needed by main.py' in text
+    assert "nested" not in text
+    assert toml.loads(text) == {
+        "name": "app",
+        "stdlib": {"keep": ["json"]},
+        "version": "0.1",
+        "files": {"./a.csv": "a.csv"},
+    }
+
+
+def test_update_config_file_json(tmp_path: Path) -> None:
+    config_path = tmp_path / "pyscript.json"
+    config_path.write_text('{"name": "app", "packages": []}')
+
+    _config.update_config_file(config_path, {"packages": ["numpy"]})
+
+    assert config_path.read_text() == '{"name": "app", "packages": ["numpy"]}'
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+from typing import Optional
+from unittest import mock
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _deploy, config
+from pyscript._deploy import DirectoryBackend, S3Backend, deploy_files
+from pyscript.plugins.deploy import get_backend
+
+
+class FakeS3Client:
+    """In memory stand-in for the S3 API used by `S3Backend`, i.e. MinIO."""
+
+    class exceptions:
+        class ClientError(Exception):
+            pass
+
+        class NoSuchKey(ClientError):
+            pass
+
+        class NoSuchUpload(ClientError):
+            pass
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.uploaded_parts: list[int] = []
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey()
+        return {"Body": io.BytesIO(self.objects[Bucket, Key])}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Bucket, Key] = Body if isinstance(Body, bytes) else Body.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def list_parts(self, Bucket, Key, UploadId):
+        if UploadId not in self.uploads:
+            raise self.exceptions.NoSuchUpload()
+        return {
+            "Parts": [
+                {"PartNumber": number, "ETag": f"etag-{number}"}
+                for number in sorted(self.uploads[UploadId])
+            ]
+        }
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploaded_parts.append(PartNumber)
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Bucket, Key] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+
+def make_project(project_dir: Path) -> None:
+    (project_dir / config["project_config_filename"]).write_text('name = "app"\n')
+    (project_dir / "index.html").write_text("<html></html>")
+    (project_dir / "main.py").write_text("print('hi')")
+    (project_dir / "data").mkdir()
+    (project_dir / "data" / "values.csv").write_text("1,2")
+
+
+def manifest(folder: Path) -> dict:
+    return json.loads((folder / _deploy.MANIFEST_NAME).read_text())["files"]
+
+
+def test_deploy_uploads_changed_files(
+    invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that a first deploy uploads all the files, and the next ones only the
+    files that changed
+    """
+    make_project(tmp_path)
+    destination = tmp_path.parent / f"{tmp_path.name}-site"
+
+    result = invoke_cli("deploy", str(destination))
+
+    assert result.exit_code == 0
+    assert "4 files have been uploaded" in result.stdout
+    assert (destination / "data" / "values.csv").read_text() == "1,2"
+    assert sorted(manifest(destination)) == [
+        "data/values.csv",
+        "index.html",
+        "main.py",
+        config["project_config_filename"],
+    ]
+
+    (tmp_path / "main.py").write_text("print('hello')")
+    result = invoke_cli("deploy", str(destination))
+
+    assert result.exit_code == 0
+    assert "Uploaded main.py" in result.stdout
+    assert "1 files have been uploaded" in result.stdout
+    assert (destination / "main.py").read_text() == "print('hello')"
+
+
+def test_deploy_delete_and_dry_run(
+    invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    make_project(tmp_path)
+    destination = tmp_path.parent / f"{tmp_path.name}-site"
+    invoke_cli("deploy", str(destination))
+    (tmp_path / "data" / "values.csv").unlink()
+    (tmp_path / "index.html").write_text("<html><body></body></html>")
+
+    # Removed files are only listed without --delete
+    result = invoke_cli("deploy", str(destination), "--delete", "--dry-run")
+    assert result.exit_code == 0
+    assert "Would upload index.html" in result.stdout
+    assert "Would delete data/values.csv" in result.stdout
+    assert (destination / "index.html").read_text() == "<html></html>"
+
+    result = invoke_cli("deploy", str(destination))
+    assert (destination / "data" / "values.csv").exists()
+
+    result = invoke_cli("deploy", str(destination), "--delete")
+    assert result.exit_code == 0
+    assert "Deleted data/values.csv" in result.stdout
+    assert not (destination / "data" / "values.csv").exists()
+    assert "data/values.csv" not in manifest(destination)
+
+
+def test_deploy_to_folder_in_project(
+    invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that deploying to a folder of the project doesn't deploy the files of
+    the previous deploys
+    """
+    make_project(tmp_path)
+
+    for _ in range(3):
+        result = invoke_cli("deploy", "dist")
+        assert result.exit_code == 0
+
+    assert not (tmp_path / "dist" / "dist").exists()
+    assert sorted(manifest(tmp_path / "dist")) == [
+        "data/values.csv",
+        "index.html",
+        "main.py",
+        config["project_config_filename"],
+    ]
+
+
+def test_deploy_not_a_project(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    result = invoke_cli("deploy", str(tmp_path / "site"))
+
+    assert result.exit_code == 1
+    assert "is not a PyScript project" in result.stdout
+
+
+def test_deploy_unsupported_destination(
+    invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    make_project(tmp_path)
+
+    result = invoke_cli("deploy", "ftp://example.com/site")
+
+    assert result.exit_code == 1
+    assert "Unsupported destination" in result.stdout
+    assert "file, s3" in result.stdout
+
+
+@pytest.mark.parametrize(
+    "destination,backend_type",
+    [
+        ("site", DirectoryBackend),
+        ("file:///srv/site", DirectoryBackend),
+        ("C:\\site", DirectoryBackend),
+        ("s3://bucket/site", S3Backend),
+    ],
+)
+def test_get_backend(destination: str, backend_type: type):
+    with mock.patch.object(S3Backend, "__init__", return_value=None):
+        assert type(get_backend(destination)) is backend_type
+
+
+def test_incomplete_backend_fails_when_created():
+    class ReadOnlyBackend(_deploy.DeployBackend):
+        scheme = "ro"
+
+        def read(self, key: str) -> Optional[bytes]:
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyBackend("ro://site")
+
+
+def test_directory_backend_resumes_partial_copy(tmp_path: Path):
+    source = tmp_path / "big.bin"
+    source.write_bytes(b"0123456789")
+    digest = _deploy.hash_file(source)
+    backend = DirectoryBackend(str(tmp_path / "site"))
+    partial = tmp_path / "site" / f".big.bin.{digest[:16]}.part"
+    partial.parent.mkdir()
+    # Different from the source, to tell what was copied again
+    partial.write_bytes(b"ABCDE")
+
+    backend.upload("big.bin", source, digest)
+
+    assert (tmp_path / "site" / "big.bin").read_bytes() == b"ABCDE56789"
+    assert not partial.exists()
+
+
+def test_deploy_retries_failed_uploads(tmp_path: Path):
+    (tmp_path / "main.py").write_text("print('hi')")
+    backend = DirectoryBackend(str(tmp_path / "site"))
+    upload = backend.upload
+    calls: list[str] = []
+
+    def flaky_upload(key: str, path: Path, digest: str) -> None:
+        calls.append(key)
+        if len(calls) < 3:
+            raise ConnectionResetError()
+        upload(key, path, digest)
+
+    with mock.patch.object(backend, "upload", side_effect=flaky_upload), mock.patch(
+        "pyscript._deploy.time.sleep"
+    ):
+        uploaded, _ = deploy_files(backend, {"main.py": tmp_path / "main.py"})
+
+    assert uploaded == ["main.py"]
+    assert len(calls) == 3
+    assert (tmp_path / "site" / "main.py").exists()
+
+
+def test_deploy_keeps_progress_of_failed_deploy(tmp_path: Path):
+    """
+    Test that the files uploaded before a failure are recorded, so that the
+    next deploy doesn't upload them again
+    """
+    files = {}
+    for name in ("a.py", "b.py", "index.html"):
+        (tmp_path / name).write_text(name)
+        files[name] = tmp_path / name
+    backend = DirectoryBackend(str(tmp_path / "site"))
+    upload = backend.upload
+
+    def failing_upload(key: str, path: Path, digest: str) -> None:
+        if key == "b.py":
+            raise PermissionError("denied")
+        upload(key, path, digest)
+
+    with mock.patch.object(backend, "upload", side_effect=failing_upload):
+        with pytest.raises(_deploy.DeployError, match="b.py: denied"):
+            deploy_files(backend, files)
+
+    # The page is never uploaded before the files it may use
+    assert manifest(tmp_path / "site") == {"a.py": _deploy.hash_file(files["a.py"])}
+
+    uploaded, _ = deploy_files(backend, files)
+    assert uploaded == ["b.py", "index.html"]
+
+
+@pytest.fixture
+def s3_client(tmp_path: Path):
+    with mock.patch.object(_deploy, "UPLOADS_FILE", tmp_path / "uploads.json"):
+        yield FakeS3Client()
+
+
+def test_s3_backend(s3_client: FakeS3Client, tmp_path: Path):
+    (tmp_path / "main.py").write_text("print('hi')")
+    backend = S3Backend("s3://bucket/site", client=s3_client)
+
+    uploaded, _ = deploy_files(backend, {"main.py": tmp_path / "main.py"})
+
+    assert uploaded == ["main.py"]
+    assert s3_client.objects["bucket", "site/main.py"] == b"print('hi')"
+    assert _deploy.read_manifest(backend) == {
+        "main.py": _deploy.hash_file(tmp_path / "main.py")
+    }
+
+    uploaded, _ = deploy_files(backend, {"main.py": tmp_path / "main.py"})
+    assert uploaded == []
+
+
+@mock.patch.object(_deploy, "PART_SIZE", 4)
+def test_s3_backend_resumes_multipart_upload(s3_client: FakeS3Client, tmp_path: Path):
+    """
+    Test that the parts of big files uploaded before an interruption aren't
+    uploaded again
+    """
+    source = tmp_path / "model.bin"
+    source.write_bytes(b"aaaabbbbccccdd")
+    digest = _deploy.hash_file(source)
+    backend = S3Backend("s3://bucket", client=s3_client)
+    upload_part = s3_client.upload_part
+
+    def interrupted_upload_part(PartNumber: int, **kwargs) -> Optional[dict]:
+        if PartNumber == 3:
+            raise ConnectionResetError()
+        return upload_part(PartNumber=PartNumber, **kwargs)
+
+    with mock.patch.object(
+        s3_client, "upload_part", side_effect=interrupted_upload_part
+    ):
+        with pytest.raises(ConnectionResetError):
+            backend.upload("model.bin", source, digest)
+    assert s3_client.uploaded_parts == [1, 2]
+
+    backend.upload("model.bin", source, digest)
+
+    assert s3_client.uploaded_parts == [1, 2, 3, 4]
+    assert s3_client.objects["bucket", "model.bin"] == b"aaaabbbbccccdd"
+    assert json.loads(_deploy.UPLOADS_FILE.read_text()) == {}
+
+
+@pytest.mark.parametrize("method", ["get_object", "put_object"])
+def test_s3_backend_service_errors(
+    s3_client: FakeS3Client, tmp_path: Path, method: str
+):
+    """
+    Test that the errors answered by the service, i.e. a missing bucket, are
+    reported as deploy errors
+    """
+    (tmp_path / "main.py").write_text("print('hi')")
+    backend = S3Backend("s3://missing", client=s3_client)
+    error = s3_client.exceptions.ClientError("NoSuchBucket")
+
+    with mock.patch.object(s3_client, method, side_effect=error):
+        with pytest.raises(_deploy.DeployError, match="s3://missing/.*NoSuchBucket"):
+            deploy_files(backend, {"main.py": tmp_path / "main.py"})
+
+
+def test_s3_backend_needs_boto3():
+    with mock.patch.dict("sys.modules", {"boto3": None}):
+        with pytest.raises(_deploy.DeployError, match="pip install boto3"):
+            S3Backend("s3://bucket")
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from unittest import mock
+
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _store
+
+
+def test_store_links_identical_files(tmp_path: Path):
+    """
+    Test that identical files are stored once, linked read-only into the projects
+    """
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    source = tmp_path / "data.csv"
+    source.write_text("1,2,3")
+
+    assert _store.install_file(source, tmp_path / "a" / "data.csv")
+    assert _store.install_bytes(b"1,2,3", tmp_path / "b" / "data.csv")
+
+    a_stat = (tmp_path / "a" / "data.csv").stat()
+    assert a_stat.st_ino == (tmp_path / "b" / "data.csv").stat().st_ino
+    assert a_stat.st_nlink == 3
+    assert a_stat.st_mode & 0o222 == 0
+    assert (tmp_path / "b" / "data.csv").read_text() == "1,2,3"
+
+
+def test_store_copies_across_filesystems(tmp_path: Path):
+    digest = _store.add_bytes(b"contents")
+
+    with mock.patch("os.link", side_effect=OSError(18, "Invalid cross-device link")):
+        assert not _store.link(digest, tmp_path / "file")
+
+    assert (tmp_path / "file").read_bytes() == b"contents"
+    assert (tmp_path / "file").stat().st_nlink == 1
+    assert os.access(tmp_path / "file", os.W_OK)
+
+
+def test_store_fetch_downloads_once():
+    download = mock.Mock(return_value=b"runtime")
+
+    first = _store.fetch("https://cdn.example.com/v1/runtime.wasm", download)
+    second = _store.fetch("https://cdn.example.com/v1/runtime.wasm", download)
+
+    assert first == second
+    assert _store.blob_path(first).read_bytes() == b"runtime"
+    download.assert_called_once_with("https://cdn.example.com/v1/runtime.wasm")
+
+
+def test_gc(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    """
+    Test that gc only deletes the stored files that no project links to
+    """
+    # GIVEN a stored file used by a project, and one whose project was deleted
+    _store.install_bytes(b"used", tmp_path / "used.txt")
+    _store.install_bytes(b"unused" * 100_000, tmp_path / "deleted.txt")
+    (tmp_path / "deleted.txt").unlink()
+
+    used = _store.blob_path(hashlib.sha256(b"used").hexdigest())
+    unused = _store.blob_path(hashlib.sha256(b"unused" * 100_000).hexdigest())
+
+    # WHEN running gc in a dry run, EXPECT nothing to be deleted
+    result = invoke_cli("gc", "--dry-run")
+    assert result.exit_code == 0
+    assert "Would delete 1 unused files (0.6MB) of the 2 files" in result.stdout
+    assert unused.exists()
+
+    # WHEN running gc, EXPECT the unused file to be deleted
+    result = invoke_cli("gc")
+    assert result.exit_code == 0
+    assert "Deleted 1 unused files" in result.stdout
+    assert not unused.exists()
+    assert used.stat().st_nlink == 2
+    assert (tmp_path / "used.txt").read_bytes() == b"used"
+
+    result = invoke_cli("gc")
+    assert "Deleted 0 unused files" in result.stdout
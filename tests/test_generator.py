@@ -5,13 +5,20 @@ multiple "prompt" arguments).
 """
 
 import json
+import os
+import shutil
+import stat
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from textwrap import dedent
 from typing import Any
+from unittest import mock
 
 import pytest
 import toml
 
+from pyscript import _fs
 from pyscript import _generator as gen
 from pyscript import config
 
@@ -36,6 +43,77 @@ def test_create_app(tmp_cwd: Path, is_not_none: Any) -> None:
     check_project_files(tmp_cwd / app_name)
 
 
+def test_create_worker_app(tmp_cwd: Path, is_not_none: Any) -> None:
+    """
+    Test that a new worker app runs its main python file in a web worker.
+    """
+    app_name = "worker_app"
+    app_description = "A longer, human friendly, app description."
+
+    # GIVEN a a new worker project
+    gen.create_project(
+        app_name,
+        app_description,
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        project_type="worker",
+    )
+
+    manifest_path = tmp_cwd / app_name / config["project_config_filename"]
+    check_project_manifest(
+        manifest_path, toml, app_name, is_not_none, project_type="worker"
+    )
+    check_project_files(tmp_cwd / app_name, script_attributes="worker terminal")
+
+
+def test_create_micropython_app(tmp_cwd: Path) -> None:
+    """
+    Test that a new MicroPython app uses the mpy script type and records its runtime.
+    """
+    app_name = "mpy_app"
+
+    gen.create_project(
+        app_name,
+        "A MicroPython app.",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        runtime="micropython",
+    )
+
+    app_folder = tmp_cwd / app_name
+    with (app_folder / config["project_config_filename"]).open() as fp:
+        assert toml.load(fp)["runtime"] == "micropython"
+    contents = (app_folder / "index.html").read_text()
+    assert '<script type="mpy" src="./main.py" config="./pyscript.toml" terminal>' in (
+        contents
+    )
+
+
+def test_create_bad_runtime(tmp_cwd: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown runtime: cpython"):
+        gen.create_project(
+            "app_name", "", TESTS_AUTHOR_NAME, TESTS_AUTHOR_EMAIL, runtime="cpython"
+        )
+
+
+def test_find_unavailable_micropython_imports() -> None:
+    source = dedent(
+        """
+        import json, os.path
+        import numpy as np
+        from pyscript import display
+        from collections import deque
+        from pandas.core import frame
+        from . import sibling
+        from helpers import util
+        """
+    )
+
+    missing = gen.find_unavailable_micropython_imports(source, ["helpers"])
+
+    assert missing == ["numpy", "pandas"]
+
+
 def test_create_bad_type(tmp_cwd: Path, is_not_none: Any) -> None:
     """
     Test that a new project with a bad type raises a ValueError
@@ -66,6 +144,393 @@ def test_create_project_twice_raises_error(tmp_cwd: Path) -> None:
         )
 
 
+def test_create_project_offline(tmp_cwd: Path) -> None:
+    """An offline project registers a service worker precaching its files, with a
+    cache name that changes with the PyScript version."""
+    gen.create_project(
+        "app_name",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        pyscript_version="2024.2.1",
+        offline=True,
+    )
+    gen.create_project(
+        "other_app",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        pyscript_version="2024.1.1",
+        offline=True,
+    )
+
+    def precached_urls(app_dir: Path) -> list[str]:
+        sw_text = (app_dir / "sw.js").read_text()
+        line = next(line for line in sw_text.splitlines() if "PRECACHE_URLS" in line)
+        return json.loads(line.split("=", 1)[1].strip().rstrip(";"))
+
+    def cache_name(app_dir: Path) -> str:
+        sw_text = (app_dir / "sw.js").read_text()
+        line = next(line for line in sw_text.splitlines() if "CACHE_NAME =" in line)
+        return json.loads(line.split("=", 1)[1].strip().rstrip(";"))
+
+    app_dir = tmp_cwd / "app_name"
+    assert precached_urls(app_dir) == [
+        "./",
+        "./index.html",
+        "https://pyscript.net/releases/2024.2.1/core.css",
+        "https://pyscript.net/releases/2024.2.1/core.js",
+        "./pyscript.toml",
+        "./main.py",
+    ]
+    assert cache_name(app_dir).startswith("pyscript:app_name:2024.2.1-")
+    assert cache_name(tmp_cwd / "other_app").startswith("pyscript:other_app:2024.1.1-")
+
+
+ACTIVATE_SCRIPT = """
+const handlers = {};
+globalThis.self = {
+  addEventListener: (type, handler) => (handlers[type] = handler),
+  location: { origin: "http://localhost" },
+  clients: { claim: async () => {} },
+};
+const deleted = [];
+globalThis.caches = {
+  keys: async () => %(names)s,
+  delete: async (name) => deleted.push(name),
+};
+%(sw)s
+let activated;
+handlers.activate({ waitUntil: (promise) => (activated = promise) });
+await activated;
+console.log(JSON.stringify(deleted));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="Requires Node.js")
+@pytest.mark.parametrize("title", ["foo", "foo-bar", "foo:bar"])
+def test_service_worker_keeps_other_apps_caches(tmp_path: Path, title: str) -> None:
+    """The service worker of an app only drops the old caches of that app, even
+    when the names of other apps of the origin start like its own."""
+    app_names = ["foo", "foo-bar", "foo-2", "foo:bar"]
+    cache_names = {}
+    for app_name in app_names:
+        sw_path = tmp_path / f"{app_name.replace(':', '_')}.js"
+        gen.create_service_worker(
+            app_name, "main.py", "pyscript.toml", "index.html", sw_path, "2024.2.1", {}
+        )
+        cache_names[app_name] = next(
+            json.loads(line.split("=", 1)[1].strip().rstrip(";"))
+            for line in sw_path.read_text().splitlines()
+            if line.startswith("const CACHE_NAME =")
+        )
+    old_cache = cache_names[title].replace("2024.2.1", "2024.1.1")
+    names = [*cache_names.values(), old_cache, "other-cache"]
+
+    script = tmp_path / "activate.mjs"
+    script.write_text(
+        ACTIVATE_SCRIPT
+        % {
+            "names": json.dumps(names),
+            "sw": (tmp_path / f"{title.replace(':', '_')}.js").read_text(),
+        }
+    )
+    result = subprocess.run(
+        ["node", str(script)], capture_output=True, text=True, check=True
+    )
+    assert json.loads(result.stdout) == [old_cache]
+
+
+def test_create_project_failure_leaves_nothing_behind(tmp_cwd: Path) -> None:
+    """When the generation fails midway, no project folder is left behind."""
+    with mock.patch.object(
+        gen, "create_project_html", side_effect=KeyboardInterrupt
+    ), pytest.raises(KeyboardInterrupt):
+        gen.create_project(
+            "app_name", "description", TESTS_AUTHOR_NAME, TESTS_AUTHOR_EMAIL
+        )
+
+    assert list(tmp_cwd.iterdir()) == []
+
+
+def test_create_project_concurrently(tmp_cwd: Path) -> None:
+    """When the same project is created concurrently, exactly one creation wins."""
+
+    def create() -> bool:
+        try:
+            gen.create_project(
+                "app_name", "description", TESTS_AUTHOR_NAME, TESTS_AUTHOR_EMAIL
+            )
+        except FileExistsError:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: create(), range(8)))
+
+    assert results.count(True) == 1
+    assert [path.name for path in tmp_cwd.iterdir()] == ["app_name"]
+    assert sorted(path.name for path in (tmp_cwd / "app_name").iterdir()) == [
+        "index.html",
+        "main.py",
+        "pyscript.toml",
+    ]
+
+
+def test_create_project_wrap_copies_file_verbatim(tmp_cwd: Path) -> None:
+    """The wrapped script is copied byte for byte into the new project."""
+    input_file = tmp_cwd / "big_script.py"
+    contents = b"# -*- coding: latin-1 -*-\n" + b"data = [\xe9]\n" * 100_000
+    input_file.write_bytes(contents)
+
+    gen.create_project(
+        str(input_file.name),
+        "A wrapped script.",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        wrap=True,
+    )
+
+    app_folder = tmp_cwd / "big_script"
+    assert (app_folder / "main.py").read_bytes() == contents
+    check_project_files(app_folder)
+
+
+def test_create_project_from_package(tmp_cwd: Path) -> None:
+    """
+    A package is copied as a subfolder of the project, without its ignored files,
+    and its files are listed in the config
+    """
+    package = tmp_cwd / "src" / "mylib"
+    (package / "sub").mkdir(parents=True)
+    (package / "__init__.py").write_text("from . import sub")
+    (package / "sub" / "__init__.py").write_text("")
+    (package / "data.csv").write_text("1,2")
+    (package / "__pycache__").mkdir()
+    (package / "__pycache__" / "mod.cpython-311.pyc").write_bytes(b"")
+    (package / "tests").mkdir()
+    (package / "tests" / "test_mylib.py").write_text("")
+
+    gen.create_project(
+        "app_name",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        from_dir=str(package),
+        ignore=["tests"],
+    )
+
+    app_folder = tmp_cwd / "app_name"
+    assert (app_folder / "mylib" / "data.csv").read_text() == "1,2"
+    assert not (app_folder / "mylib" / "__pycache__").exists()
+    assert not (app_folder / "mylib" / "tests").exists()
+    manifest = toml.load(app_folder / config["project_config_filename"])
+    assert manifest["files"] == {
+        "./mylib/__init__.py": "./mylib/__init__.py",
+        "./mylib/data.csv": "./mylib/data.csv",
+        "./mylib/sub/__init__.py": "./mylib/sub/__init__.py",
+    }
+    assert (app_folder / "main.py").read_text() == gen.TEMPLATE_PYTHON_CODE
+    assert "./mylib/data.csv" in (app_folder / "index.html").read_text()
+
+
+def test_create_project_from_app_folder(tmp_cwd: Path) -> None:
+    """
+    The files of a folder which isn't a package are copied at the root of the
+    project, its main.py becoming the main script
+    """
+    source = tmp_cwd / "existing"
+    source.mkdir()
+    (source / "main.py").write_text("import helpers")
+    (source / "helpers.py").write_text("")
+    (source / "index.html").write_text("old page")
+    (source / ".env").write_text("SECRET=1")
+
+    gen.create_project(
+        "app_name",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        from_dir=str(source),
+    )
+
+    app_folder = tmp_cwd / "app_name"
+    assert (app_folder / "main.py").read_text() == "import helpers"
+    assert (app_folder / "index.html").read_text() != "old page"
+    assert not (app_folder / ".env").exists()
+    manifest = toml.load(app_folder / config["project_config_filename"])
+    assert manifest["files"] == {"./helpers.py": "./helpers.py"}
+
+
+def test_create_project_from_dir_build_folders(tmp_cwd: Path) -> None:
+    """
+    Build outputs are skipped at the root of a source folder, but not subpackages
+    with the same names
+    """
+    source = tmp_cwd / "existing"
+    for folder in ("build", "dist", "mypkg/build", "mypkg/dist"):
+        (source / folder).mkdir(parents=True)
+        (source / folder / "__init__.py").write_text("")
+    (source / "mypkg" / "__init__.py").write_text("")
+
+    gen.create_project(
+        "app_name",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        from_dir=str(source),
+    )
+    gen.create_project(
+        "pkg_app",
+        "description",
+        TESTS_AUTHOR_NAME,
+        TESTS_AUTHOR_EMAIL,
+        from_dir=str(source / "mypkg"),
+    )
+
+    manifest = toml.load(tmp_cwd / "app_name" / config["project_config_filename"])
+    assert sorted(manifest["files"]) == [
+        "./mypkg/__init__.py",
+        "./mypkg/build/__init__.py",
+        "./mypkg/dist/__init__.py",
+    ]
+    manifest = toml.load(tmp_cwd / "pkg_app" / config["project_config_filename"])
+    assert sorted(manifest["files"]) == [
+        "./mypkg/__init__.py",
+        "./mypkg/build/__init__.py",
+        "./mypkg/dist/__init__.py",
+    ]
+
+
+def test_create_project_from_dir_dedupe(tmp_cwd: Path) -> None:
+    """Projects made from the same folder share its wheels through the store,
+    while the other files are copied, to not be edited in every project."""
+    source = tmp_cwd / "shared"
+    source.mkdir()
+    (source / "data.csv").write_text("1,2")
+    (source / "lib-1.0-py3-none-any.whl").write_bytes(b"wheel")
+
+    for app_name in ("one", "two"):
+        gen.create_project(
+            app_name,
+            "description",
+            TESTS_AUTHOR_NAME,
+            TESTS_AUTHOR_EMAIL,
+            from_dir=str(source),
+            dedupe=True,
+        )
+
+    wheel = "lib-1.0-py3-none-any.whl"
+    one = (tmp_cwd / "one" / wheel).stat()
+    assert one.st_ino == (tmp_cwd / "two" / wheel).stat().st_ino
+    assert one.st_ino != (source / wheel).stat().st_ino
+
+    data = tmp_cwd / "one" / "data.csv"
+    assert data.stat().st_nlink == 1
+    assert data.stat().st_mode & stat.S_IWUSR
+
+
+def test_create_project_from_dir_with_wrap_fails(tmp_cwd: Path) -> None:
+    with pytest.raises(ValueError, match="can't be wrapped"):
+        gen.create_project(
+            "app.py", "", TESTS_AUTHOR_NAME, TESTS_AUTHOR_EMAIL, wrap=True, from_dir="."
+        )
+
+
+@pytest.mark.parametrize(
+    "reflink,copy_file_range_error,expected",
+    [
+        (True, None, "reflink"),
+        (False, None, "copy_file_range"),
+        (False, OSError(18, "Invalid cross-device link"), "copy"),
+    ],
+)
+def test_fast_copy(
+    tmp_path: Path,
+    reflink: bool,
+    copy_file_range_error: Any,
+    expected: str,
+) -> None:
+    """Each copy method falls back to the next one when the filesystem refuses it."""
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"x" * 100_000)
+    src.chmod(0o755)
+    dst = tmp_path / "dst.bin"
+
+    def clone(src_fp, dst_fp) -> bool:
+        dst_fp.write(src_fp.read())
+        return True
+
+    def copy_file_range(src_fd: int, dst_fd: int, count: int) -> int:
+        if copy_file_range_error is not None:
+            # Fail after a partial copy, which must be discarded
+            os.write(dst_fd, b"garbage")
+            raise copy_file_range_error
+        return os.write(dst_fd, os.read(src_fd, count))
+
+    with mock.patch.object(
+        _fs, "_reflink", side_effect=clone if reflink else lambda *_: False
+    ), mock.patch.object(_fs.os, "copy_file_range", copy_file_range, create=True):
+        assert _fs.fast_copy(src, dst) == expected
+
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mode & 0o777 == 0o755
+
+
+def test_fast_copy_link(tmp_path: Path) -> None:
+    src = tmp_path / "src.txt"
+    src.write_text("shared")
+
+    assert _fs.fast_copy(src, tmp_path / "dst.txt", link=True) == "link"
+    assert (tmp_path / "dst.txt").stat().st_ino == src.stat().st_ino
+
+
+def test_umask_mode_leaves_umask_alone() -> None:
+    """The umask is shared by all the threads: it mustn't change, even briefly."""
+    with mock.patch.object(_fs.os, "umask") as umask_mock:
+        assert _fs._umask_mode(0o666) == 0o666 & ~_fs._UMASK
+
+    umask_mock.assert_not_called()
+
+
+def test_resource_hints() -> None:
+    """Resource hints cover the runtime, the app files and the declared files/packages."""
+    project_config = {
+        "files": {"./data.csv": "data.csv", "{DOMAIN}/lib.py": "lib.py"},
+        "packages": ["numpy", "./wheels/mylib-0.1-py3-none-any.whl"],
+    }
+
+    hints = gen.get_resource_hints(
+        "2024.2.1", "main.py", "pyscript.toml", project_config
+    )
+
+    assert {
+        "rel": "preconnect",
+        "href": gen.RUNTIME_ORIGIN,
+        "crossorigin": True,
+    } in hints
+    assert {
+        "rel": "modulepreload",
+        "href": "https://pyscript.net/releases/2024.2.1/core.js",
+    } in hints
+    preloaded = [hint["href"] for hint in hints if hint["rel"] == "preload"]
+    assert preloaded == [
+        "./pyscript.toml",
+        "./main.py",
+        "./data.csv",
+        "./wheels/mylib-0.1-py3-none-any.whl",
+    ]
+    preconnected = [hint["href"] for hint in hints if hint["rel"] == "preconnect"]
+    assert preconnected == [gen.RUNTIME_ORIGIN, *gen.PACKAGE_ORIGINS]
+
+
+def test_resource_hints_no_packages() -> None:
+    """Package index origins are only preconnected when packages are installed."""
+    hints = gen.get_resource_hints("2024.2.1", None, None, {})
+
+    assert [hint["rel"] for hint in hints] == ["preconnect", "modulepreload"]
+
+
 def test_create_project_explicit_json(
     tmp_cwd: Path, is_not_none: Any, monkeypatch
 ) -> None:
@@ -163,6 +628,7 @@ def check_project_files(
     html_file: str = "index.html",
     config_file: str = config["project_config_filename"],
     python_file: str = "main.py",
+    script_attributes: str = "terminal",
 ):
     """
     Perform the following checks:
@@ -180,6 +646,8 @@ def check_project_files(
                           (default: config["project_config_filename"])
         * python_file(str): name of the python file generated by the template
                           (default: main.py)
+        * script_attributes(str): extra attributes of the python script tag
+                          (default: terminal)
 
     """
     # assert that the new project files exists
@@ -191,9 +659,11 @@ def check_project_files(
     with html_file_path.open() as fp:
         contents = fp.read()
         assert (
-            f'<script type="py" src="./{python_file}" config="./{config_file}" terminal>'
-            in contents
+            f'<script type="py" src="./{python_file}" config="./{config_file}" '
+            f"{script_attributes}>" in contents
         )
+        assert f'<link rel="preload" href="./{python_file}"' in contents
+        assert f'<link rel="preload" href="./{config_file}"' in contents
 
 
 def check_plugin_project_files(
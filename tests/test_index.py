@@ -0,0 +1,63 @@
+"""
+Tests for the discovery of projects in the _index.py module.
+"""
+
+from pathlib import Path
+from unittest import mock
+
+from pyscript import _index, config
+
+
+def make_project(path: Path) -> Path:
+    path.mkdir(parents=True)
+    (path / config["project_config_filename"]).write_text('name = "app"\n')
+    return path
+
+
+def test_find_projects(tmp_path: Path) -> None:
+    """Projects are found at any depth, skipping ignored folders."""
+    app1 = make_project(tmp_path / "app1")
+    app2 = make_project(tmp_path / "team" / "apps" / "app2")
+    make_project(tmp_path / "node_modules" / "vendored")
+    make_project(tmp_path / ".cache" / "hidden")
+    make_project(tmp_path / "build" / "copy")
+    make_project(tmp_path / "team" / "dist" / "copy")
+    make_project(tmp_path / "team" / "apps" / "tmp" / "scratch")
+    (tmp_path / ".gitignore").write_text("# build output\nbuild/\n/team/dist\n")
+    (tmp_path / "team" / "apps" / ".gitignore").write_text("tmp\n")
+
+    assert _index.find_projects(tmp_path) == [app1, app2]
+
+
+def test_find_projects_incremental(tmp_path: Path) -> None:
+    """Only the folders that changed since the last search are listed again."""
+    app1 = make_project(tmp_path / "apps" / "app1")
+    assert _index.find_projects(tmp_path) == [app1]
+
+    # GIVEN a new project
+    app2 = make_project(tmp_path / "apps" / "app2")
+
+    with mock.patch.object(_index.os, "scandir", wraps=_index.os.scandir) as scandir:
+        projects = _index.find_projects(tmp_path)
+
+    # EXPECT it to be found by listing only the folders that changed
+    assert projects == [app1, app2]
+    listed = sorted(
+        Path(call.args[0]).relative_to(tmp_path) for call in scandir.call_args_list
+    )
+    assert listed == [Path("apps"), Path("apps/app2")]
+
+    # GIVEN a change to a .gitignore file that doesn't touch its folder
+    (tmp_path / ".gitignore").write_text("")
+    assert _index.find_projects(tmp_path) == [app1, app2]
+    (tmp_path / ".gitignore").write_text("app2\n")
+
+    # EXPECT the new ignore rules to be applied
+    assert _index.find_projects(tmp_path) == [app1]
+
+
+def test_find_projects_no_index(tmp_path: Path, index_dir: Path) -> None:
+    app = make_project(tmp_path / "app")
+
+    assert _index.find_projects(tmp_path, use_index=False) == [app]
+    assert list(index_dir.iterdir()) == []
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from unittest import mock
+
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript._servers import ServerInfo, list_servers, register_server
+
+
+def test_ps_no_servers(invoke_cli: CLIInvoker):  # noqa: F811
+    result = invoke_cli("ps")
+
+    assert result.exit_code == 0
+    assert "No servers are running." in result.stdout
+
+
+def test_ps(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    """
+    Test that ps lists the running servers, and forgets the ones that died
+    """
+    # GIVEN a running server and one whose process is gone
+    running = ServerInfo(os.getpid(), 8123, str(tmp_path), time.time() - 90)
+    register_server(running)
+    register_server(ServerInfo(999_999, 8124, str(tmp_path / "other"), time.time()))
+
+    with mock.patch(
+        "pyscript._servers.is_process_running", side_effect=lambda pid: pid != 999_999
+    ):
+        result = invoke_cli("ps", "--json")
+
+    # EXPECT only the running server to be listed
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == [
+        dict(running._asdict(), options=[], url="http://localhost:8123/")
+    ]
+    # EXPECT the dead server to be dropped from the registry
+    assert list_servers() == [running]
+
+    result = invoke_cli("ps")
+    assert result.exit_code == 0
+    assert "http://localhost:8123/" in result.stdout
+    assert "1m30s" in result.stdout
@@ -2,14 +2,43 @@ from __future__ import annotations
 
 import http.client
 import http.server
+import json
+import operator
+import os
 import threading
+import time
 from pathlib import Path
 from unittest import mock
 
 import pytest
+import typer
 from utils import CLIInvoker, invoke_cli  # noqa: F401
 
-from pyscript.plugins.run import get_folder_based_http_request_handler
+from pyscript import _listing
+from pyscript._hmr import HMR_PATH, HotReloader, module_name
+from pyscript._listing import ListingCache, ListingQuery, parse_listing_query
+from pyscript._rpc import (
+    RPC_PATH,
+    TOKEN_HEADER,
+    FunctionPool,
+    RPCError,
+    decode_calls,
+    inject_token,
+    is_local_host,
+)
+from pyscript._server import (
+    SyntaxChecker,
+    get_folder_based_http_request_handler,
+    serve_in_background,
+)
+from pyscript._servers import ServerInfo
+from pyscript._throttle import (
+    THROTTLE_PROFILES,
+    Throttle,
+    ThrottleProfile,
+    parse_throttle,
+)
+from pyscript.plugins.run import rpc_functions, start_server
 
 BASEPATH = str(Path(__file__).parent)
 
@@ -59,7 +88,9 @@ def test_run_server_with_default_values(
     # Path("."): path to local folder
     # show=True: same as passing the --view option (which defaults to True)
     # port=8000: that is the default port
-    start_server_mock.assert_called_once_with(Path("."), True, 8000)
+    start_server_mock.assert_called_once_with(
+        Path("."), True, 8000, check_syntax=False, hmr=False, throttle=None, rpc=False
+    )
 
 
 @mock.patch("pyscript.plugins.run.start_server")
@@ -78,7 +109,9 @@ def test_run_server_with_no_view_flag(
     # Path("."): path to local folder
     # show=False: same as passing the --no-view option
     # port=8000: that is the default port
-    start_server_mock.assert_called_once_with(Path("."), False, 8000)
+    start_server_mock.assert_called_once_with(
+        Path("."), False, 8000, check_syntax=False, hmr=False, throttle=None, rpc=False
+    )
 
 
 @pytest.mark.parametrize(
@@ -107,7 +140,9 @@ def test_run_server_with_valid_combinations(
     # EXPECT the command to succeed
     assert result.exit_code == 0
     # EXPECT start_server_mock function to be called with the expected values
-    start_server_mock.assert_called_once_with(*expected_values)
+    start_server_mock.assert_called_once_with(
+        *expected_values, check_syntax=False, hmr=False, throttle=None, rpc=False
+    )
 
 
 class TestFolderBasedHTTPRequestHandler:
@@ -137,3 +172,618 @@ class TestFolderBasedHTTPRequestHandler:
         assert response.getheader("Cross-Origin-Opener-Policy") == "same-origin"
         assert response.getheader("Cross-Origin-Embedder-Policy") == "require-corp"
         assert response.getheader("Cross-Origin-Resource-Policy") == "cross-origin"
+
+
+def test_syntax_checker_reports_errors(tmp_path: Path):
+    """
+    Test that the syntax checker reports errors and caches results until the file
+    is modified
+    """
+    # GIVEN a valid Python file
+    main = tmp_path / "main.py"
+    main.write_text("print('hello')\n")
+    checker = SyntaxChecker(max_workers=1)
+    try:
+        # EXPECT no error to be reported
+        assert checker.check(main) is None
+
+        # WHEN the file gets a syntax error
+        main.write_text("print('hello'\n")
+        os.utime(main, ns=(main.stat().st_atime_ns, main.stat().st_mtime_ns + 10**9))
+
+        # EXPECT the error to be reported
+        error = checker.check(main)
+        assert error is not None
+        assert "SyntaxError" in error
+    finally:
+        checker.shutdown()
+
+
+def test_server_rejects_python_files_with_syntax_errors(tmp_path: Path):
+    """
+    Test that when the syntax check is enabled, Python files with syntax errors are
+    answered with an error, while valid files are served as usual
+    """
+    # GIVEN a project with a valid and a broken Python file
+    (tmp_path / "main.py").write_text("print('hello')\n")
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    checker = SyntaxChecker(max_workers=1)
+    server = serve_in_background(tmp_path, syntax_checker=checker)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        # EXPECT the valid file to be served
+        connection.request("GET", "/main.py")
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.read() == b"print('hello')\n"
+
+        # EXPECT the broken file to be answered with an error
+        connection.request("GET", "/broken.py")
+        response = connection.getresponse()
+        assert response.status == 500
+        assert b"SyntaxError" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+        checker.shutdown()
+
+
+def test_run_server_with_check_syntax(
+    invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that the --check-syntax flag is passed to the server
+    """
+    with mock.patch("pyscript.plugins.run.start_server") as start_server_mock:
+        result = invoke_cli("run", "--check-syntax")
+    assert result.exit_code == 0
+    start_server_mock.assert_called_once_with(
+        Path("."), True, 8000, check_syntax=True, hmr=False, throttle=None, rpc=False
+    )
+
+
+@pytest.mark.parametrize(
+    "rel_path,expected",
+    [("utils.py", "utils"), ("pkg/mod.py", "pkg.mod"), ("pkg/__init__.py", "pkg")],
+)
+def test_hmr_module_name(rel_path: str, expected: str):
+    assert module_name(rel_path) == expected
+
+
+def test_hmr_describe_changes(tmp_path: Path):
+    """
+    Test that changes to imported modules are pushed with their source, while the
+    changes to the main script or other files reload the page
+    """
+    # GIVEN a project whose page runs main.py, which imports utils
+    (tmp_path / "index.html").write_text(
+        '<html><head></head><body><script type="py" src="./main.py"></script>'
+        "</body></html>"
+    )
+    (tmp_path / "main.py").write_text("import utils\n")
+    (tmp_path / "utils.py").write_text("VALUE = 1\n")
+    reloader = HotReloader(tmp_path)
+
+    # EXPECT the source of a changed module to be pushed
+    assert reloader.describe_changes([tmp_path / "utils.py"]) == {
+        "module": "utils",
+        "path": "utils.py",
+        "source": "VALUE = 1\n",
+    }
+    # EXPECT changes to the main script, pages and many files to reload the page
+    assert reloader.describe_changes([tmp_path / "main.py"]) == {"reload": True}
+    assert reloader.describe_changes([tmp_path / "index.html"]) == {"reload": True}
+    assert reloader.describe_changes([tmp_path / "utils.py", tmp_path / "main.py"]) == {
+        "reload": True
+    }
+
+
+def test_hmr_describe_changes_mapped_files(tmp_path: Path):
+    """
+    Test that modules are pushed to the path the `files` of the config put them
+    at, and that the files that can't be mapped to a module reload the page
+    """
+    # GIVEN a config moving lib/utils.py to the working directory, and other
+    # modules to folders that are not
+    (tmp_path / "index.html").write_text(
+        '<script type="py" src="./main.py" config="./pyscript.toml"></script>'
+    )
+    (tmp_path / "pyscript.toml").write_text(
+        '[files]\n"{LIB}" = "/home/lib"\n"./lib/utils.py" = "utils.py"\n'
+        '"./lib/helpers.py" = "/home/helpers.py"\n"./lib/tools.py" = "{LIB}/"\n'
+    )
+    (tmp_path / "lib").mkdir()
+    for name in ("utils.py", "helpers.py", "tools.py"):
+        (tmp_path / "lib" / name).write_text("VALUE = 1\n")
+    reloader = HotReloader(tmp_path)
+
+    # EXPECT the module to be written where the config put it
+    assert reloader.describe_changes([tmp_path / "lib" / "utils.py"]) == {
+        "module": "utils",
+        "path": "utils.py",
+        "source": "VALUE = 1\n",
+    }
+    # EXPECT the modules out of the working directory to reload the page
+    for name in ("helpers.py", "tools.py"):
+        assert reloader.describe_changes([tmp_path / "lib" / name]) == {"reload": True}
+
+
+def test_hmr_skips_modules_with_syntax_errors(tmp_path: Path):
+    """
+    Test that modules with syntax errors are not pushed
+    """
+    (tmp_path / "utils.py").write_text("def broken(:\n")
+    checker = SyntaxChecker(max_workers=1)
+    try:
+        reloader = HotReloader(tmp_path, check=checker.check)
+        assert reloader.describe_changes([tmp_path / "utils.py"]) is None
+    finally:
+        checker.shutdown()
+
+
+def test_hmr_server(tmp_path: Path):
+    """
+    Test that the served pages include the HMR client and that the changes to the
+    modules are streamed to them
+    """
+    # GIVEN a project served with HMR
+    (tmp_path / "index.html").write_text(
+        '<html><head><script type="module" '
+        'src="https://pyscript.net/releases/2024.2.1/core.js"></script></head>'
+        "<body></body></html>"
+    )
+    (tmp_path / "utils.py").write_text("VALUE = 1\n")
+    reloader = HotReloader(tmp_path, interval=0.05)
+    reloader.start()
+    server = serve_in_background(tmp_path, hot_reloader=reloader)
+    port = server.server_address[1]
+    try:
+        # EXPECT the page to include the client, importing the same core.js
+        connection = http.client.HTTPConnection("localhost", port)
+        connection.request("GET", "/")
+        response = connection.getresponse()
+        html = response.read().decode()
+        assert response.status == 200
+        assert HMR_PATH in html
+        assert '"https://pyscript.net/releases/2024.2.1/core.js"' in html
+        assert html.index(HMR_PATH) < html.index("</head>")
+
+        # WHEN a page listens to the changes and a module is modified
+        events = http.client.HTTPConnection("localhost", port, timeout=5)
+        events.request("GET", HMR_PATH)
+        response = events.getresponse()
+        assert response.getheader("Content-Type") == "text/event-stream"
+        time.sleep(0.2)
+        (tmp_path / "utils.py").write_text("VALUE = 2\n")
+
+        # EXPECT the new source of the module to be streamed
+        line = response.fp.readline()
+        assert line.startswith(b"data: ")
+        assert json.loads(line[len(b"data: ") :]) == {
+            "module": "utils",
+            "path": "utils.py",
+            "source": "VALUE = 2\n",
+        }
+    finally:
+        reloader.stop()
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "spec,expected",
+    [
+        ("4g", THROTTLE_PROFILES["4g"]),
+        (
+            "bandwidth=2mbps,latency=300ms,jitter=0.1s",
+            ThrottleProfile(bandwidth=250_000, latency=0.3, jitter=0.1),
+        ),
+        (
+            "slow-3g, connections=2",
+            THROTTLE_PROFILES["slow-3g"]._replace(connections=2),
+        ),
+    ],
+)
+def test_parse_throttle(spec: str, expected: ThrottleProfile):
+    assert parse_throttle(spec) == expected
+
+
+@pytest.mark.parametrize(
+    "spec", ["dial-up", "bandwidth=fast", "latency=3h", "connections=0", "speed=1"]
+)
+def test_parse_throttle_errors(spec: str):
+    with pytest.raises(ValueError):
+        parse_throttle(spec)
+
+
+def test_run_server_bad_throttle(invoke_cli: CLIInvoker):  # noqa: F811
+    result = invoke_cli("run", "--throttle", "dial-up")
+    assert result.exit_code == 1
+    assert "Unknown throttle profile: dial-up" in result.stdout
+
+
+def test_server_throttle(tmp_path: Path):
+    """
+    Test that the throttled server delays the responses by the latency and sends
+    them at the bandwidth of the profile
+    """
+    # GIVEN a 100KB file served at 1MB/s with a latency of 100ms
+    (tmp_path / "data.bin").write_bytes(b"x" * 100_000)
+    throttle = Throttle(ThrottleProfile(bandwidth=1_000_000, latency=0.1))
+    server = serve_in_background(tmp_path, throttle=throttle)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        started = time.perf_counter()
+        connection.request("GET", "/data.bin")
+        response = connection.getresponse()
+        assert len(response.read()) == 100_000
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # EXPECT the transfer to take at least the latency plus 100ms
+    assert 0.2 <= elapsed < 2
+
+
+@pytest.mark.parametrize(
+    "query_string,expected",
+    [
+        ("", ListingQuery()),
+        (
+            "sort=size&order=desc&page=3&per_page=10&format=json",
+            ListingQuery(sort="size", reverse=True, page=3, per_page=10, json=True),
+        ),
+    ],
+)
+def test_parse_listing_query(query_string: str, expected: ListingQuery):
+    assert parse_listing_query(query_string) == expected
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    ["sort=owner", "order=up", "page=0", "per_page=100000", "format=xml"],
+)
+def test_parse_listing_query_errors(query_string: str):
+    with pytest.raises(ValueError):
+        parse_listing_query(query_string)
+
+
+def test_listing_cache(tmp_path: Path):
+    """
+    Test that folders are only scanned again when they change, whatever the
+    order their entries are sorted in
+    """
+    (tmp_path / "b.txt").write_text("bb")
+    (tmp_path / "a.txt").write_text("aaa")
+    cache = ListingCache()
+
+    with mock.patch(
+        "pyscript._listing.scan_directory", wraps=_listing.scan_directory
+    ) as scan_mock:
+        assert [e.name for e in cache.entries(tmp_path)] == ["a.txt", "b.txt"]
+        assert [e.name for e in cache.entries(tmp_path, "size")] == ["b.txt", "a.txt"]
+        assert scan_mock.call_count == 1
+
+        (tmp_path / "c.txt").write_text("")
+        # Make sure the modification time changes on coarse filesystems
+        os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1_000_000_000))
+        assert [e.name for e in cache.entries(tmp_path, "size")] == [
+            "c.txt",
+            "b.txt",
+            "a.txt",
+        ]
+        assert scan_mock.call_count == 2
+
+
+def test_server_directory_listing(tmp_path: Path):
+    """
+    Test that folders without an index.html are listed a page at a time, as HTML
+    or JSON
+    """
+    # GIVEN a folder with 25 files and a subfolder
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(25):
+        (data / f"file{i:02}.csv").write_text("x" * i)
+    (data / "nested").mkdir()
+    server = serve_in_background(tmp_path)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+
+        # EXPECT the JSON listing to be paginated and sorted
+        connection.request(
+            "GET", "/data/?format=json&sort=size&order=desc&per_page=10&page=1"
+        )
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "application/json"
+        listing = json.loads(response.read())
+        assert listing["total"] == 26
+        assert listing["pages"] == 3
+        assert [entry["name"] for entry in listing["entries"][:2]] == [
+            "file24.csv",
+            "file23.csv",
+        ]
+        assert listing["entries"][0]["size"] == 24
+
+        # EXPECT the HTML listing to link the entries and the next page
+        connection.request("GET", "/data/?per_page=20")
+        response = connection.getresponse()
+        assert response.status == 200
+        page = response.read().decode()
+        assert '<a href="file00.csv">file00.csv</a>' in page
+        assert "file20.csv" not in page
+        assert "page=2" in page
+
+        connection.request("GET", "/data/?sort=owner")
+        response = connection.getresponse()
+        assert response.status == 400
+        response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "body,content_type",
+    [
+        (b"not json", "application/json"),
+        (b'{"function": "add"}', "application/json"),
+        (b'[{"function": "add", "args": 1}]', "application/json"),
+        (b'[{"function": "add"}]', "text/plain"),
+    ],
+)
+def test_rpc_decode_calls_errors(body: bytes, content_type: str):
+    with pytest.raises(RPCError):
+        decode_calls(body, content_type)
+
+
+def test_rpc_function_pool():
+    pool = FunctionPool({"add": operator.add, "div": operator.truediv}, max_workers=2)
+    try:
+        results = pool.call_batch(
+            [
+                ("add", [1, 2], {}),
+                ("div", [1, 0], {}),
+                ("missing", [], {}),
+                ("add", [], {"a": 1}),
+            ]
+        )
+    finally:
+        pool.shutdown()
+
+    assert results[0] == {"result": 3}
+    assert results[1] == {"error": "ZeroDivisionError: division by zero"}
+    assert results[2] == {"error": "Unknown function: missing"}
+    assert results[3]["error"].startswith("TypeError")
+
+
+def test_server_rpc(tmp_path: Path):
+    """
+    Test that the server runs the batches of calls posted by the apps, and only
+    accepts them when RPC is enabled
+    """
+    (tmp_path / "index.html").write_text("<html><head></head><body></body></html>")
+    pool = FunctionPool({"pow": operator.pow}, max_workers=2)
+    server = serve_in_background(tmp_path, function_pool=pool)
+    try:
+        # Host functions can't be called from other computers
+        assert server.server_address[0] == "127.0.0.1"
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+
+        # The pages served hold the token
+        connection.request("GET", "/")
+        response = connection.getresponse()
+        assert pool.token in response.read().decode()
+
+        batch = [{"function": "pow", "args": [2, n]} for n in range(4)]
+        headers = {"Content-Type": "application/json", TOKEN_HEADER: pool.token}
+        connection.request("POST", RPC_PATH, json.dumps(batch), headers=headers)
+        response = connection.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read()) == [
+            {"result": 1},
+            {"result": 2},
+            {"result": 4},
+            {"result": 8},
+        ]
+
+        # Simple cross-origin requests are rejected
+        connection.request(
+            "POST",
+            RPC_PATH,
+            json.dumps(batch),
+            headers={**headers, "Content-Type": "text/plain"},
+        )
+        response = connection.getresponse()
+        assert response.status == 415
+        response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.shutdown()
+
+    server = serve_in_background(tmp_path)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        connection.request("POST", RPC_PATH, "[]")
+        response = connection.getresponse()
+        assert response.status == 501
+        response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        # No token, or another one
+        {TOKEN_HEADER: ""},
+        {TOKEN_HEADER: "guessed"},
+        # Pages of other sites, even when their name resolves to the host
+        {"Origin": "http://evil.example"},
+        {"Host": "evil.example"},
+    ],
+)
+def test_server_rpc_rejected(tmp_path: Path, headers: dict):
+    (tmp_path / "index.html").write_text("<html><head></head></html>")
+    pool = FunctionPool({"pow": operator.pow}, max_workers=1)
+    server = serve_in_background(tmp_path, function_pool=pool)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        headers = {TOKEN_HEADER: pool.token, **headers}
+        headers["Content-Type"] = "application/json"
+        body = json.dumps([{"function": "pow", "args": [2, 2]}])
+        connection.request("POST", RPC_PATH, body, headers=headers)
+        response = connection.getresponse()
+        assert response.status == 403
+        response.read()
+
+        if "Host" in headers:
+            # The token can't be read by them either
+            connection.request("GET", "/", headers={"Host": headers["Host"]})
+            response = connection.getresponse()
+            assert response.status == 403
+            assert pool.token not in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.shutdown()
+
+
+@pytest.mark.parametrize(
+    "host,expected",
+    [
+        ("localhost:8000", True),
+        ("127.0.0.1:8000", True),
+        ("LOCALHOST:8000", True),
+        ("localhost", False),
+        ("localhost:8001", False),
+        ("evil.example:8000", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_rpc_is_local_host(host, expected: bool):
+    assert is_local_host(host, 8000) is expected
+
+
+def test_rpc_inject_token():
+    page = b"<html><head><title>App</title></head><body></body></html>"
+    injected = inject_token(page, "secret")
+    assert injected.index(b'<meta name="pyscript-rpc-token" content="secret">') < (
+        injected.index(b"</head>")
+    )
+    assert inject_token(b"<p>No head</p>", "secret").startswith(b"\n<meta")
+
+
+def test_server_rpc_msgpack(tmp_path: Path):
+    msgpack = pytest.importorskip("msgpack")
+    pool = FunctionPool({"concat": operator.concat}, max_workers=1)
+    server = serve_in_background(tmp_path, function_pool=pool)
+    try:
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        batch = [{"function": "concat", "args": [b"\x00\x01", b"\x02"]}]
+        connection.request(
+            "POST",
+            RPC_PATH,
+            msgpack.packb(batch),
+            headers={"Content-Type": "application/msgpack", TOKEN_HEADER: pool.token},
+        )
+        response = connection.getresponse()
+        assert response.status == 200
+        assert msgpack.unpackb(response.read()) == [{"result": b"\x00\x01\x02"}]
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.shutdown()
+
+
+def test_rpc_functions_from_plugins():
+    from pyscript.cli import pm
+    from pyscript.plugins import register
+
+    class MathPlugin:
+        @register
+        def pyscript_rpc_functions(self):
+            return {"add": operator.add}
+
+    plugin = MathPlugin()
+    pm.register(plugin)
+    try:
+        assert rpc_functions() == {"add": operator.add}
+    finally:
+        pm.unregister(plugin)
+
+
+@mock.patch("pyscript.plugins.run.start_detached_server")
+def test_run_detach_forwards_options(
+    start_detached_server_mock, invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    start_detached_server_mock.return_value = None
+
+    result = invoke_cli(
+        "run", "--detach", "--no-view", "--port=8001", "--hmr", "--throttle", "4g"
+    )
+
+    assert result.exit_code == 1
+    assert "the server didn't start" in result.stdout
+    start_detached_server_mock.assert_called_once_with(
+        Path("."), 8001, ["--hmr", "--throttle", "4g"]
+    )
+
+
+def test_start_server_registers_resolved_path(tmp_path: Path):
+    """
+    Test that servers are registered by the resolved path of their folder, the
+    one `find_server` looks them up by
+    """
+    (tmp_path / "app").mkdir()
+    httpd = mock.MagicMock()
+    httpd.__enter__.return_value = httpd
+    httpd.server_address = ("", 8001)
+    httpd.serve_forever.side_effect = KeyboardInterrupt
+
+    with mock.patch(
+        "pyscript.plugins.run.create_server", return_value=httpd
+    ), mock.patch(
+        "pyscript.plugins.run.register_server"
+    ) as register_server_mock, mock.patch(
+        "pyscript.plugins.run.unregister_server"
+    ):
+        with pytest.raises(typer.Exit):
+            start_server(tmp_path / "app" / ".." / "app", False, 8001, hmr=True)
+
+    [server] = register_server_mock.call_args.args
+    assert server.path == str((tmp_path / "app").resolve())
+    assert server.options == ("--hmr",)
+
+
+@mock.patch("pyscript.plugins.run.start_detached_server")
+@mock.patch("pyscript.plugins.run.find_server")
+def test_run_detach_warns_about_other_options(
+    find_server_mock,
+    start_detached_server_mock,
+    invoke_cli: CLIInvoker,  # noqa: F811
+    tmp_path: Path,
+):
+    """
+    Test that reusing a server started with other options says so
+    """
+    find_server_mock.return_value = ServerInfo(
+        1234, 8000, str(tmp_path), time.time(), ("--hmr",)
+    )
+
+    result = invoke_cli("run", "--detach", "--no-view", "--rpc")
+
+    assert result.exit_code == 0
+    assert "is already served" in result.stdout
+    assert "started with `--port 8000 --hmr`" in result.stdout
+    start_detached_server_mock.assert_not_called()
+
+    result = invoke_cli("run", "--detach", "--no-view", "--hmr")
+
+    assert result.exit_code == 0
+    assert "Warning" not in result.stdout
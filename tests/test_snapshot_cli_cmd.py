@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import subprocess
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+import toml
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import config
+
+
+def fake_pip_install(args: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """Pretend to install pure python packages, failing for numpy like pip would."""
+    package = args[-1]
+    if package == "numpy":
+        return subprocess.CompletedProcess(args, 1)
+
+    target = Path(
+        next(arg for arg in args if arg.startswith("--target=")).split("=")[1]
+    )
+    (target / package).mkdir()
+    (target / package / "__init__.py").write_text(f"name = {package!r}")
+    (target / package / "__pycache__").mkdir()
+    (target / package / "__pycache__" / "__init__.pyc").write_bytes(b"")
+    return subprocess.CompletedProcess(args, 0)
+
+
+@pytest.fixture()
+def project_config_path(tmp_path: Path) -> Path:
+    config_path = tmp_path / config["project_config_filename"]
+    config_path.write_text('name = "app"\npackages = ["numpy", "arrr", "humanize"]\n')
+    return config_path
+
+
+@mock.patch("pyscript.plugins.snapshot.subprocess.run", side_effect=fake_pip_install)
+def test_snapshot(
+    run_mock,
+    invoke_cli: CLIInvoker,  # noqa: F811
+    tmp_path: Path,
+    project_config_path: Path,
+):
+    """
+    Test that snapshot archives the pure python packages and wires the archive
+    in the project config
+    """
+    # GIVEN a call to snapshot on a project with packages
+    result = invoke_cli("snapshot")
+
+    # EXPECT the command to succeed
+    assert result.exit_code == 0
+    assert "still be installed by the runtime: numpy" in result.stdout
+
+    # EXPECT the archive to contain the installed packages, without bytecode
+    with zipfile.ZipFile(tmp_path / "snapshot.zip") as zf:
+        assert sorted(zf.namelist()) == ["arrr/__init__.py", "humanize/__init__.py"]
+
+    # EXPECT the archive to be unpacked by the runtime instead of installing
+    # the packages it contains
+    project_config = toml.load(project_config_path)
+    assert project_config["files"] == {"./snapshot.zip": "./*"}
+    assert project_config["packages"] == ["numpy"]
+    assert project_config["snapshot"] == {
+        "archive": "./snapshot.zip",
+        "packages": ["arrr", "humanize"],
+    }
+
+    # GIVEN a second snapshot of the same project
+    run_mock.reset_mock()
+    result = invoke_cli("snapshot")
+
+    # EXPECT the packages of the previous snapshot to be installed again
+    assert result.exit_code == 0
+    installed = [call.args[0][-1] for call in run_mock.call_args_list]
+    assert installed == ["arrr", "humanize", "numpy"]
+
+
+def test_snapshot_not_a_project(invoke_cli: CLIInvoker):  # noqa: F811
+    result = invoke_cli("snapshot")
+
+    assert result.exit_code == 1
+    assert "is not a PyScript project config file" in result.stdout
+
+
+def test_snapshot_no_packages(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    (tmp_path / config["project_config_filename"]).write_text('name = "app"\n')
+
+    result = invoke_cli("snapshot")
+
+    assert result.exit_code == 1
+    assert "doesn't list any packages" in result.stdout
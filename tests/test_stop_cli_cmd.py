@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import urllib.request
+from pathlib import Path
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _servers
+from pyscript._servers import find_server, is_process_running, list_servers
+
+
+def test_stop_not_served(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    result = invoke_cli("stop")
+
+    assert result.exit_code == 1
+    assert "is not served" in result.stdout
+
+
+@pytest.mark.skipif(
+    sys.platform != "linux", reason="the data folder is set with XDG_DATA_HOME"
+)
+def test_detached_server(
+    invoke_cli: CLIInvoker,  # noqa: F811
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """
+    Test that run --detach starts a server that outlives the command, is reused
+    by the next run --detach, and is stopped by stop
+    """
+    # GIVEN a project, and a data folder shared with the detached servers
+    data_home = tmp_path.parent / f"{tmp_path.name}-data"
+    monkeypatch.setenv("XDG_DATA_HOME", str(data_home))
+    monkeypatch.setattr(
+        _servers, "REGISTRY_FILE", data_home / "pyscript" / "servers.json"
+    )
+    monkeypatch.setattr(_servers, "LOGS_DIR", data_home / "pyscript" / "logs")
+    (tmp_path / "index.html").write_text("<html></html>")
+
+    # WHEN starting a detached server
+    result = invoke_cli("run", "--detach", "--no-view", "--port", "0")
+
+    # EXPECT it to serve the project in the background
+    assert result.exit_code == 0, result.stdout
+    server = find_server(tmp_path)
+    assert server is not None
+    try:
+        with urllib.request.urlopen(f"{server.url}index.html") as response:
+            assert response.read() == b"<html></html>"
+
+        # EXPECT the running server to be reused
+        result = invoke_cli("run", "--detach", "--no-view", "--port", "0")
+        assert result.exit_code == 0
+        assert "is already served" in result.stdout
+        assert list_servers() == [server]
+
+        # EXPECT stop to stop it. The server is a child of the tests, which must
+        # reap it for it to be gone, as init would once the command exits
+        threading.Thread(target=os.waitpid, args=(server.pid, 0), daemon=True).start()
+        result = invoke_cli("stop")
+        assert result.exit_code == 0
+        assert str(server.pid) in result.stdout
+        assert not is_process_running(server.pid)
+        assert list_servers() == []
+    finally:
+        if is_process_running(server.pid):
+            _servers.stop_server(server)
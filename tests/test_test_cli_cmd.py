@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _generator as gen
+from pyscript._throttle import ThrottleProfile
+from pyscript.plugins import test as test_plugin
+
+METRICS = {
+    "runtime_download_ms": 800.0,
+    "runtime_bytes": 5_000_000,
+    "init_ms": 400.0,
+    "ready_ms": 1300.0,
+    "first_output_ms": 1350.0,
+    "done_ms": 1400.0,
+}
+
+
+@pytest.fixture()
+def projects(tmp_path: Path, monkeypatch) -> list[Path]:
+    monkeypatch.chdir(tmp_path)
+    for name in ("app1", "app2"):
+        gen.create_project(name, "", "", "", pyscript_version="2024.2.1")
+    return [tmp_path / "app1", tmp_path / "app2"]
+
+
+def fake_playwright(page_errors: list[str]) -> mock.MagicMock:
+    """A Playwright stand-in whose pages fetch the app page and report METRICS."""
+    playwright = mock.MagicMock()
+    page = playwright.__enter__.return_value.chromium.launch.return_value.new_page()
+
+    def goto(url: str) -> None:
+        with urllib.request.urlopen(url) as response:
+            assert b"core.js" in response.read()
+        for handler in [c.args[1] for c in page.on.call_args_list]:
+            for error in page_errors:
+                handler(error)
+
+    page.goto.side_effect = goto
+    page.evaluate.return_value = METRICS
+    return mock.MagicMock(return_value=playwright)
+
+
+def test_test_command(
+    invoke_cli: CLIInvoker, tmp_path: Path, projects: list[Path]  # noqa: F811
+):
+    """
+    Test that the test command serves each project and reports its boot metrics
+    """
+    with mock.patch.object(test_plugin, "sync_playwright", fake_playwright([])):
+        result = invoke_cli("test", str(tmp_path), "-o", "results.json")
+
+    assert result.exit_code == 0
+    report = json.loads((tmp_path / "results.json").read_text())
+    assert report["browser"] == "chromium"
+    assert [r["project"] for r in report["results"]] == list(map(str, projects))
+    for project_result in report["results"]:
+        assert project_result["ok"]
+        assert project_result["error"] is None
+        assert project_result["done_ms"] == 1400.0
+        assert project_result["wall_ms"] > 0
+
+
+def test_test_command_page_errors(
+    invoke_cli: CLIInvoker, projects: list[Path]  # noqa: F811
+):
+    """
+    Test that the test command fails when the apps raise errors
+    """
+    with mock.patch.object(
+        test_plugin, "sync_playwright", fake_playwright(["NameError: x"])
+    ):
+        result = invoke_cli("test", str(projects[0]))
+
+    assert result.exit_code == 1
+    assert "NameError: x" in result.stdout
+    assert "1 of 1 projects failed" in result.stdout
+
+
+@pytest.mark.parametrize("browser_name", ["chromium", "firefox"])
+def test_test_command_throttle(
+    invoke_cli: CLIInvoker, projects: list[Path], browser_name: str  # noqa: F811
+):
+    """
+    Test that Chromium throttles all the requests of the page, including the
+    downloads from the CDN, while other browsers only get the local files
+    throttled
+    """
+    sync_playwright = fake_playwright([])
+    playwright = sync_playwright.return_value.__enter__.return_value
+    browser_type = getattr(playwright, browser_name)
+    browser_type.launch.return_value = playwright.chromium.launch.return_value
+    page = playwright.chromium.launch.return_value.new_page()
+
+    with mock.patch.object(test_plugin, "sync_playwright", sync_playwright):
+        with mock.patch.object(
+            test_plugin, "serve_in_background", wraps=test_plugin.serve_in_background
+        ) as serve_mock:
+            result = invoke_cli(
+                "test",
+                str(projects[0]),
+                "--browser",
+                browser_name,
+                "--throttle",
+                "bandwidth=8mbps,latency=100ms,connections=4",
+            )
+
+    assert result.exit_code == 0
+    server_profile = serve_mock.call_args.kwargs["throttle"].profile
+    cdp = page.context.new_cdp_session.return_value
+    if browser_name == "chromium":
+        cdp.send.assert_called_with(
+            "Network.emulateNetworkConditions",
+            {
+                "offline": False,
+                "latency": 100.0,
+                "downloadThroughput": 1_000_000.0,
+                "uploadThroughput": 1_000_000.0,
+            },
+        )
+        # Not throttled twice
+        assert server_profile == ThrottleProfile(connections=4)
+    else:
+        cdp.send.assert_not_called()
+        assert server_profile.latency == 0.1
+        assert "Only the project files are throttled" in result.stdout
+
+
+def test_test_command_without_playwright(
+    invoke_cli: CLIInvoker, projects: list[Path]  # noqa: F811
+):
+    with mock.patch.object(test_plugin, "sync_playwright", None):
+        result = invoke_cli("test", str(projects[0]))
+
+    assert result.exit_code == 1
+    assert "needs Playwright" in result.stdout
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+import toml
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import _store, config
+from pyscript.plugins import trim
+
+STDLIB = {
+    "LICENSE.txt": "",
+    "_sysconfigdata__emscripten_wasm32-emscripten.py": "build_time_vars = {}",
+    "site.py": "import os",
+    "os.py": "import abc",
+    "abc.py": "",
+    "encodings/__init__.py": "from . import aliases",
+    "encodings/aliases.py": "",
+    "pyodide/__init__.py": "from _pyodide import docstring",
+    "_pyodide/__init__.py": "",
+    "_pyodide/docstring.py": "",
+    "json/__init__.py": "from .decoder import JSONDecoder",
+    "json/decoder.py": "import re",
+    "re/__init__.py": "import enum\nfrom . import _parser",
+    "re/_parser.py": "",
+    "enum.py": "",
+    "unittest/__init__.py": "import difflib",
+    "unittest/data.txt": "",
+    "difflib.py": "",
+    "email/__init__.py": "",
+}
+
+
+def stdlib_archive() -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as zf:
+        for name, source in STDLIB.items():
+            zf.writestr(name, source)
+    return data.getvalue()
+
+
+def fake_download(url: str) -> bytes:
+    name = url.rsplit("/", 1)[1]
+    if name == trim.STDLIB_FILE:
+        return stdlib_archive()
+    if name == trim.LOCK_FILE:
+        return json.dumps(
+            {"packages": {"micropip": {"file_name": "micropip-0.5.0-py3-none-any.whl"}}}
+        ).encode()
+    return f"contents of {name}".encode()
+
+
+@pytest.mark.parametrize(
+    "source,module,is_package,expected",
+    [
+        ("import a.b, c", "", False, {"a.b", "c"}),
+        ("from a import b", "", False, {"a", "a.b"}),
+        ("from . import b", "pkg.mod", False, {"pkg", "pkg.b"}),
+        ("from .b import c", "pkg", True, {"pkg.b", "pkg.b.c"}),
+        ("from ..b import c", "pkg.sub.mod", False, {"pkg.b", "pkg.b.c"}),
+        ("this is not python", "", False, set()),
+    ],
+)
+def test_find_imports(source: str, module: str, is_package: bool, expected: set):
+    assert trim.find_imports(source, module, is_package) == expected
+
+
+@mock.patch("pyscript.plugins.trim._download", side_effect=fake_download)
+def test_trim(download_mock, invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    """
+    Test that trim bundles the runtime with the standard library modules reachable
+    from the app imports, and points the config to it
+    """
+    # GIVEN a project importing json
+    config_path = tmp_path / config["project_config_filename"]
+    config_path.write_text('name = "app"\n')
+    (tmp_path / "main.py").write_text("import json\n")
+
+    # WHEN trimming it, keeping a dynamically imported module
+    result = invoke_cli("trim", "--keep", "difflib")
+
+    # EXPECT the runtime to be written in the project
+    assert result.exit_code == 0
+    assert (tmp_path / "pyodide" / "pyodide.asm.wasm").read_bytes() == (
+        b"contents of pyodide.asm.wasm"
+    )
+    assert download_mock.call_args_list[0] == mock.call(
+        "https://cdn.jsdelivr.net/pyodide/v0.25.0/full/pyodide.mjs"
+    )
+
+    # EXPECT the packages of the runtime to still be downloaded from the CDN
+    lock = json.loads((tmp_path / "pyodide" / "pyodide-lock.json").read_text())
+    assert lock["packages"]["micropip"]["file_name"] == (
+        "https://cdn.jsdelivr.net/pyodide/v0.25.0/full/micropip-0.5.0-py3-none-any.whl"
+    )
+
+    # EXPECT the standard library to only include the reachable modules
+    with zipfile.ZipFile(tmp_path / "pyodide" / "python_stdlib.zip") as zf:
+        assert sorted(zf.namelist()) == [
+            "LICENSE.txt",
+            "_pyodide/__init__.py",
+            "_pyodide/docstring.py",
+            "_sysconfigdata__emscripten_wasm32-emscripten.py",
+            "abc.py",
+            "difflib.py",
+            "encodings/__init__.py",
+            "encodings/aliases.py",
+            "enum.py",
+            "json/__init__.py",
+            "json/decoder.py",
+            "os.py",
+            "pyodide/__init__.py",
+            "re/__init__.py",
+            "re/_parser.py",
+            "site.py",
+        ]
+    assert "Kept 16 of 19 files" in result.stdout
+
+    # EXPECT the config to load the bundled runtime and remember the settings
+    project_config = toml.load(config_path)
+    assert project_config["interpreter"] == "./pyodide/pyodide.mjs"
+    assert project_config["stdlib"] == {
+        "pyodide_version": "0.25.0",
+        "keep": ["difflib"],
+    }
+
+
+@mock.patch("pyscript.plugins.trim._download", side_effect=fake_download)
+def test_trim_keeps_micropip_dependencies(
+    download_mock, invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that the modules needed to install packages are kept when the config
+    lists packages
+    """
+    config_path = tmp_path / config["project_config_filename"]
+    config_path.write_text('name = "app"\npackages = ["arrr"]\n')
+
+    result = invoke_cli("trim")
+
+    assert result.exit_code == 0
+    assert "can't be analyzed" in result.stdout
+    with zipfile.ZipFile(tmp_path / "pyodide" / "python_stdlib.zip") as zf:
+        assert "email/__init__.py" in zf.namelist()
+
+
+def test_trim_micropython(invoke_cli: CLIInvoker, tmp_path: Path):  # noqa: F811
+    config_path = tmp_path / config["project_config_filename"]
+    config_path.write_text('name = "app"\nruntime = "micropython"\n')
+
+    result = invoke_cli("trim")
+
+    assert result.exit_code == 1
+    assert "only the standard library of Pyodide can be trimmed" in result.stdout
+
+
+@mock.patch("pyscript.plugins.trim._download", side_effect=fake_download)
+def test_trim_shares_runtime_between_projects(
+    download_mock, invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that the runtime is downloaded once, and linked from the store into
+    every trimmed project
+    """
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / config["project_config_filename"]).write_text(
+            f'name = "{name}"\n'
+        )
+        result = invoke_cli("trim", name)
+        assert result.exit_code == 0
+
+    assert download_mock.call_count == len(trim.RUNTIME_FILES) + 2
+    for name in [*trim.RUNTIME_FILES, trim.LOCK_FILE, trim.STDLIB_FILE]:
+        one = (tmp_path / "one" / "pyodide" / name).stat()
+        assert one.st_ino == (tmp_path / "two" / "pyodide" / name).stat().st_ino
+
+    # EXPECT trimming again to replace the links, not to write to the store
+    (tmp_path / "one" / "main.py").write_text("import difflib\n")
+    assert invoke_cli("trim", "one").exit_code == 0
+    with zipfile.ZipFile(tmp_path / "two" / "pyodide" / trim.STDLIB_FILE) as zf:
+        assert "difflib.py" not in zf.namelist()
+
+
+@mock.patch("pyscript.plugins.trim._download", side_effect=fake_download)
+def test_trim_while_collecting_garbage(
+    download_mock, invoke_cli: CLIInvoker, tmp_path: Path  # noqa: F811
+):
+    """
+    Test that the runtime files collected by `pyscript gc` between their
+    download and their use are downloaded again
+    """
+    (tmp_path / config["project_config_filename"]).write_text('name = "app"\n')
+    fetch = _store.fetch
+    collected = set()
+
+    def fetch_then_collect(url: str, download) -> str:
+        digest = fetch(url, download)
+        if url not in collected:
+            collected.add(url)
+            _store.blob_path(digest).unlink()
+        return digest
+
+    with mock.patch.object(_store, "fetch", side_effect=fetch_then_collect):
+        result = invoke_cli("trim", str(tmp_path))
+
+    assert result.exit_code == 0
+    assert download_mock.call_count == 2 * (len(trim.RUNTIME_FILES) + 2)
+    for name in trim.RUNTIME_FILES:
+        assert (tmp_path / "pyodide" / name).read_bytes() == fake_download(f"/{name}")
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from utils import CLIInvoker, invoke_cli  # noqa: F401
+
+from pyscript import LATEST_PYSCRIPT_VERSION
+from pyscript import _generator as gen
+
+OLD_VERSION = "2023.11.1"
+
+
+@pytest.fixture()
+def projects(tmp_path: Path, monkeypatch) -> list[Path]:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "apps").mkdir()
+    monkeypatch.chdir(tmp_path / "apps")
+    for name in ("app1", "app2"):
+        gen.create_project(name, "", "", "", pyscript_version=OLD_VERSION)
+    # Projects in ignored folders are left alone
+    (tmp_path / "apps" / "node_modules").mkdir()
+    monkeypatch.chdir(tmp_path / "apps" / "node_modules")
+    gen.create_project("vendored", "", "", "", pyscript_version=OLD_VERSION)
+    monkeypatch.chdir(tmp_path)
+    return [tmp_path / "apps" / "app1", tmp_path / "apps" / "app2"]
+
+
+def test_upgrade(
+    invoke_cli: CLIInvoker, tmp_path: Path, projects: list[Path]  # noqa: F811
+):
+    """
+    Test that upgrade points all the projects to the new PyScript release
+    """
+    result = invoke_cli("upgrade", "apps", "--to", "2024.5.1")
+
+    assert result.exit_code == 0
+    assert "2 files upgraded to PyScript 2024.5.1" in result.stdout
+    for project in projects:
+        html = (project / "index.html").read_text()
+        assert "https://pyscript.net/releases/2024.5.1/core.js" in html
+        assert "https://pyscript.net/releases/2024.5.1/core.css" in html
+        assert OLD_VERSION not in html
+    vendored = tmp_path / "apps" / "node_modules" / "vendored" / "index.html"
+    assert OLD_VERSION in vendored.read_text()
+
+
+def test_upgrade_latest(invoke_cli: CLIInvoker, projects: list[Path]):  # noqa: F811
+    result = invoke_cli("upgrade", "apps")
+
+    assert result.exit_code == 0
+    assert LATEST_PYSCRIPT_VERSION in (projects[0] / "index.html").read_text()
+
+
+def test_upgrade_dry_run(invoke_cli: CLIInvoker, projects: list[Path]):  # noqa: F811
+    """
+    Test that a dry run shows the changes without writing them
+    """
+    before = (projects[0] / "index.html").read_text()
+
+    result = invoke_cli("upgrade", "apps", "--to", "2024.5.1", "--dry-run")
+
+    assert result.exit_code == 0
+    assert "2 files would be upgraded to PyScript 2024.5.1" in result.stdout
+    assert (
+        f'-    <link rel="stylesheet" href="https://pyscript.net/releases/{OLD_VERSION}'
+        in (result.stdout)
+    )
+    assert (
+        '+    <link rel="stylesheet" href="https://pyscript.net/releases/2024.5.1'
+        in (result.stdout)
+    )
+    assert (projects[0] / "index.html").read_text() == before
+
+
+def test_upgrade_service_worker(
+    invoke_cli: CLIInvoker, tmp_path: Path, monkeypatch  # noqa: F811
+):
+    """
+    Test that upgrade generates the service worker of offline projects again, so
+    that it precaches the new release under a new cache name
+    """
+    monkeypatch.chdir(tmp_path)
+    gen.create_project("app", "", "", "", pyscript_version=OLD_VERSION, offline=True)
+    (tmp_path / "new").mkdir()
+    monkeypatch.chdir(tmp_path / "new")
+    gen.create_project("app", "", "", "", pyscript_version="2024.5.1", offline=True)
+    monkeypatch.chdir(tmp_path)
+
+    result = invoke_cli("upgrade", "app", "--to", "2024.5.1")
+
+    assert result.exit_code == 0
+    assert "2 files upgraded to PyScript 2024.5.1" in result.stdout
+    service_worker = (tmp_path / "app" / "sw.js").read_text()
+    assert OLD_VERSION not in service_worker
+    assert "https://pyscript.net/releases/2024.5.1/core.js" in service_worker
+    assert '"pyscript:app:2024.5.1-' in service_worker
+    # EXPECT the same service worker as a project created for the new release
+    assert service_worker == (tmp_path / "new" / "app" / "sw.js").read_text()
+
+
+def test_upgrade_bad_root(invoke_cli: CLIInvoker):  # noqa: F811
+    result = invoke_cli("upgrade", "missing")
+
+    assert result.exit_code == 1
+    assert "is not a folder" in result.stdout